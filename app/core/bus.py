@@ -6,13 +6,21 @@ Async Event Bus - Core Message Routing System
 1. 解耦生产者和消费者
 2. 并发分发消息到所有订阅者
 3. 错误隔离 - 单个消费者失败不影响其他消费者
+4. 可选的队列分发模式 - 每个消费者独立的有界队列，慢 Sink 不拖慢 Source
+5. 持久化 outbox - 分发前记录 (event_id, sink) 待投递状态，重启后可恢复
 """
 
 import asyncio
-from typing import Any, Awaitable, Callable, List
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, runtime_checkable
 
 from loguru import logger
 
+from app.core.config import settings
+from app.core.metrics import bus_metrics
+from app.core.tracing import tracer
 from app.schemas.event import UnifiedMessage
 
 # 定义消息处理器类型
@@ -24,6 +32,184 @@ def _handler_name(handler: MessageHandler) -> str:
     return getattr(handler, "__name__", handler.__class__.__name__)
 
 
+def _handler_key(handler: MessageHandler) -> str:
+    """获取 handler 的唯一配置键，如 ThreadsClient.handle_message。"""
+    return getattr(handler, "__qualname__", _handler_name(handler))
+
+
+@runtime_checkable
+class OutboxStore(Protocol):
+    """持久化 outbox 接口，由存储层实现（DatabaseManager）"""
+
+    async def add_pending_deliveries(self, message: UnifiedMessage, sinks: List[str]) -> None:
+        """分发前记录每个 (event_id, sink) 为待投递"""
+        ...
+
+    async def mark_delivery_done(self, event_id: str, sink: str) -> None:
+        """标记 (event_id, sink) 投递完成"""
+        ...
+
+    async def mark_delivery_abandoned(self, event_id: str, sink: str) -> None:
+        """标记 (event_id, sink) 被背压丢弃/拒绝，重启后不再恢复"""
+        ...
+
+
+class BackpressurePolicy(str, Enum):
+    """
+    队列满时的背压策略
+
+    - BLOCK: publish 等待队列出现空位
+    - DROP_OLDEST: 丢弃队列中最旧的消息，放入新消息
+    - REJECT: 直接拒绝新消息
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    REJECT = "reject"
+
+
+@dataclass(frozen=True)
+class SinkDispatch:
+    """队列分发配置：handler 独立的有界队列大小、worker 数量和背压策略"""
+
+    queue_size: int = 100
+    workers: int = 1
+    backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK
+
+
+class _SinkQueue:
+    """
+    单个 handler 的有界队列和 worker 任务
+
+    worker 在首次投递时于当前运行的 event loop 中惰性启动，
+    event loop 变化时（例如测试中新建 loop）会重新创建队列。
+    被背压丢弃或拒绝的消息交给 discard 回调（标记 outbox，避免重启后又被恢复）。
+    """
+
+    def __init__(
+        self,
+        handler: MessageHandler,
+        dispatch: SinkDispatch,
+        run: Callable[[MessageHandler, UnifiedMessage], Awaitable[Any]],
+        discard: Callable[[MessageHandler, UnifiedMessage], Awaitable[None]],
+    ):
+        self.handler = handler
+        self.dispatch = dispatch
+        self.name = _handler_key(handler)
+        self.dropped = 0
+        self.rejected = 0
+        self._run = run
+        self._discard = discard
+        self._queue: Optional[asyncio.Queue[UnifiedMessage]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_running(self) -> asyncio.Queue[UnifiedMessage]:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self.cancel()
+            self._queue = asyncio.Queue(maxsize=self.dispatch.queue_size)
+            self._loop = loop
+            self._tasks = [
+                loop.create_task(self._work(self._queue), name=f"bus:{self.name}:{index}")
+                for index in range(max(1, self.dispatch.workers))
+            ]
+            logger.info(
+                f"Started {len(self._tasks)} bus worker(s) for {self.name}, "
+                f"queue_size={self.dispatch.queue_size}, "
+                f"backpressure={self.dispatch.backpressure.value}"
+            )
+        return self._queue
+
+    async def _work(self, queue: asyncio.Queue[UnifiedMessage]) -> None:
+        while True:
+            message = await queue.get()
+            try:
+                await self._run(self.handler, message)
+            except Exception:
+                # _safe_handle 已记录错误日志，worker 继续处理后续消息
+                pass
+            finally:
+                queue.task_done()
+
+    async def put(self, message: UnifiedMessage) -> bool:
+        """按背压策略投递消息，返回 False 表示消息被拒绝"""
+        queue = self._ensure_running()
+        policy = self.dispatch.backpressure
+
+        if policy == BackpressurePolicy.BLOCK:
+            await queue.put(message)
+            return True
+
+        try:
+            queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if policy == BackpressurePolicy.REJECT:
+            self.rejected += 1
+            logger.warning(f"Bus queue full for {self.name}, message rejected: {message.event_id}")
+            await self._discard(self.handler, message)
+            return False
+
+        dropped = queue.get_nowait()
+        queue.task_done()
+        self.dropped += 1
+        logger.warning(
+            f"Bus queue full for {self.name}, dropped oldest message {dropped.event_id} "
+            f"in favor of {message.event_id}"
+        )
+        queue.put_nowait(message)
+        await self._discard(self.handler, dropped)
+        return True
+
+    async def drain(self, timeout: float) -> None:
+        """等待队列中已有消息处理完毕（最多 timeout 秒），然后停止 worker"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Bus queue for {self.name} not drained within {timeout}s, "
+                    f"{self._queue.qsize()} message(s) abandoned"
+                )
+        tasks = list(self._tasks)
+        self.cancel()
+        for task in tasks:
+            if task.get_loop() is asyncio.get_running_loop():
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            if not task.done() and not task.get_loop().is_closed():
+                task.cancel()
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+
+def _default_dispatch(handler: MessageHandler) -> Optional[SinkDispatch]:
+    """根据配置决定 handler 的分发方式，None 表示直接并发调用"""
+    if not settings.event_bus_queue_enabled:
+        return None
+
+    backpressure = settings.event_bus_sink_backpressure.get(
+        _handler_key(handler), settings.event_bus_backpressure
+    )
+    return SinkDispatch(
+        queue_size=settings.event_bus_queue_size,
+        workers=settings.event_bus_queue_workers,
+        backpressure=BackpressurePolicy(backpressure),
+    )
+
+
 class EventBus:
     """
     异步事件总线 - 单例模式
@@ -32,6 +218,7 @@ class EventBus:
     - 编程式注册消费者
     - 异步并发分发消息
     - 自动错误隔离和日志记录
+    - 可选的每 handler 有界队列分发（EVENT_BUS_QUEUE_ENABLED=true）
 
     为什么需要消息总线？
     1. **解耦**：平台模块之间不直接依赖，通过总线通信
@@ -55,25 +242,58 @@ class EventBus:
             return
 
         self._handlers: List[MessageHandler] = []
+        self._queues: Dict[MessageHandler, _SinkQueue] = {}
+        self._sinks: Dict[MessageHandler, str] = {}
+        self._outbox: Optional[OutboxStore] = None
         self._initialized = True
         logger.info("EventBus initialized")
 
-    def register(self, handler: MessageHandler) -> None:
+    def register(
+        self,
+        handler: MessageHandler,
+        dispatch: Optional[SinkDispatch] = None,
+        sink: Optional[str] = None,
+    ) -> None:
         """
         注册消息处理器
 
         用法示例：
         ```python
         bus.register(client.handle_message)
+        bus.register(client.handle_message, SinkDispatch(queue_size=50))
+        bus.register(client.handle_message, sink="fanfou")
         ```
 
         Args:
             handler: 异步消息处理函数
+            dispatch: 队列分发配置；为 None 时按 EVENT_BUS_QUEUE_* 配置决定，
+                未启用队列模式则在 publish 中直接并发调用
+            sink: Sink 平台名称（与 sink_results.sink_platform 一致）；
+                设置后该 handler 的投递会记录到 outbox，重启后可恢复
         """
-        if handler not in self._handlers:
-            self._handlers.append(handler)
+        if handler in self._handlers:
+            return
+
+        self._handlers.append(handler)
+        if sink:
+            self._sinks[handler] = sink
+        dispatch = dispatch or _default_dispatch(handler)
+        if dispatch:
+            self._queues[handler] = _SinkQueue(
+                handler, dispatch, self._deliver, self._mark_abandoned
+            )
+            logger.info(
+                f"Registered queued event handler: {_handler_key(handler)} "
+                f"(queue_size={dispatch.queue_size}, workers={dispatch.workers}, "
+                f"backpressure={dispatch.backpressure.value})"
+            )
+        else:
             logger.info(f"Registered event handler: {_handler_name(handler)}")
 
+    def set_outbox(self, outbox: Optional[OutboxStore]) -> None:
+        """设置持久化 outbox，None 表示关闭"""
+        self._outbox = outbox
+
     async def publish(self, message: UnifiedMessage) -> None:
         """
         发布消息到所有订阅者
@@ -82,6 +302,11 @@ class EventBus:
         - return_exceptions=True: 单个处理器异常不会中断其他处理器
         - 并发执行：所有处理器同时开始处理，提高吞吐量
 
+        队列模式的处理器只做入队，publish 不等待其处理完成，
+        因此 Source 的发布延迟与慢 Sink 无关。
+
+        设置了 outbox 时，分发前先把每个具名 Sink 记录为待投递。
+
         Args:
             message: 统一消息对象
         """
@@ -94,10 +319,64 @@ class EventBus:
             f"to {len(self._handlers)} handlers"
         )
 
+        bus_metrics.record_published()
+        with (
+            tracer.trace(message.event_id),
+            tracer.span("bus.publish", source=str(message.source), handlers=len(self._handlers)),
+        ):
+            await self._record_pending(message)
+            await self._dispatch(message, list(self._handlers))
+
+    async def redeliver(self, message: UnifiedMessage, sinks: List[str]) -> List[str]:
+        """
+        重新投递消息到指定的 Sink（用于重启后恢复 outbox 中的待投递记录）
+
+        Returns:
+            实际找到 handler 并已分发的 Sink 名称列表
+        """
+        handlers = [h for h in self._handlers if self._sinks.get(h) in sinks]
+        if handlers:
+            await self._dispatch(message, handlers)
+        return [self._sinks[h] for h in handlers]
+
+    async def _record_pending(self, message: UnifiedMessage) -> None:
+        if self._outbox is None or message.command:
+            return
+
+        sinks = [self._sinks[h] for h in self._handlers if h in self._sinks]
+        if not sinks:
+            return
+
+        try:
+            await self._outbox.add_pending_deliveries(message, sinks)
+        except Exception as e:
+            logger.error(f"Failed to record outbox entries for {message.event_id}: {e}")
+
+    async def _dispatch(self, message: UnifiedMessage, handlers: List[MessageHandler]) -> None:
+        # 队列模式：按背压策略入队，由各自的 worker 处理
+        enqueued_count = 0
+        rejected_count = 0
+        for handler in handlers:
+            sink_queue = self._queues.get(handler)
+            if sink_queue is None:
+                continue
+            if await sink_queue.put(message):
+                enqueued_count += 1
+            else:
+                rejected_count += 1
+
+        direct_handlers = [h for h in handlers if h not in self._queues]
+        if not direct_handlers:
+            logger.info(
+                f"Message {message.event_id} enqueued: "
+                f"{enqueued_count} enqueued, {rejected_count} rejected"
+            )
+            return
+
         # 并发分发消息到所有处理器
         # return_exceptions=True 确保单个处理器报错不影响其他处理器
         results = await asyncio.gather(
-            *[self._safe_handle(handler, message) for handler in self._handlers],
+            *[self._deliver(handler, message) for handler in direct_handlers],
             return_exceptions=True,
         )
 
@@ -105,10 +384,54 @@ class EventBus:
         success_count = sum(1 for r in results if not isinstance(r, Exception))
         error_count = len(results) - success_count
 
-        logger.info(
-            f"Message {message.event_id} distributed: "
-            f"{success_count} succeeded, {error_count} failed"
-        )
+        if self._queues:
+            logger.info(
+                f"Message {message.event_id} distributed: "
+                f"{success_count} succeeded, {error_count} failed, "
+                f"{enqueued_count} enqueued, {rejected_count} rejected"
+            )
+        else:
+            logger.info(
+                f"Message {message.event_id} distributed: "
+                f"{success_count} succeeded, {error_count} failed"
+            )
+
+    async def _deliver(self, handler: MessageHandler, message: UnifiedMessage) -> Any:
+        """
+        执行处理器并在其返回（成功或失败）后标记 outbox 投递完成
+
+        任务被取消（进程退出）时不标记，记录保持待投递，重启后恢复。
+        """
+        try:
+            result = await self._safe_handle(handler, message)
+        except Exception:
+            await self._mark_done(handler, message)
+            raise
+        await self._mark_done(handler, message)
+        return result
+
+    async def _mark_done(self, handler: MessageHandler, message: UnifiedMessage) -> None:
+        sink = self._sinks.get(handler)
+        if self._outbox is None or sink is None or message.command:
+            return
+
+        try:
+            await self._outbox.mark_delivery_done(str(message.event_id), sink)
+        except Exception as e:
+            logger.error(f"Failed to mark outbox entry done for {message.event_id}/{sink}: {e}")
+
+    async def _mark_abandoned(self, handler: MessageHandler, message: UnifiedMessage) -> None:
+        """背压丢弃/拒绝的投递标记为 abandoned，重启时不会重放，保持背压决定"""
+        sink = self._sinks.get(handler)
+        if self._outbox is None or sink is None or message.command:
+            return
+
+        try:
+            await self._outbox.mark_delivery_abandoned(str(message.event_id), sink)
+        except Exception as e:
+            logger.error(
+                f"Failed to mark outbox entry abandoned for {message.event_id}/{sink}: {e}"
+            )
 
     async def _safe_handle(self, handler: MessageHandler, message: UnifiedMessage) -> Any:
         """
@@ -118,6 +441,8 @@ class EventBus:
         - 统一的异常处理和日志记录
         - 方便追踪哪个处理器出错了
         - 避免单个处理器的错误影响整体流程
+        - 记录每个处理器的耗时、并发数和成功/失败次数（见 app/core/metrics.py）
+        - 在消息的 trace 中记录处理器 span，Sink 内部的 span 挂在其下
 
         Args:
             handler: 消息处理器
@@ -127,9 +452,15 @@ class EventBus:
             处理器的返回值，或抛出异常
         """
         handler_name = _handler_name(handler)
+        metrics_key = _handler_key(handler)
+        bus_metrics.handler_started(metrics_key)
+        started = time.perf_counter()
+        success = False
         try:
             logger.debug(f"Handler {handler_name} processing message {message.event_id}")
-            result = await handler(message)
+            with tracer.trace(message.event_id), tracer.span(f"handler {metrics_key}"):
+                result = await handler(message)
+            success = True
             logger.debug(f"Handler {handler_name} completed for message {message.event_id}")
             return result
         except Exception as e:
@@ -139,14 +470,41 @@ class EventBus:
                 exc_info=True,
             )
             raise
+        finally:
+            bus_metrics.handler_finished(metrics_key, time.perf_counter() - started, success)
 
     def get_handler_count(self) -> int:
         """获取已注册的处理器数量"""
         return len(self._handlers)
 
+    def get_queue_depths(self) -> Dict[str, int]:
+        """获取队列模式 handler 当前的队列积压数量"""
+        return {sink_queue.name: sink_queue.qsize() for sink_queue in self._queues.values()}
+
+    def get_queue_drops(self) -> Dict[str, tuple[int, int]]:
+        """获取队列模式 handler 因背压丢弃/拒绝的消息数 (dropped, rejected)"""
+        return {
+            sink_queue.name: (sink_queue.dropped, sink_queue.rejected)
+            for sink_queue in self._queues.values()
+        }
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        停止队列 worker
+
+        先等待已入队的消息处理完毕（每个队列最多 timeout 秒），再取消 worker。
+        """
+        for sink_queue in list(self._queues.values()):
+            await sink_queue.drain(timeout)
+
     def clear_handlers(self) -> None:
         """清除所有处理器（主要用于测试）"""
+        for sink_queue in self._queues.values():
+            sink_queue.cancel()
+        self._queues.clear()
+        self._sinks.clear()
         self._handlers.clear()
+        self._outbox = None
         logger.warning("All event handlers cleared")
 
 
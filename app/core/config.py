@@ -35,6 +35,15 @@ class Settings(BaseSettings):
     feishu_enabled: bool = Field(default=False, description="是否启用飞书集成")
     feishu_app_id: str = Field(default="", description="飞书应用 App ID")
     feishu_app_secret: str = Field(default="", description="飞书应用 App Secret")
+    feishu_ingest_workers: int = Field(
+        default=4, description="飞书消息接入线程数（下载/压缩图片），不同会话并发处理"
+    )
+    feishu_image_download_workers: int = Field(
+        default=4, description="飞书多图富文本消息并发下载图片的线程数"
+    )
+    feishu_ingest_queue_size: int = Field(
+        default=100, description="飞书接入管线最多积压的消息数，超出时提示用户稍后重试"
+    )
 
     # ===== Telegram 配置 =====
     telegram_enabled: bool = Field(default=False, description="是否启用 Telegram 集成")
@@ -43,6 +52,29 @@ class Settings(BaseSettings):
     telegram_proxy: str = Field(
         default="", description="Telegram 代理地址，如 http://127.0.0.1:7897"
     )
+    telegram_webhook_url: str = Field(
+        default="",
+        description="Telegram webhook 公网 HTTPS 地址（/webhook/telegram），为空时使用 polling",
+    )
+    telegram_webhook_secret: str = Field(
+        default="",
+        description="Telegram webhook secret token（A-Z a-z 0-9 _ -），为空时每次启动随机生成",
+    )
+    telegram_photo_target_dimension: int = Field(
+        default=1280,
+        description="Telegram 照片下载尺寸：取最长边不小于该值的最小版本（像素）",
+    )
+    telegram_media_group_window: float = Field(
+        default=1.0,
+        description="Telegram 相册聚合窗口：最后一张到达后等待的秒数",
+    )
+    telegram_max_download_mb: float = Field(
+        default=20.0, description="Telegram 单个图片文件下载上限（MB，Bot API 限制为 20MB）"
+    )
+    telegram_api_server: str = Field(
+        default="",
+        description="自建 Telegram Bot API 服务地址，如 http://127.0.0.1:8081，为空时使用官方服务",
+    )
 
     # ===== Fanfou 配置 =====
     fanfou_enabled: bool = Field(default=False, description="是否启用 Fanfou 集成")
@@ -64,6 +96,12 @@ class Settings(BaseSettings):
         default="public",
         description="Mastodon 发帖可见性: public/unlisted/private/direct",
     )
+    mastodon_media_poll_interval: float = Field(
+        default=0.5, description="媒体上传返回 202 后首次查询处理状态的间隔（秒），之后指数增长"
+    )
+    mastodon_media_poll_timeout: float = Field(
+        default=60.0, description="等待 Mastodon 媒体处理完成的最长时间（秒）"
+    )
 
     # ===== Threads 配置 =====
     threads_enabled: bool = Field(default=False, description="是否启用 Threads 集成")
@@ -81,6 +119,18 @@ class Settings(BaseSettings):
         default=7,
         description="Threads token 提前刷新窗口（天）",
     )
+    threads_container_poll_initial_interval: float = Field(
+        default=0.5,
+        description="Threads 容器状态首次未就绪后的轮询间隔（秒），之后指数增长",
+    )
+    threads_container_poll_max_interval: float = Field(
+        default=5.0,
+        description="Threads 容器状态轮询的最大间隔（秒）",
+    )
+    threads_container_poll_timeout: float = Field(
+        default=30.0,
+        description="等待 Threads 容器处理完成的最长时间（秒）",
+    )
 
     # ===== Bluesky 配置 =====
     bluesky_enabled: bool = Field(default=False, description="是否启用 Bluesky 集成")
@@ -93,10 +143,154 @@ class Settings(BaseSettings):
         description="Bluesky 登录标识，通常为 handle 或邮箱",
     )
     bluesky_app_password: str = Field(default="", description="Bluesky app password")
+    bluesky_handle_cache_ttl: float = Field(
+        default=21600.0,
+        description="@提及 handle → DID 解析结果的缓存时间（秒），缓存持久化到 SQLite",
+    )
+    bluesky_handle_negative_ttl: float = Field(
+        default=600.0,
+        description="无法解析的 handle 的缓存时间（秒），期间不再重复请求",
+    )
+    bluesky_handle_cache_size: int = Field(
+        default=2048,
+        description="内存中缓存的 handle 数量上限（超出时淘汰最久未使用的）",
+    )
+
+    # ===== 长文拆分配置 =====
+    long_text_threading_enabled: bool = Field(
+        default=True, description="超过平台字数限制的文本是否拆分为回复串发布（否则拒绝发送）"
+    )
+    long_text_max_posts: int = Field(default=10, description="一条长文最多拆分的条数，超出则拒绝")
+    long_text_numbering: bool = Field(
+        default=True, description='是否在拆分后的每条末尾追加 " (序号/总数)"'
+    )
+
+    # ===== EventBus 配置 =====
+    event_bus_queue_enabled: bool = Field(
+        default=False,
+        description="是否启用队列分发模式：每个 handler 独立的有界队列和 worker",
+    )
+    event_bus_queue_size: int = Field(default=100, description="每个 handler 的队列容量")
+    event_bus_queue_workers: int = Field(default=1, description="每个 handler 的 worker 数量")
+    event_bus_backpressure: str = Field(
+        default="block",
+        description="队列满时的默认背压策略: block/drop_oldest/reject",
+    )
+    event_bus_sink_backpressure: dict[str, str] = Field(
+        default_factory=dict,
+        description='按 handler 覆盖背压策略，如 {"ThreadsClient.handle_message": "drop_oldest"}',
+    )
+
+    # ===== HTTP 连接池配置 =====
+    http_timeout: float = Field(default=20.0, description="Sink HTTP 请求默认超时（秒）")
+    http_connect_timeout: float = Field(default=10.0, description="建立连接超时（秒）")
+    http_max_connections: int = Field(default=20, description="每个平台的最大连接数")
+    http_max_keepalive_connections: int = Field(
+        default=10, description="每个平台保持的 keep-alive 连接数"
+    )
+    http_keepalive_expiry: float = Field(default=60.0, description="空闲连接保持时间（秒）")
+    http2_enabled: bool = Field(
+        default=False, description="是否启用 HTTP/2（需要安装 httpx[http2]）"
+    )
+
+    # ===== Sink 限流配置 =====
+    rate_limit_enabled: bool = Field(
+        default=True, description="是否启用按平台的令牌桶限流（根据响应头自适应）"
+    )
+    rate_limit_per_minute: dict[str, float] = Field(
+        default_factory=lambda: {
+            "fanfou": 30,
+            "mastodon": 60,
+            "threads": 60,
+            "bluesky": 30,
+            "telegram": 20,
+        },
+        description='各平台每分钟写请求数上限（GET 不计入），如 {"mastodon": 60, "telegram": 20}',
+    )
+    rate_limit_default_per_minute: float = Field(
+        default=60, description="未在 rate_limit_per_minute 中配置的平台的每分钟请求数"
+    )
+    rate_limit_burst: int = Field(default=5, description="令牌桶容量（允许的突发请求数）")
+    rate_limit_max_wait: float = Field(
+        default=120.0, description="单个请求等待令牌的最长时间（秒），超出则放弃，0 表示不限"
+    )
+
+    # ===== Sink 容错配置 =====
+    retry_max_attempts: int = Field(default=3, description="Sink 调用最大尝试次数（含首次）")
+    retry_backoff_base: float = Field(default=0.5, description="指数退避基数（秒），带随机抖动")
+    retry_backoff_max: float = Field(default=8.0, description="单次退避等待上限（秒）")
+    retry_budget_ratio: float = Field(
+        default=0.2, description="重试预算：每个请求允许的重试比例（按主机统计）"
+    )
+    retry_budget_per_minute: float = Field(
+        default=10.0, description="重试预算：每个主机每分钟的保底重试次数"
+    )
+    circuit_breaker_failure_threshold: int = Field(
+        default=5, description="连续失败多少次后打开熔断器（按主机）"
+    )
+    circuit_breaker_recovery_timeout: float = Field(
+        default=30.0, description="熔断器打开后的冷却时间（秒），之后放行一个探测请求"
+    )
+
+    # ===== 消息追踪配置 =====
+    tracing_enabled: bool = Field(
+        default=True, description="是否记录消息处理各阶段的 span（写入 SQLite spans 表）"
+    )
+    tracing_flush_interval: float = Field(default=1.0, description="span 批量写入间隔（秒）")
+    tracing_retention_days: float = Field(
+        default=3.0, description="span 保留天数，过期的由数据库定期清理任务删除"
+    )
+
+    # ===== 图片处理配置 =====
+    image_workers: int = Field(
+        default=2,
+        description="图片处理进程池大小，0 表示不使用进程池（在线程中处理）",
+    )
+    image_max_size_mb: float = Field(
+        default=2.0,
+        description="Source 图片压缩上限（MB），Sink 上传为流式，可按目标平台限制调高",
+    )
+    image_cache_memory_mb: int = Field(default=64, description="图片变体内存缓存容量（MB）")
+    image_cache_dir: str = Field(
+        default="./data/images/variants",
+        description="图片变体磁盘缓存目录，留空则只使用内存缓存",
+    )
+    image_cache_disk_mb: int = Field(
+        default=1024,
+        description="图片变体磁盘缓存容量（MB），超出时删除最久未用的文件，0 表示不限制",
+    )
+    media_upload_concurrency: dict[str, int] = Field(
+        default_factory=lambda: {"mastodon": 4, "bluesky": 4, "threads": 4},
+        description='各 Sink 同时进行的媒体上传数，如 {"mastodon": 4, "bluesky": 2}',
+    )
+    media_upload_default_concurrency: int = Field(
+        default=3, description="未在 media_upload_concurrency 中配置的 Sink 的并发上传数"
+    )
 
     # ===== 数据库配置 =====
     database_enabled: bool = Field(default=True, description="是否启用数据库存储")
     database_path: str = Field(default="./data/messages.db", description="SQLite 数据库文件路径")
+    database_wal_enabled: bool = Field(
+        default=True, description="启用 WAL 日志模式（读写互不阻塞，支持只读连接池）"
+    )
+    database_read_pool_size: int = Field(
+        default=2, description="只读连接池大小（仅 WAL 模式生效），0 表示读写共用一个连接"
+    )
+    database_synchronous: str = Field(
+        default="NORMAL", description="PRAGMA synchronous（WAL 模式下 NORMAL 可安全使用）"
+    )
+    database_cache_size_kb: int = Field(default=8192, description="每个连接的页缓存大小（KB）")
+    database_mmap_size_mb: int = Field(default=64, description="每个连接的 mmap 大小（MB）")
+    database_batch_size: int = Field(default=64, description="批量提交：单个事务最多合并的写操作数")
+    database_batch_delay_ms: float = Field(
+        default=5.0, description="批量提交：第一个写操作最多等待的毫秒数，0 表示立即提交"
+    )
+    database_prune_interval: float = Field(
+        default=3600.0, description="历史记录清理间隔（秒），0 表示不清理"
+    )
+    outbox_retention_days: float = Field(
+        default=7.0, description="已完成 / 已放弃的 outbox 记录保留天数"
+    )
 
     # ===== 日志配置 =====
     log_level: str = Field(default="INFO", description="日志级别")
@@ -0,0 +1,128 @@
+"""
+Shared HTTP Client Pool
+共享 HTTP 连接池 - 各 Sink 平台复用 httpx.AsyncClient
+
+为什么需要连接池？
+每次 `async with httpx.AsyncClient()` 都会重新建立 TCP + TLS 连接，
+Threads 发一条图片帖就要 4+ 次请求。按平台复用客户端后，
+同一主机的后续请求直接走 keep-alive 连接，省去握手开销。
+
+每个平台客户端的传输层挂有令牌桶限流（见 app/core/ratelimit.py）。
+"""
+
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, ClassVar, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.core.ratelimit import RateLimitedTransport
+from app.core.tracing import TracingTransport
+
+
+def _http2_available() -> bool:
+    """HTTP/2 依赖可选的 h2 包（httpx[http2]）"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """
+    HTTP 客户端注册表（单例）
+
+    每个平台一个 httpx.AsyncClient，共享连接上限、keep-alive 和超时配置。
+    在 lifespan 中创建，关闭时统一释放连接。
+    """
+
+    _instance: ClassVar[Optional["HttpClientPool"]] = None
+
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(
+            settings.http_timeout,
+            connect=settings.http_connect_timeout,
+        )
+        self._http2 = settings.http2_enabled
+        if self._http2 and not _http2_available():
+            logger.warning("HTTP/2 enabled but 'h2' package is not installed, using HTTP/1.1")
+            self._http2 = False
+
+    def get(self, platform: str) -> httpx.AsyncClient:
+        """获取平台对应的共享客户端，首次使用时创建"""
+        client = self._clients.get(platform)
+        if client is None or client.is_closed:
+            transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+                http2=self._http2,
+                limits=self._limits,
+            )
+            if settings.rate_limit_enabled:
+                transport = RateLimitedTransport(platform, transport)
+            # 最外层记录 span，耗时包含限流等待
+            transport = TracingTransport(platform, transport)
+            client = httpx.AsyncClient(transport=transport, timeout=self._timeout)
+            self._clients[platform] = client
+            logger.debug(f"HTTP client created for '{platform}' (http2={self._http2})")
+        return client
+
+    async def close(self) -> None:
+        """关闭所有客户端并释放连接"""
+        for platform, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing HTTP client for '{platform}': {e}")
+        self._clients.clear()
+        logger.info("HTTP client pool closed")
+
+    @classmethod
+    def get_instance(cls) -> Optional["HttpClientPool"]:
+        return cls._instance
+
+    @classmethod
+    def create_instance(cls) -> "HttpClientPool":
+        if cls._instance is not None:
+            raise RuntimeError("HttpClientPool instance already exists")
+        cls._instance = cls()
+        logger.info("HttpClientPool initialized")
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        cls._instance = None
+
+
+def get_http_client(platform: str) -> Optional[httpx.AsyncClient]:
+    """获取平台共享客户端；连接池未初始化时返回 None"""
+    pool = HttpClientPool.get_instance()
+    if pool is None:
+        return None
+    return pool.get(platform)
+
+
+@asynccontextmanager
+async def http_client(platform: str) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    借用平台共享客户端
+
+    连接池未初始化（如单元测试、脚本直接调用）时退化为一次性客户端。
+    需要不同超时的请求应在请求方法上传入 timeout 参数。
+
+    用法示例：
+    ```python
+    async with http_client("threads") as client:
+        response = await client.get(url)
+    ```
+    """
+    client = get_http_client(platform)
+    if client is not None:
+        yield client
+        return
+
+    async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
+        yield client
@@ -0,0 +1,232 @@
+"""
+Event Bus Metrics
+事件总线指标 - 每个 handler 的延迟直方图、并发数、成功/失败计数
+
+为什么需要指标？
+日志只能逐条看，无法回答"哪个 Sink 是瓶颈"。EventBus 在每次调用 handler 时记录：
+- 处理耗时：Prometheus 直方图（累积 bucket）+ 最近 N 次的 p50/p95/p99
+- 正在处理的消息数（in-flight gauge）
+- 成功/失败次数
+队列深度和丢弃/拒绝次数在导出时从 EventBus 读取。
+
+/metrics 以 Prometheus 文本格式导出，/stats 返回 JSON 摘要。
+"""
+
+import bisect
+import threading
+from collections import deque
+from typing import Iterable, Optional
+
+# 默认 bucket 上界（秒）：覆盖本地 handler 的毫秒级到慢 Sink 的几十秒
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """累积 bucket 直方图，另保留最近 window 个样本用于计算分位数"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, window: int = 1024):
+        self.buckets = tuple(sorted(buckets))
+        # 最后一个为 +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self._samples.append(value)
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """返回 [(le, 累积计数)]，最后一项 le 为 +Inf"""
+        result = []
+        running = 0
+        for bound, count in zip((*map(_format_float, self.buckets), "+Inf"), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q: float) -> float:
+        samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class HandlerMetrics:
+    """单个 handler 的指标"""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "p50_ms": round(self.latency.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.latency.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.latency.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.latency.max * 1000, 3),
+        }
+
+
+class BusMetrics:
+    """
+    EventBus 指标注册表
+
+    handler 在事件循环中调用，但 /metrics 可能在其他线程渲染（如测试客户端），
+    读写统一加锁。
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, HandlerMetrics] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def _get(self, handler: str) -> HandlerMetrics:
+        metrics = self._handlers.get(handler)
+        if metrics is None:
+            metrics = self._handlers[handler] = HandlerMetrics()
+        return metrics
+
+    def record_published(self) -> None:
+        with self._lock:
+            self.published += 1
+
+    def handler_started(self, handler: str) -> None:
+        with self._lock:
+            self._get(handler).in_flight += 1
+
+    def handler_finished(self, handler: str, elapsed: float, success: bool) -> None:
+        with self._lock:
+            metrics = self._get(handler)
+            metrics.in_flight -= 1
+            metrics.latency.observe(elapsed)
+            if success:
+                metrics.succeeded += 1
+            else:
+                metrics.failed += 1
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {name: metrics.snapshot() for name, metrics in self._handlers.items()}
+
+    def render_prometheus(
+        self,
+        queue_depths: Optional[dict[str, int]] = None,
+        queue_drops: Optional[dict[str, tuple[int, int]]] = None,
+    ) -> str:
+        """
+        导出 Prometheus 文本格式（exposition format 0.0.4）
+
+        Args:
+            queue_depths: handler -> 当前队列积压
+            queue_drops: handler -> (dropped, rejected)
+        """
+        lines: list[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            header("gateway_messages_published_total", "counter", "Messages published to the bus")
+            lines.append(f"gateway_messages_published_total {self.published}")
+
+            handlers = sorted(self._handlers.items())
+            header(
+                "gateway_handler_duration_seconds",
+                "histogram",
+                "Handler processing time in seconds",
+            )
+            for name, metrics in handlers:
+                label = _label(name)
+                for bound, count in metrics.latency.cumulative():
+                    lines.append(
+                        f'gateway_handler_duration_seconds_bucket{{handler="{label}",le="{bound}"}}'
+                        f" {count}"
+                    )
+                lines.append(
+                    f'gateway_handler_duration_seconds_sum{{handler="{label}"}} '
+                    f"{_format_float(metrics.latency.sum)}"
+                )
+                lines.append(
+                    f'gateway_handler_duration_seconds_count{{handler="{label}"}} '
+                    f"{metrics.latency.count}"
+                )
+
+            header("gateway_handler_in_flight", "gauge", "Messages currently being handled")
+            for name, metrics in handlers:
+                lines.append(
+                    f'gateway_handler_in_flight{{handler="{_label(name)}"}} {metrics.in_flight}'
+                )
+
+            header("gateway_handler_messages_total", "counter", "Handled messages by outcome")
+            for name, metrics in handlers:
+                label = _label(name)
+                lines.append(
+                    f'gateway_handler_messages_total{{handler="{label}",outcome="success"}} '
+                    f"{metrics.succeeded}"
+                )
+                lines.append(
+                    f'gateway_handler_messages_total{{handler="{label}",outcome="failure"}} '
+                    f"{metrics.failed}"
+                )
+
+        if queue_depths is not None:
+            header("gateway_queue_depth", "gauge", "Messages waiting in a handler queue")
+            for name, depth in sorted(queue_depths.items()):
+                lines.append(f'gateway_queue_depth{{handler="{_label(name)}"}} {depth}')
+
+        if queue_drops is not None:
+            header("gateway_queue_dropped_total", "counter", "Messages dropped by backpressure")
+            for name, (dropped, rejected) in sorted(queue_drops.items()):
+                label = _label(name)
+                lines.append(
+                    f'gateway_queue_dropped_total{{handler="{label}",reason="drop_oldest"}} '
+                    f"{dropped}"
+                )
+                lines.append(
+                    f'gateway_queue_dropped_total{{handler="{label}",reason="reject"}} {rejected}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._handlers.clear()
+            self.published = 0
+
+
+def _label(value: str) -> str:
+    """转义 Prometheus label 值"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+# 全局单例
+bus_metrics = BusMetrics()
@@ -0,0 +1,240 @@
+"""
+Per-Platform Rate Limiter
+按平台的令牌桶限流 - 根据响应头自适应
+
+为什么需要限流？
+突发消息到来时各 Sink 会同时打满平台 API，得到 429 后再各自重试。
+令牌桶把请求平滑到配额以内；平台返回的 X-RateLimit-* / RateLimit-* /
+Retry-After 响应头会实时收紧（或恢复）发送速率。
+
+只对写请求（发帖、上传媒体等）限流：读取和轮询类请求（GET，如媒体处理状态、
+handle 解析）不占用令牌，避免挤掉发帖配额、拖慢并行上传；它们的响应头仍会反馈给令牌桶。
+
+使用方式：
+- httpx 平台：HttpClientPool 为每个平台的客户端挂上 RateLimitedTransport，自动生效
+- 其他 SDK（如 aiogram）：发送前 await rate_limiter.acquire("telegram")
+"""
+
+import asyncio
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+# 根据响应头推算速率时保留的余量，保持在配额之下
+HEADER_RATE_SAFETY = 0.9
+# 自适应速率下限（每秒令牌数），避免长时间完全停止
+MIN_RATE = 1 / 60
+# 不占用令牌的只读方法
+UNTHROTTLED_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class RateLimitExceeded(httpx.TransportError):
+    """
+    等待令牌的时间超过上限
+
+    在 httpx 传输层抛出，继承 TransportError，只捕获传输错误的 Sink 代码也能按请求失败处理；
+    请求没有发出，容错层不会重试，也不计入熔断。
+    """
+
+    def __init__(self, platform: str, wait: float):
+        super().__init__(f"Rate limit for '{platform}' requires waiting {wait:.1f}s")
+        self.platform = platform
+        self.wait = wait
+
+
+def _parse_reset(value: str, now: float) -> Optional[float]:
+    """把 reset 头解析为距现在的秒数：支持 epoch 秒、相对秒数、ISO 8601 和 HTTP-date"""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        pass
+    else:
+        # 大于 10 亿视为 epoch 秒，否则为相对秒数
+        return max(0.0, number - now) if number > 1e9 else max(0.0, number)
+
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (ValueError, TypeError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    return max(0.0, moment.timestamp() - now)
+
+
+def _header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class TokenBucket:
+    """
+    令牌桶（不依赖事件循环锁）
+
+    令牌可以透支为负数：每个等待者预约下一个令牌产生的时间点，
+    并发调用按到达顺序错开，不需要 asyncio.Lock。
+    """
+
+    def __init__(self, platform: str, rate_per_minute: float, burst: int):
+        self.platform = platform
+        self.configured_rate = max(rate_per_minute / 60, MIN_RATE)
+        self.rate = self.configured_rate
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """预约一个令牌，返回需要等待的秒数；超过 max_wait 时不预约并抛出异常"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, (1 - self.tokens) / self.rate, self.blocked_until - now)
+        if max_wait is not None and wait > max_wait:
+            raise RateLimitExceeded(self.platform, wait)
+        self.tokens -= 1
+        return wait
+
+    def refund(self) -> None:
+        """归还预约但没有使用的令牌"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            logger.debug(f"Rate limiter delaying '{self.platform}' request by {wait:.2f}s")
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                # 等待被取消（调用方超时、关闭）时请求不会发出，令牌还给后面的请求
+                self.refund()
+                raise
+
+    def pause(self, seconds: float) -> None:
+        """平台要求暂停（Retry-After）"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + max(0.0, seconds))
+        logger.warning(f"Rate limiter pausing '{self.platform}' for {seconds:.1f}s")
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """根据响应状态码和响应头调整速率"""
+        now_wall = time.time()
+        retry_after = _header(headers, "retry-after", "Retry-After")
+        if retry_after is not None and status_code in (429, 503):
+            seconds = _parse_reset(retry_after, now_wall)
+            if seconds is not None:
+                self.pause(seconds)
+        elif status_code == 429:
+            self.pause(max(1.0, 1 / self.rate))
+
+        remaining_raw = _header(
+            headers, "x-ratelimit-remaining", "ratelimit-remaining", "X-RateLimit-Remaining"
+        )
+        reset_raw = _header(headers, "x-ratelimit-reset", "ratelimit-reset", "X-RateLimit-Reset")
+        if remaining_raw is None:
+            return
+        try:
+            remaining = float(remaining_raw)
+        except ValueError:
+            return
+
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+        reset_in = _parse_reset(reset_raw, now_wall) if reset_raw else None
+        if reset_in is None or reset_in <= 0:
+            return
+        if remaining <= 0:
+            self.pause(reset_in)
+            return
+        # 把剩余配额均匀分布到重置前，且不超过配置的速率
+        target = remaining * HEADER_RATE_SAFETY / reset_in
+        self.rate = min(self.configured_rate, max(target, MIN_RATE))
+
+
+class RateLimiter:
+    """各平台令牌桶的注册表（按配置懒创建）"""
+
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.rate_limit_enabled
+
+    def bucket(self, platform: str) -> TokenBucket:
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            per_minute = settings.rate_limit_per_minute.get(
+                platform, settings.rate_limit_default_per_minute
+            )
+            bucket = TokenBucket(platform, per_minute, settings.rate_limit_burst)
+            self._buckets[platform] = bucket
+        return bucket
+
+    async def acquire(self, platform: str) -> None:
+        """发送前获取令牌；限流关闭时立即返回"""
+        if not self.enabled:
+            return
+        max_wait = settings.rate_limit_max_wait
+        await self.bucket(platform).acquire(max_wait if max_wait > 0 else None)
+
+    def observe(self, platform: str, status_code: int, headers: Mapping[str, str]) -> None:
+        if self.enabled:
+            self.bucket(platform).observe(status_code, headers)
+
+    def pause(self, platform: str, seconds: float) -> None:
+        if self.enabled:
+            self.bucket(platform).pause(seconds)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        now = time.monotonic()
+        return {
+            platform: {
+                "rate_per_minute": round(bucket.rate * 60, 3),
+                "tokens": round(bucket.tokens, 3),
+                "blocked_for": round(max(0.0, bucket.blocked_until - now), 3),
+            }
+            for platform, bucket in self._buckets.items()
+        }
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """在 httpx 传输层对写请求限流，并把所有响应的响应头反馈给令牌桶"""
+
+    def __init__(self, platform: str, transport: httpx.AsyncBaseTransport):
+        self.platform = platform
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in UNTHROTTLED_METHODS:
+            await rate_limiter.acquire(self.platform)
+        response = await self._transport.handle_async_request(request)
+        rate_limiter.observe(self.platform, response.status_code, response.headers)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# 全局单例
+rate_limiter = RateLimiter()
@@ -0,0 +1,332 @@
+"""
+Sink Call Resilience
+Sink 调用容错层 - 抖动退避重试 + 重试预算 + 按主机熔断
+
+为什么需要统一的容错层？
+以前只有 Threads / Bluesky 各自实现了重试，其他 Sink 遇到第一个错误就失败；
+平台宕机时每次发送都要等满 HTTP 超时，占住 EventBus worker。
+
+- 退避：指数退避 + full jitter，避免多个 Sink 同时重试形成尖峰
+- 重试预算：重试次数不超过正常请求数的一定比例（外加每分钟少量保底），
+  平台持续异常时不会因重试把流量放大数倍
+- 熔断：同一主机连续失败达到阈值后打开熔断器，期间直接抛出 CircuitOpenError；
+  冷却结束后放行一个探测请求，成功则恢复
+
+用法示例：
+```python
+response = await resilience.call(
+    "graph.threads.net",
+    lambda: client.post(url, data=data),
+    name="Threads create container",
+)
+```
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.core.ratelimit import RateLimitExceeded
+from app.core.tracing import ActiveSpan, tracer
+
+T = TypeVar("T")
+
+TRANSIENT_STATUS_CODES = frozenset({502, 503, 504})
+# 默认可重试的异常：超时、连接失败等传输层错误
+RETRYABLE_EXCEPTIONS: tuple[type[BaseException], ...] = (httpx.TransportError,)
+# 请求确定没有发出的异常：非幂等请求（发帖）只有遇到这些错误才能安全重试
+UNSENT_EXCEPTIONS: tuple[type[BaseException], ...] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求未发送"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for '{host}', retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def host_of(url: str) -> str:
+    """从 URL 提取主机名，作为熔断器的 key"""
+    return urlparse(url).netloc or url
+
+
+def is_transient_response(response: httpx.Response) -> bool:
+    """默认的瞬时失败判断：网关错误 / 服务不可用"""
+    return response.status_code in TRANSIENT_STATUS_CODES
+
+
+def is_unsent_error(error: BaseException) -> bool:
+    """异常是否发生在请求发出之前（连接失败、等待连接超时）"""
+    return isinstance(error, UNSENT_EXCEPTIONS)
+
+
+def backoff_delay(retry: int, base: float, cap: float) -> float:
+    """第 retry 次重试（从 0 开始）前的等待时间：指数退避 + full jitter"""
+    return random.uniform(0, min(cap, base * (2**retry)))
+
+
+class RetryBudget:
+    """
+    重试预算
+
+    每个正常请求存入 ratio 个令牌，每次重试取出 1 个；
+    另外按 per_minute 的速度补充保底令牌，低流量时也能重试。
+    """
+
+    def __init__(self, ratio: float, per_minute: float):
+        self.ratio = max(0.0, ratio)
+        self.per_minute = max(0.0, per_minute)
+        self.capacity = max(1.0, self.per_minute)
+        self.balance = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(
+            self.capacity, self.balance + (now - self._updated) * self.per_minute / 60
+        )
+        self._updated = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+class CircuitBreaker:
+    """按主机的熔断器：closed -> open -> half_open -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, failure_threshold: int, recovery_timeout: float):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = max(0.0, recovery_timeout)
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.retry_in() <= 0:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """是否放行请求；half_open 状态下同一时间只放行一个探测请求"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """探测请求没有得出结论（非瞬时异常、被取消）时归还探测名额，状态不变"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit for '{self.host}' closed")
+        self._state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(
+                    f"Circuit for '{self.host}' opened after {self.failures} failure(s), "
+                    f"cooling down {self.recovery_timeout:.0f}s"
+                )
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class Resilience:
+    """按主机的熔断器和重试预算注册表（按配置懒创建）"""
+
+    def __init__(self):
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._budgets: dict[str, RetryBudget] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                settings.circuit_breaker_failure_threshold,
+                settings.circuit_breaker_recovery_timeout,
+            )
+            self._breakers[host] = breaker
+        return breaker
+
+    def budget(self, host: str) -> RetryBudget:
+        budget = self._budgets.get(host)
+        if budget is None:
+            budget = RetryBudget(
+                settings.retry_budget_ratio,
+                settings.retry_budget_per_minute,
+            )
+            self._budgets[host] = budget
+        return budget
+
+    async def call(
+        self,
+        host: str,
+        operation: Callable[[], Awaitable[T]],
+        *,
+        name: str = "request",
+        is_transient: Optional[Callable[[T], bool]] = None,
+        retry_on: tuple[type[BaseException], ...] = RETRYABLE_EXCEPTIONS,
+        retry_if: Optional[Callable[[BaseException], bool]] = None,
+        max_attempts: Optional[int] = None,
+    ) -> T:
+        """
+        执行一次 Sink 调用，瞬时失败时退避重试
+
+        Args:
+            host: 熔断器/重试预算的 key（通常为平台 API 主机名）
+            operation: 每次尝试都会重新调用，请求体需可重复构造
+            name: 日志中的操作名
+            is_transient: 判断返回值是否为瞬时失败（默认只看异常）
+            retry_on: 视为瞬时失败的异常类型
+            retry_if: 非幂等请求使用：只重试 retry_if 为真的异常（请求确定未发出），
+                其余瞬时失败和 is_transient 判定的响应只计入熔断，不重试，避免重复发帖
+            max_attempts: 最大尝试次数，默认取配置
+
+        Returns:
+            最后一次尝试的返回值（重试耗尽时可能仍是瞬时失败的响应，由调用方处理）
+
+        Raises:
+            CircuitOpenError: 熔断器打开，请求未发送
+            retry_on 中的异常: 重试耗尽
+        """
+        with tracer.span(name, host=host) as span:
+            return await self._call(
+                host, operation, name, is_transient, retry_on, retry_if, max_attempts, span
+            )
+
+    async def _call(
+        self,
+        host: str,
+        operation: Callable[[], Awaitable[T]],
+        name: str,
+        is_transient: Optional[Callable[[T], bool]],
+        retry_on: tuple[type[BaseException], ...],
+        retry_if: Optional[Callable[[BaseException], bool]],
+        max_attempts: Optional[int],
+        span: ActiveSpan,
+    ) -> T:
+        breaker = self.breaker(host)
+        budget = self.budget(host)
+        attempts = max(1, max_attempts or settings.retry_max_attempts)
+
+        if not breaker.allow():
+            span.set("circuit", breaker.state)
+            raise CircuitOpenError(host, breaker.retry_in())
+        budget.deposit()
+
+        for attempt in range(attempts):
+            span.set("attempts", attempt + 1)
+            try:
+                result = await operation()
+            except RateLimitExceeded:
+                # 本地限流拒绝，请求没有发出：不重试，也不代表主机状态
+                breaker.release_probe()
+                raise
+            except retry_on as e:
+                breaker.record_failure()
+                if retry_if is not None and not retry_if(e):
+                    logger.warning(
+                        f"{name} failed, not retried (request may have been sent): {e!r}"
+                    )
+                    raise
+                if not self._should_retry(host, name, attempt, attempts, f"error={e!r}"):
+                    raise
+            except BaseException:
+                # 非瞬时异常（解析错误、限流、取消等）不代表主机状态，只归还探测名额
+                breaker.release_probe()
+                raise
+            else:
+                if is_transient is None or not is_transient(result):
+                    breaker.record_success()
+                    return result
+                breaker.record_failure()
+                if retry_if is not None or not self._should_retry(
+                    host, name, attempt, attempts, _describe(result)
+                ):
+                    span.set("transient_failure", True)
+                    return result
+
+            await asyncio.sleep(
+                backoff_delay(attempt, settings.retry_backoff_base, settings.retry_backoff_max)
+            )
+            if not breaker.allow():
+                span.set("circuit", breaker.state)
+                raise CircuitOpenError(host, breaker.retry_in())
+
+        raise AssertionError("unreachable")
+
+    def _should_retry(self, host: str, name: str, attempt: int, attempts: int, detail: str) -> bool:
+        if attempt + 1 >= attempts:
+            logger.warning(f"{name} failed after {attempts} attempt(s): {detail}")
+            return False
+        if not self.budget(host).withdraw():
+            logger.warning(f"{name} failed, retry budget for '{host}' exhausted: {detail}")
+            return False
+        logger.warning(f"{name} transient failure (attempt {attempt + 1}/{attempts}): {detail}")
+        return True
+
+    def snapshot(self) -> dict[str, dict[str, float | str]]:
+        return {
+            host: {
+                "state": breaker.state,
+                "failures": breaker.failures,
+                "retry_in": round(breaker.retry_in(), 3),
+                "retry_budget": round(self.budget(host).balance, 3),
+            }
+            for host, breaker in self._breakers.items()
+        }
+
+    def reset(self) -> None:
+        self._breakers.clear()
+        self._budgets.clear()
+
+
+def _describe(result: object) -> str:
+    if isinstance(result, httpx.Response):
+        return f"status_code={result.status_code} body={result.text[:200]}"
+    return repr(result)[:200]
+
+
+# 全局单例
+resilience = Resilience()
@@ -0,0 +1,279 @@
+"""
+Lightweight Message Tracing
+轻量级消息追踪 - 以 UnifiedMessage.event_id 为 trace id 记录各阶段耗时
+
+为什么需要追踪？
+一条飞书图片消息要经过下载、压缩、EventBus、取 Token、创建容器、轮询状态、发布，
+指标只能看到每个 handler 的总耗时，看不出时间花在哪一步。
+
+- trace(): 开启追踪作用域；Source 在消息对象创建前就开始计时，
+  生成消息后调用 bind(event_id)，此前结束的 span 一并归入该 trace
+- span(): 记录一个阶段（同步/异步代码都可使用），父子关系通过 contextvars 传递，
+  asyncio 任务和 asyncio.to_thread 会自动继承；没有活动 trace 时为空操作
+- 结束的 span 先进入内存缓冲，由后台任务批量写入 SQLite（spans 表）
+- /traces/{event_id} 按开始时间返回 span 列表和瀑布图
+
+用法示例：
+```python
+with tracer.trace() as trace:
+    with tracer.span("feishu.download"):
+        ...
+    message = UnifiedMessage(...)
+    trace.bind(message.event_id)
+
+with tracer.trace(message.event_id), tracer.span("threads.publish"):
+    ...
+```
+"""
+
+import asyncio
+import contextvars
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from uuid import UUID
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+SpanExporter = Callable[[list["Span"]], Awaitable[None]]
+
+
+@dataclass
+class Span:
+    """一个已结束的阶段；时间为 epoch 秒"""
+
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_time: float
+    end_time: float
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_time - self.start_time) * 1000
+
+
+class Trace:
+    """追踪作用域；trace_id 可以在创建后再绑定"""
+
+    def __init__(self, tracer: "Tracer", trace_id: Optional[str] = None):
+        self._tracer = tracer
+        self.trace_id = trace_id
+        self._pending: list[Span] = []
+
+    def bind(self, event_id: str | UUID) -> None:
+        """绑定 trace id，并提交绑定前已结束的 span"""
+        self.trace_id = str(event_id)
+        pending, self._pending = self._pending, []
+        for span in pending:
+            span.trace_id = self.trace_id
+            self._tracer.record(span)
+
+    def _finish(self, span: Span) -> None:
+        if self.trace_id is None:
+            self._pending.append(span)
+        else:
+            span.trace_id = self.trace_id
+            self._tracer.record(span)
+
+
+@dataclass(frozen=True)
+class _Scope:
+    trace: Trace
+    span_id: Optional[str] = None
+
+
+_current: contextvars.ContextVar[Optional[_Scope]] = contextvars.ContextVar(
+    "trace_scope", default=None
+)
+
+
+class ActiveSpan:
+    """正在进行的 span，可在结束前补充属性"""
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Tracer:
+    """span 缓冲和导出（按配置懒启用）"""
+
+    def __init__(self, max_buffer: int = 10_000):
+        self._buffer: deque[Span] = deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._exporter: Optional[SpanExporter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.tracing_enabled
+
+    @contextmanager
+    def trace(self, event_id: str | UUID | None = None) -> Iterator[Trace]:
+        """
+        开启追踪作用域；event_id 为空时需要稍后 bind()
+
+        当前作用域已经是同一 trace 时沿用它，新 span 挂在当前 span 之下。
+        """
+        scope = _current.get()
+        if event_id is not None and scope is not None and scope.trace.trace_id == str(event_id):
+            yield scope.trace
+            return
+        trace = Trace(self, str(event_id) if event_id is not None else None)
+        token = _current.set(_Scope(trace))
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def span(
+        self, name: str, start_time: Optional[float] = None, **attributes: Any
+    ) -> Iterator[ActiveSpan]:
+        """
+        记录一个阶段；没有活动 trace 或追踪关闭时只执行代码块
+
+        Args:
+            start_time: 指定开始时间（epoch 秒），用于包含进入代码块前的排队时间
+        """
+        active = ActiveSpan(name, attributes)
+        scope = _current.get()
+        if scope is None or not self.enabled:
+            yield active
+            return
+
+        span_id = secrets.token_hex(8)
+        started = start_time if start_time is not None else time.time()
+        token = _current.set(_Scope(scope.trace, span_id))
+        status = "ok"
+        try:
+            yield active
+        except BaseException as e:
+            status = "error"
+            active.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current.reset(token)
+            scope.trace._finish(
+                Span(
+                    trace_id=scope.trace.trace_id or "",
+                    span_id=span_id,
+                    parent_id=scope.span_id,
+                    name=name,
+                    start_time=started,
+                    end_time=time.time(),
+                    status=status,
+                    attributes=active.attributes,
+                )
+            )
+
+    def current_trace_id(self) -> Optional[str]:
+        scope = _current.get()
+        return scope.trace.trace_id if scope else None
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+
+    def drain(self) -> list[Span]:
+        with self._lock:
+            spans = list(self._buffer)
+            self._buffer.clear()
+        return spans
+
+    def start(self, exporter: SpanExporter) -> None:
+        """设置导出器并启动后台批量导出任务"""
+        self._exporter = exporter
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._exporter = None
+
+    async def flush(self) -> None:
+        """立即导出缓冲中的 span；没有导出器时保留在缓冲中"""
+        if self._exporter is None:
+            return
+        spans = self.drain()
+        if not spans:
+            return
+        try:
+            await self._exporter(spans)
+        except Exception as e:
+            logger.error(f"Failed to export {len(spans)} trace span(s): {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.tracing_flush_interval)
+            await self.flush()
+
+    def reset(self) -> None:
+        self.drain()
+        self._exporter = None
+        self._task = None
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """为经过共享客户端的每个 HTTP 请求记录 span（含限流等待时间）"""
+
+    def __init__(self, platform: str, transport: httpx.AsyncBaseTransport):
+        self.platform = platform
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with tracer.span(
+            f"http {request.method} {request.url.host}{request.url.path}",
+            platform=self.platform,
+        ) as span:
+            response = await self._transport.handle_async_request(request)
+            span.set("status_code", response.status_code)
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def waterfall(spans: list[dict[str, Any]], width: int = 40) -> list[str]:
+    """把按开始时间排序的 span 渲染为文本瀑布图"""
+    if not spans:
+        return []
+    origin = min(span["start_time"] for span in spans)
+    total = max(span["end_time"] for span in spans) - origin or 1e-9
+    depth: dict[str, int] = {}
+    lines = []
+    for span in spans:
+        level = depth.get(span["parent_id"], -1) + 1 if span["parent_id"] else 0
+        depth[span["span_id"]] = level
+        offset = int((span["start_time"] - origin) / total * width)
+        length = max(1, int((span["end_time"] - span["start_time"]) / total * width))
+        bar = " " * offset + "█" * min(length, width - offset or 1)
+        lines.append(
+            f"{bar.ljust(width)} {span['duration_ms']:>9.1f}ms  {'  ' * level}{span['name']}"
+        )
+    return lines
+
+
+# 全局单例
+tracer = Tracer()
@@ -11,11 +11,15 @@ from fastapi import FastAPI
 from loguru import logger
 
 from app.core.config import settings
+from app.core.tracing import tracer
 from app.routes.auth import router as auth_router
 from app.routes.media import router as media_router
+from app.routes.metrics import router as metrics_router
 from app.routes.pages import router as pages_router
 from app.routes.system import router as system_router
+from app.routes.traces import router as traces_router
 from app.services.platforms.feishu.handler import router as feishu_router
+from app.services.platforms.telegram.handler import router as telegram_router
 from app.services.platforms.threads.handler import router as threads_router
 from app.services.storage.db import DatabaseManager
 
@@ -36,15 +40,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
     启动顺序：
     1. 数据库（最基础）
-    2. AuthService / ReplyService（核心服务）
+    2. HTTP 连接池 / 图片处理进程池 / AuthService / ReplyService（核心服务）
     3. Fanfou Sink（注册 AuthHandler + EventBus）
     4. Telegram / Feishu Source（启动后注册 ReplyService）
+    5. 恢复 outbox 中未完成的投递
     """
     logger.info("=" * 60)
     logger.info("Starting Message Sync Gateway...")
     logger.info("=" * 60)
 
     db_manager = None
+    http_pool = None
+    image_processor = None
     fanfou_client = None
     mastodon_client = None
     threads_client = None
@@ -53,6 +60,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     feishu_manager = None
     auth_service = None
     reply_service = None
+    replay_task = None
 
     try:
         # Step 1: 数据库
@@ -60,11 +68,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
             logger.info("Initializing database...")
             db_manager = DatabaseManager.create_instance()
             await db_manager.start()
+            if settings.tracing_enabled:
+                tracer.start(db_manager.save_spans)
 
-        # Step 2: AuthService + ReplyService
+        # Step 2: 共享 HTTP 连接池 + 图片处理进程池 + AuthService + ReplyService
         from app.core.auth import AuthService
+        from app.core.http import HttpClientPool
         from app.core.reply import ReplyService
+        from app.services.media.processor import ImageProcessor
 
+        http_pool = HttpClientPool.create_instance()
+        image_processor = ImageProcessor.create_instance()
+        await image_processor.start()
         auth_service = AuthService.create_instance()
         reply_service = ReplyService.create_instance()
 
@@ -125,7 +140,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
             if settings.telegram_channel_id:
                 from app.core.bus import bus as event_bus
 
-                event_bus.register(telegram_client.handle_message)
+                event_bus.register(telegram_client.handle_message, sink="telegram")
                 logger.info(
                     f"Telegram channel sink registered, channel_id={settings.telegram_channel_id}"
                 )
@@ -153,6 +168,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
         handler_count = bus.get_handler_count()
         logger.info(f"Event bus initialized with {handler_count} handlers")
 
+        # Step 6: 恢复上次退出时未完成的 Sink 投递（后台执行，不阻塞启动）
+        if db_manager:
+            replay_task = asyncio.create_task(db_manager.resume_pending_deliveries())
+            # 定期删除过期的 outbox 记录和追踪 span
+            db_manager.start_pruning()
+
         logger.info("=" * 60)
         logger.info("All components started successfully!")
         logger.info("=" * 60)
@@ -166,6 +187,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     finally:
         logger.info("Shutting down Message Sync Gateway...")
 
+        if replay_task and not replay_task.done():
+            replay_task.cancel()
+
         if telegram_client:
             try:
                 await telegram_client.stop()
@@ -174,10 +198,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
         if feishu_manager:
             try:
-                feishu_manager.stop()
+                await feishu_manager.stop()
             except Exception as e:
                 logger.error(f"Error stopping Feishu: {e}")
 
+        # Source 停止后再排空 EventBus 队列，确保已入队的消息被 Sink 处理
+        try:
+            from app.core.bus import bus as event_bus
+
+            await event_bus.stop()
+        except Exception as e:
+            logger.error(f"Error stopping event bus: {e}")
+
         if fanfou_client:
             try:
                 await fanfou_client.stop()
@@ -202,20 +234,37 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
             except Exception as e:
                 logger.error(f"Error stopping Bluesky: {e}")
 
+        if image_processor:
+            try:
+                await image_processor.stop()
+            except Exception as e:
+                logger.error(f"Error stopping image processor: {e}")
+
+        if http_pool:
+            try:
+                await http_pool.close()
+            except Exception as e:
+                logger.error(f"Error closing HTTP client pool: {e}")
+
         if db_manager:
             try:
+                await tracer.stop()
                 await db_manager.stop()
             except Exception as e:
                 logger.error(f"Error stopping database: {e}")
 
         # 重置单例以便测试
         from app.core.auth import AuthService
+        from app.core.http import HttpClientPool
         from app.core.reply import ReplyService
+        from app.services.media.processor import ImageProcessor
         from app.services.platforms.bluesky.client import BlueskyClient
         from app.services.platforms.mastodon.client import MastodonClient
         from app.services.platforms.threads.client import ThreadsClient
 
         AuthService.reset_instance()
+        HttpClientPool.reset_instance()
+        ImageProcessor.reset_instance()
         ReplyService.reset_instance()
         BlueskyClient.reset_instance()
         MastodonClient.reset_instance()
@@ -234,9 +283,12 @@ app = FastAPI(
 
 app.include_router(auth_router)
 app.include_router(media_router)
+app.include_router(metrics_router)
 app.include_router(pages_router)
 app.include_router(system_router)
+app.include_router(traces_router)
 app.include_router(feishu_router)
+app.include_router(telegram_router)
 app.include_router(threads_router)
 
 
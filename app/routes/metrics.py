@@ -0,0 +1,24 @@
+"""
+Metrics routes.
+Prometheus 指标导出路由。
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import bus_metrics
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    from app.core.bus import bus
+
+    body = bus_metrics.render_prometheus(
+        queue_depths=bus.get_queue_depths(),
+        queue_drops=bus.get_queue_drops(),
+    )
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
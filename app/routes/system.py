@@ -40,15 +40,32 @@ async def health():
 @router.get("/stats")
 async def stats():
     from app.core.bus import bus
+    from app.core.metrics import bus_metrics
+    from app.core.ratelimit import rate_limiter
+    from app.core.resilience import resilience
+    from app.services.media.uploads import upload_slots
+    from app.services.platforms.bluesky.resolver import handle_resolver
 
     message_count = 0
+    database = None
     db_manager = DatabaseManager.get_instance()
     if db_manager:
         try:
             message_count = await db_manager.get_message_count()
         except Exception as e:
             logger.error(f"Error getting message count: {e}")
-    return {"handlers": bus.get_handler_count(), "total_messages": message_count}
+        database = db_manager.get_latency_stats()
+    return {
+        "handlers": bus.get_handler_count(),
+        "total_messages": message_count,
+        "handler_metrics": bus_metrics.snapshot(),
+        "queue_depths": bus.get_queue_depths(),
+        "database": database,
+        "rate_limits": rate_limiter.snapshot(),
+        "circuits": resilience.snapshot(),
+        "media_uploads": upload_slots.snapshot(),
+        "bluesky_handles": handle_resolver.snapshot(),
+    }
 
 
 @router.get("/messages")
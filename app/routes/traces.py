@@ -0,0 +1,34 @@
+"""
+Trace routes.
+消息追踪查询路由。
+"""
+
+from fastapi import APIRouter, HTTPException
+
+from app.core.tracing import tracer, waterfall
+from app.services.storage.db import DatabaseManager
+
+router = APIRouter(tags=["traces"])
+
+
+@router.get("/traces/{event_id}")
+async def get_trace(event_id: str):
+    db_manager = DatabaseManager.get_instance()
+    if not db_manager:
+        raise HTTPException(status_code=503, detail="Database not enabled")
+
+    # 先写入缓冲中的 span，刚处理完的消息也能查到
+    await tracer.flush()
+    await db_manager.writer.flush()
+    spans = await db_manager.get_trace(event_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+
+    return {
+        "event_id": event_id,
+        "duration_ms": round(
+            (max(s["end_time"] for s in spans) - min(s["start_time"] for s in spans)) * 1000, 3
+        ),
+        "spans": spans,
+        "waterfall": waterfall(spans),
+    }
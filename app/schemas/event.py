@@ -5,11 +5,13 @@ Unified Message Event Schema
 
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.schemas.media import ImageSource, MediaHandle
+
 
 class MessageSource(str, Enum):
     """
@@ -46,10 +48,19 @@ class UnifiedMessage(BaseModel):
 
     image_data: Optional[bytes] = Field(
         default=None,
-        description="图片二进制数据（仅内存传递，不持久化）",
+        description="图片二进制数据（仅内存传递，不持久化；Source 应优先使用 media）",
         exclude=True,
     )
 
+    media: Optional[MediaHandle] = Field(
+        default=None, description="图片文件引用（按需读取，消息中不携带图片字节）"
+    )
+
+    attachments: List[MediaHandle] = Field(
+        default_factory=list,
+        description="多图消息按顺序排列的全部图片；media / image_path 指向第一张",
+    )
+
     image_key: Optional[str] = Field(default=None, description="飞书图片标识")
 
     image_path: Optional[str] = Field(default=None, description="图片文件路径")
@@ -66,6 +77,28 @@ class UnifiedMessage(BaseModel):
 
     model_config = ConfigDict(use_enum_values=True)
 
+    def image_source(self) -> Optional[ImageSource]:
+        """供上传使用的图片来源：优先内存字节，其次文件引用（文件已不存在时返回 None）"""
+        if self.image_data:
+            return self.image_data
+        if self.media is not None and self.media.exists():
+            return self.media
+        return None
+
+    def image_sources(self) -> list[ImageSource]:
+        """按顺序返回全部图片来源；没有 attachments 时退化为单图"""
+        if self.attachments:
+            return [media for media in self.attachments if media.exists()]
+        source = self.image_source()
+        return [source] if source is not None else []
+
+    async def load_image(self) -> Optional[bytes]:
+        """按需读取图片字节"""
+        source = self.image_source()
+        if isinstance(source, MediaHandle):
+            return await source.aread()
+        return source
+
     def __str__(self) -> str:
         """字符串表示，便于日志输出"""
         return (
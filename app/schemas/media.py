@@ -0,0 +1,146 @@
+"""
+Media Handle Schema
+媒体引用模型 - 以文件引用代替在消息中携带图片字节
+
+图片落盘后只在消息中传递路径、大小和哈希，Sink 按需读取：
+- read(): 一次性读取字节（需要在内存中处理时，如压缩）
+- view(): 通过 mmap 获取只读 memoryview，不额外拷贝
+- open() / iter_chunks() / aiter_chunks(): 流式读取，用于上传
+
+上传辅助函数 upload_file() / upload_body() 把字节和文件引用统一成
+httpx 可流式发送的形式（multipart 文件对象 / 异步字节流 + Content-Length）。
+"""
+
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterator, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+
+class MediaHandle(BaseModel):
+    """
+    文件形式的媒体引用
+
+    不可变；可随 UnifiedMessage 一起序列化（outbox 恢复时无需重新读取图片）。
+    """
+
+    path: str = Field(..., description="文件路径")
+    size: int = Field(..., description="文件字节数")
+    sha256: str = Field(..., description="文件内容 sha256")
+    content_type: str = Field(default="image/jpeg", description="MIME 类型")
+
+    model_config = ConfigDict(frozen=True)
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, path: str | Path, content_type: str = "image/jpeg"
+    ) -> "MediaHandle":
+        """将字节写入文件（临时文件 + rename）并返回引用"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(target)
+        return cls(
+            path=str(path),
+            size=len(data),
+            sha256=hashlib.sha256(data).hexdigest(),
+            content_type=content_type,
+        )
+
+    @classmethod
+    def from_path(cls, path: str | Path, content_type: str = "image/jpeg") -> "MediaHandle":
+        """为已存在的文件创建引用（流式计算哈希）"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(MEDIA_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+        return cls(path=str(path), size=size, sha256=digest.hexdigest(), content_type=content_type)
+
+    @property
+    def filename(self) -> str:
+        return Path(self.path).name
+
+    def exists(self) -> bool:
+        return Path(self.path).is_file()
+
+    def read(self) -> bytes:
+        """读取全部字节"""
+        return Path(self.path).read_bytes()
+
+    async def aread(self) -> bytes:
+        """在线程中读取全部字节，避免阻塞事件循环"""
+        return await asyncio.to_thread(self.read)
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """打开只读文件对象"""
+        with open(self.path, "rb") as f:
+            yield f
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """mmap 映射文件，返回只读 memoryview（退出上下文后失效）"""
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            view = memoryview(m)
+            try:
+                yield view
+            finally:
+                view.release()
+
+    def iter_chunks(self, chunk_size: int = MEDIA_CHUNK_SIZE) -> Iterator[bytes]:
+        """按块同步读取"""
+        with open(self.path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    async def aiter_chunks(self, chunk_size: int = MEDIA_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """按块异步读取（文件 IO 在线程中执行），可直接作为 httpx 请求体"""
+        with open(self.path, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+
+
+# Sink 上传接口接受的图片来源：内存字节或文件引用
+ImageSource = Union[bytes, MediaHandle]
+
+
+@contextmanager
+def upload_file(
+    source: ImageSource, filename: str = "image.jpg", content_type: str = "image/jpeg"
+) -> Iterator[tuple[str, BinaryIO, str]]:
+    """
+    打开图片来源，返回 httpx multipart 文件元组 (filename, file, content_type)
+
+    文件引用直接打开磁盘文件，httpx 按块读取并根据文件大小设置 Content-Length；
+    字节包装为 BytesIO（不拷贝底层数据）。
+    """
+    if isinstance(source, MediaHandle):
+        with source.open() as f:
+            yield source.filename, f, source.content_type
+    else:
+        yield filename, io.BytesIO(source), content_type
+
+
+def upload_body(source: ImageSource) -> tuple[bytes | AsyncIterator[bytes], int]:
+    """
+    原始请求体形式的上传内容，返回 (content, content_length)
+
+    文件引用返回按块读取的异步字节流，每次调用都会重新打开文件（可用于重试）。
+    """
+    if isinstance(source, MediaHandle):
+        return source.aiter_chunks(), source.size
+    return source, len(source)
@@ -0,0 +1,217 @@
+"""
+Image Variant Cache
+图片变体缓存 - 按源图内容哈希 + 目标约束缓存压缩/缩放/转码结果
+
+同一张图会被多个 Sink 分别处理（飞书压到 2MB，Bluesky 再压到 1MB 以内），
+重复发送的图片也会被再次处理。以 (sha256(源图), 约束) 为 key 缓存结果后，
+每种尺寸/格式的变体只计算一次。
+
+两级缓存：
+- 内存 LRU（按字节数限制容量）
+- 磁盘（data/images/variants/<sha 前两位>/<sha>-<约束>.<扩展名>），进程重启后仍可命中；
+  总字节数超过上限时按修改时间删除最久未用的文件（命中时刷新修改时间）
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+# 磁盘层超限后清理到上限的这个比例，避免每次写入都触发一次目录扫描
+DISK_PRUNE_TARGET = 0.9
+
+
+def content_digest(data: bytes) -> str:
+    """计算源图内容哈希"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass(frozen=True)
+class VariantKey:
+    """
+    变体缓存 key
+
+    Attributes:
+        digest: 源图 sha256
+        variant: 目标约束描述，如 "compress-2mb" / "resize-1080-q90" / "jpeg-q90"
+        extension: 输出文件扩展名
+    """
+
+    digest: str
+    variant: str
+    extension: str = "jpg"
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}-{self.variant}.{self.extension}"
+
+
+class ImageVariantCache:
+    """
+    两级图片变体缓存（线程安全）
+
+    事件循环和飞书 SDK 线程都会访问，内部用锁保护 LRU。
+    磁盘写入使用临时文件 + rename，避免并发读到半个文件。
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        directory: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        """
+        Args:
+            memory_max_bytes: 内存层容量
+            directory: 磁盘层目录，为空时只使用内存
+            disk_max_bytes: 磁盘层容量，0 表示不限制
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: OrderedDict[VariantKey, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        # 磁盘层当前字节数，首次写入时扫描目录得到（None 表示尚未扫描）
+        self._disk_bytes: Optional[int] = None
+        self._disk_lock = threading.Lock()
+        self.disk_evictions = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_memory(self, key: VariantKey) -> Optional[bytes]:
+        """只查内存层"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return data
+
+    def get(self, key: VariantKey) -> Optional[bytes]:
+        """先查内存，再查磁盘；磁盘命中会回填内存"""
+        data = self.get_memory(key)
+        if data is not None:
+            return data
+
+        path = self._path(key)
+        if path is not None and path.is_file():
+            try:
+                data = path.read_bytes()
+                # 刷新修改时间，清理磁盘时按最近使用排序
+                os.utime(path)
+            except OSError as e:
+                logger.warning(f"Failed to read cached image variant {path}: {e}")
+            else:
+                self._remember(key, data)
+                with self._lock:
+                    self.disk_hits += 1
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: VariantKey, data: bytes) -> None:
+        """写入内存和磁盘"""
+        self._remember(key, data)
+
+        path = self._path(key)
+        if path is None or path.is_file():
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"Failed to write cached image variant {path}: {e}")
+            return
+        self._account_disk(len(data))
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "disk_bytes": self._disk_bytes or 0,
+                "disk_evictions": self.disk_evictions,
+                "misses": self.misses,
+            }
+
+    @staticmethod
+    def _disk_files(directory: Path) -> list[tuple[float, int, Path]]:
+        """磁盘层的 (修改时间, 字节数, 路径)，忽略写入中的临时文件"""
+        files: list[tuple[float, int, Path]] = []
+        for path in directory.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _account_disk(self, written: int) -> None:
+        """记录新写入的字节数，超过上限时删除最久未用的文件"""
+        if self.directory is None or self.disk_max_bytes <= 0:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files(self.directory))
+            else:
+                self._disk_bytes += written
+            if self._disk_bytes <= self.disk_max_bytes:
+                return
+
+            files = sorted(self._disk_files(self.directory), key=lambda item: item[0])
+            total = sum(size for _, size, _ in files)
+            target = self.disk_max_bytes * DISK_PRUNE_TARGET
+            evicted = 0
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to evict cached image variant {path}: {e}")
+                    continue
+                total -= size
+                evicted += 1
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+            logger.info(f"Image variant disk cache pruned {evicted} file(s), {total} bytes left")
+
+    def _remember(self, key: VariantKey, data: bytes) -> None:
+        if len(data) > self.memory_max_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _path(self, key: VariantKey) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / key.digest[:2] / key.filename
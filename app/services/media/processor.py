@@ -0,0 +1,257 @@
+"""
+Image Processing Executor
+图片处理执行器 - 将 CPU 密集的图片压缩/缩放/转码放到进程池执行
+
+为什么需要进程池？
+Pillow 编码是 CPU 密集操作，直接在 asyncio 事件循环中执行会阻塞
+所有 Sink 和 Telegram polling。进程池让多核机器可以并行处理多张图片，
+同时事件循环保持响应。
+
+处理结果按 (源图哈希, 目标约束) 缓存在 ImageVariantCache 中，
+同一变体只计算一次；并发请求同一变体时合并为一次计算。
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, ClassVar, Optional, TypeVar
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.media.cache import ImageVariantCache, VariantKey, content_digest
+from app.utils import image as image_utils
+
+T = TypeVar("T")
+
+_FORMAT_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+
+def build_variant_cache() -> ImageVariantCache:
+    """按配置创建变体缓存"""
+    return ImageVariantCache(
+        memory_max_bytes=settings.image_cache_memory_mb * 1024 * 1024,
+        directory=settings.image_cache_dir or None,
+        disk_max_bytes=settings.image_cache_disk_mb * 1024 * 1024,
+    )
+
+
+def _compress_variant(target_size_mb: float, max_dimension: Optional[int]) -> str:
+    variant = f"compress-{target_size_mb:g}mb"
+    if max_dimension:
+        variant += f"-d{max_dimension}"
+    return variant
+
+
+class ImageProcessor:
+    """
+    图片处理服务（单例）
+
+    在 lifespan 中启动/停止。image_workers=0 时不创建进程池，
+    退化为 asyncio.to_thread（仍不阻塞事件循环，但受 GIL 限制）。
+    """
+
+    _instance: ClassVar[Optional["ImageProcessor"]] = None
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        cache: Optional[ImageVariantCache] = None,
+    ):
+        self.max_workers = settings.image_workers if max_workers is None else max_workers
+        self.cache = cache if cache is not None else build_variant_cache()
+        self._executor: Optional[Executor] = None
+        self._inflight: dict[VariantKey, asyncio.Future] = {}
+        logger.info(f"ImageProcessor initialized with {self.max_workers} worker process(es)")
+
+    async def start(self) -> None:
+        if self._executor is not None:
+            logger.warning("ImageProcessor already started")
+            return
+        if self.max_workers > 0:
+            # spawn 避免 fork 时继承飞书线程、aiosqlite 线程等状态
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        logger.info("ImageProcessor started")
+
+    async def stop(self) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        logger.info("ImageProcessor stopped")
+
+    async def compress(
+        self,
+        image_bytes: bytes,
+        target_size_mb: float = 2,
+        max_dimension: Optional[int] = None,
+    ) -> bytes:
+        """压缩图片到目标大小以内"""
+        if len(image_bytes) <= target_size_mb * 1024 * 1024:
+            return image_bytes
+        key = VariantKey(
+            content_digest(image_bytes), _compress_variant(target_size_mb, max_dimension)
+        )
+        return await self._cached(
+            key,
+            image_bytes,
+            image_utils.compress_image_advanced,
+            image_bytes,
+            target_size_mb,
+            max_dimension,
+        )
+
+    async def resize(self, image_bytes: bytes, max_dimension: int, quality: int = 90) -> bytes:
+        """按最大边长等比缩放"""
+        key = VariantKey(content_digest(image_bytes), f"resize-{max_dimension}-q{quality}")
+        return await self._cached(
+            key, image_bytes, image_utils.resize_image, image_bytes, max_dimension, quality
+        )
+
+    async def transcode(
+        self, image_bytes: bytes, image_format: str = "JPEG", quality: int = 90
+    ) -> bytes:
+        """转换图片格式"""
+        image_format = image_format.upper()
+        key = VariantKey(
+            content_digest(image_bytes),
+            f"{image_format.lower()}-q{quality}",
+            _FORMAT_EXTENSIONS.get(image_format, image_format.lower()),
+        )
+        return await self._cached(
+            key, image_bytes, image_utils.transcode_image, image_bytes, image_format, quality
+        )
+
+    def compress_blocking(
+        self,
+        image_bytes: bytes,
+        target_size_mb: float = 2,
+        max_dimension: Optional[int] = None,
+    ) -> bytes:
+        """供非事件循环线程（如飞书 SDK 线程）同步调用的压缩方法"""
+        if len(image_bytes) <= target_size_mb * 1024 * 1024:
+            return image_bytes
+        key = VariantKey(
+            content_digest(image_bytes), _compress_variant(target_size_mb, max_dimension)
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if self._executor is None:
+            result = image_utils.compress_image_advanced(image_bytes, target_size_mb, max_dimension)
+        else:
+            future = self._executor.submit(
+                image_utils.compress_image_advanced, image_bytes, target_size_mb, max_dimension
+            )
+            result = future.result()
+        self._store(key, image_bytes, result)
+        return result
+
+    async def _cached(
+        self, key: VariantKey, source: bytes, func: Callable[..., bytes], *args: Any
+    ) -> bytes:
+        """先查缓存；未命中时计算一次，并发的相同请求共享同一结果"""
+        cached = self.cache.get_memory(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            return await asyncio.shield(pending)
+
+        task = loop.create_task(self._compute(key, source, func, *args))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._discard_inflight(key, task))
+        # shield：某个等待方被取消时，其他合并进来的调用仍能拿到结果
+        return await asyncio.shield(task)
+
+    def _discard_inflight(self, key: VariantKey, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _compute(
+        self, key: VariantKey, source: bytes, func: Callable[..., bytes], *args: Any
+    ) -> bytes:
+        result = await asyncio.to_thread(self.cache.get, key)
+        if result is None:
+            result = await self._run(func, *args)
+            await asyncio.to_thread(self._store, key, source, result)
+        return result
+
+    def _store(self, key: VariantKey, source: bytes, result: bytes) -> None:
+        # 原样返回（无需处理）的结果不缓存，避免重复存储原图
+        if result is source or result == source:
+            return
+        self.cache.put(key, result)
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._executor is None:
+            return await asyncio.to_thread(func, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    @classmethod
+    def get_instance(cls) -> Optional["ImageProcessor"]:
+        return cls._instance
+
+    @classmethod
+    def create_instance(cls) -> "ImageProcessor":
+        if cls._instance is not None:
+            raise RuntimeError("ImageProcessor instance already exists")
+        cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        cls._instance = None
+
+
+_thread_fallback: Optional[ImageProcessor] = None
+
+
+def _processor() -> ImageProcessor:
+    """获取已启动的处理器；未在 lifespan 中创建时使用线程退化实例"""
+    global _thread_fallback
+
+    processor = ImageProcessor.get_instance()
+    if processor is not None:
+        return processor
+    if _thread_fallback is None:
+        _thread_fallback = ImageProcessor(max_workers=0)
+    return _thread_fallback
+
+
+async def compress_image(
+    image_bytes: bytes,
+    target_size_mb: float = 2,
+    max_dimension: Optional[int] = None,
+) -> bytes:
+    """在事件循环之外压缩图片"""
+    return await _processor().compress(image_bytes, target_size_mb, max_dimension)
+
+
+async def resize_image(image_bytes: bytes, max_dimension: int, quality: int = 90) -> bytes:
+    """在事件循环之外缩放图片"""
+    return await _processor().resize(image_bytes, max_dimension, quality)
+
+
+async def transcode_image(
+    image_bytes: bytes, image_format: str = "JPEG", quality: int = 90
+) -> bytes:
+    """在事件循环之外转换图片格式"""
+    return await _processor().transcode(image_bytes, image_format, quality)
+
+
+def compress_image_blocking(
+    image_bytes: bytes,
+    target_size_mb: float = 2,
+    max_dimension: Optional[int] = None,
+) -> bytes:
+    """供同步线程调用：有进程池时提交到进程池，否则当前线程直接压缩"""
+    return _processor().compress_blocking(image_bytes, target_size_mb, max_dimension)
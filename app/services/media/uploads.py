@@ -0,0 +1,107 @@
+"""
+Per-Sink Media Upload Slots
+按 Sink 的媒体上传并发槽位 - 多图并发上传，同时限制每个平台的并发上传数
+
+为什么需要上传槽位？
+多图消息如果逐张上传，发帖延迟是所有上传耗时之和；全部并发又会在多条
+多图消息同时到达时一次打开几十个上传请求，占满连接池并触发平台限流。
+每个 Sink 一个信号量：同一平台同时进行的上传不超过配置的并发数，
+单条消息内的多张图片并发上传，发帖延迟取决于最慢的一张。
+
+- 并发数按平台配置（media_upload_concurrency），未配置的平台使用默认值
+- 槽位只覆盖上传请求本身；上传后的处理轮询（如 Mastodon 202）在槽位外等待，
+  不占用其他消息的上传名额
+
+用法示例：
+```python
+blobs = await upload_slots.gather("bluesky", images, upload_blob)
+```
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _PlatformSlots:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.active = 0
+        self.waiting = 0
+        self.uploads = 0
+
+
+class UploadSlots:
+    """各平台上传信号量的注册表（按配置懒创建）"""
+
+    def __init__(self):
+        self._slots: dict[str, _PlatformSlots] = {}
+
+    def limit(self, platform: str) -> int:
+        return max(
+            1,
+            settings.media_upload_concurrency.get(
+                platform, settings.media_upload_default_concurrency
+            ),
+        )
+
+    def _platform_slots(self, platform: str) -> _PlatformSlots:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(platform)
+        # 信号量绑定事件循环；事件循环变化（如测试中）时重新创建
+        if slots is None or (slots.loop is not None and slots.loop is not loop):
+            slots = self._slots[platform] = _PlatformSlots(self.limit(platform))
+        slots.loop = loop
+        return slots
+
+    async def run(self, platform: str, upload: Callable[[], Awaitable[R]]) -> R:
+        """占用一个上传槽位执行 upload"""
+        slots = self._platform_slots(platform)
+        slots.waiting += 1
+        try:
+            await slots.semaphore.acquire()
+        finally:
+            slots.waiting -= 1
+        slots.active += 1
+        try:
+            return await upload()
+        finally:
+            slots.active -= 1
+            slots.uploads += 1
+            slots.semaphore.release()
+
+    async def gather(
+        self,
+        platform: str,
+        items: Iterable[T],
+        upload: Callable[[T], Awaitable[R]],
+    ) -> list[R]:
+        """并发上传 items，按原顺序返回结果；同一平台的并发数受槽位限制"""
+        return list(
+            await asyncio.gather(
+                *(self.run(platform, lambda item=item: upload(item)) for item in items)
+            )
+        )
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {
+            platform: {
+                "limit": slots.limit,
+                "active": slots.active,
+                "waiting": slots.waiting,
+                "uploads": slots.uploads,
+            }
+            for platform, slots in self._slots.items()
+        }
+
+    def reset(self) -> None:
+        self._slots.clear()
+
+
+upload_slots = UploadSlots()
@@ -6,25 +6,38 @@ Bluesky 平台消费者 - 接收统一消息并发送到 Bluesky
 import asyncio
 import json
 from datetime import UTC, datetime
-from typing import Any, Awaitable, Callable, ClassVar, Optional, TypeVar
+from typing import Any, AsyncIterator, Awaitable, Callable, ClassVar, Optional, TypeVar
 
 import httpx
 from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.http import http_client
+from app.core.ratelimit import RateLimitExceeded
+from app.core.resilience import host_of, resilience
 from app.schemas.event import UnifiedMessage
+from app.schemas.media import ImageSource, MediaHandle, upload_body
+from app.services.media.processor import compress_image
+from app.services.media.uploads import upload_slots
+from app.services.platforms.bluesky.records import record_cid, tid_clock
+from app.services.platforms.bluesky.resolver import HandleResolutionError, handle_resolver
 from app.services.platforms.limits import (
     BLUESKY_TEXT_LIMIT,
     caption_too_long_error,
     caption_too_long_reply,
+    images_dropped_note,
     text_too_long_error,
     text_too_long_reply,
+    thread_note,
 )
-from app.utils.image import compress_image_advanced
+from app.services.platforms.splitter import thread_chunks
+from app.utils.text import TextAnalysis, analyze_text
 
 BLUESKY_POST_COLLECTION = "app.bsky.feed.post"
 BLUESKY_IMAGE_LIMIT_BYTES = 1_000_000
+# app.bsky.embed.images 单条最多 4 张
+BLUESKY_MEDIA_LIMIT = 4
 BLUESKY_SHARED_SOURCE_PLATFORM = "shared"
 BLUESKY_SHARED_SOURCE_USER_ID = "shared"
 T = TypeVar("T")
@@ -110,7 +123,9 @@ class BlueskyClient:
         from app.core.reply import ReplyService
 
         reply_service = ReplyService.get_instance()
-        if len(message.content) > BLUESKY_TEXT_LIMIT.default_limit:
+        analysis = analyze_text(message.content)
+        chunks = thread_chunks(message.content, BLUESKY_TEXT_LIMIT, analysis=analysis)
+        if chunks is None:
             if reply_service:
                 reply_service.reply(message, text_too_long_reply(BLUESKY_TEXT_LIMIT))
             await self._save_sink_result(
@@ -120,11 +135,20 @@ class BlueskyClient:
             )
             return
 
-        ret = await self.post_text(message.content)
+        if len(chunks) == 1:
+            ret = await self.post_text(chunks[0], analysis)
+            posted = [ret] if ret else []
+        else:
+            posted = await self.post_thread(chunks)
+            ret = posted[0] if posted else None
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
-            reply_service.reply(message, self._success_text(ret))
+            reply_service.reply(
+                message,
+                self._success_text(ret)
+                + thread_note(BLUESKY_TEXT_LIMIT.reply_label, len(posted), len(chunks)),
+            )
         elif reply_service:
             reply_service.reply(message, "[Bluesky] 消息发送失败")
 
@@ -133,12 +157,14 @@ class BlueskyClient:
 
         reply_service = ReplyService.get_instance()
 
-        if not message.image_data:
+        images = message.image_sources()
+        if not images:
             if reply_service:
                 reply_service.reply(message, "[Bluesky] 图片数据为空，无法发送。")
             return
 
-        if message.content and len(message.content) > BLUESKY_TEXT_LIMIT.default_limit:
+        analysis = analyze_text(message.content) if message.content else None
+        if analysis and BLUESKY_TEXT_LIMIT.exceeds(analysis):
             if reply_service:
                 reply_service.reply(message, caption_too_long_reply(BLUESKY_TEXT_LIMIT))
             await self._save_sink_result(
@@ -148,61 +174,325 @@ class BlueskyClient:
             )
             return
 
-        ret = await self.post_image(message.image_data, message.content or None)
+        ret = await self.post_images(images, message.content or None, analysis)
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
-            reply_service.reply(message, self._success_text(ret))
+            reply_service.reply(
+                message,
+                self._success_text(ret)
+                + images_dropped_note(
+                    BLUESKY_TEXT_LIMIT.reply_label, BLUESKY_MEDIA_LIMIT, len(images)
+                ),
+            )
         elif reply_service:
             reply_service.reply(message, "[Bluesky] 图片发送失败")
 
-    async def post_text(self, text: str) -> Optional[dict]:
+    async def post_text(self, text: str, analysis: Optional[TextAnalysis] = None) -> Optional[dict]:
+        """发布文本帖子；analysis 为已有的文本分析结果，用于生成 facet"""
         session = await self._get_session()
         if not session:
             return None
 
-        record = {
+        record: dict[str, Any] = {
             "$type": BLUESKY_POST_COLLECTION,
             "text": text,
             "createdAt": _utc_now_iso(),
         }
+        facets = await self.build_facets(analysis or analyze_text(text))
+        if facets:
+            record["facets"] = facets
         return await self._create_record(record, session)
 
-    async def post_image(self, image_data: bytes, text: Optional[str] = None) -> Optional[dict]:
-        upload_image_data = self._fit_image_for_upload(image_data)
-        if not upload_image_data:
+    async def build_facets(self, analysis: TextAnalysis) -> list[dict[str, Any]]:
+        """
+        把文本分析得到的链接、@提及、#话题转换为 app.bsky.richtext.facet
+
+        提及需要把 handle 解析为 DID，无法解析的 handle 按普通文本处理。
+        """
+        handles = sorted({f.value for f in analysis.facets if f.kind == "mention"})
+        dids = dict(zip(handles, await asyncio.gather(*map(self.resolve_handle, handles))))
+
+        facets: list[dict[str, Any]] = []
+        for facet in analysis.facets:
+            if facet.kind == "link":
+                feature = {"$type": "app.bsky.richtext.facet#link", "uri": facet.value}
+            elif facet.kind == "tag":
+                feature = {"$type": "app.bsky.richtext.facet#tag", "tag": facet.value}
+            elif did := dids.get(facet.value):
+                feature = {"$type": "app.bsky.richtext.facet#mention", "did": did}
+            else:
+                continue
+            facets.append(
+                {
+                    "index": {"byteStart": facet.byte_start, "byteEnd": facet.byte_end},
+                    "features": [feature],
+                }
+            )
+        return facets
+
+    async def resolve_handle(self, handle: str) -> Optional[str]:
+        """handle → DID（经由解析缓存）；无法解析时返回 None"""
+        return await handle_resolver.resolve(handle, self._fetch_did)
+
+    async def _fetch_did(self, handle: str) -> Optional[str]:
+        """
+        请求 com.atproto.identity.resolveHandle
+
+        Returns:
+            DID；handle 不存在（400）时返回 None
+
+        Raises:
+            HandleResolutionError: 其他非成功响应（临时失败，不缓存）
+        """
+
+        async def request() -> httpx.Response:
+            async with http_client("bluesky") as client:
+                return await client.get(
+                    f"{self.service_url}/xrpc/com.atproto.identity.resolveHandle",
+                    params={"handle": handle},
+                )
+
+        response = await resilience.call(
+            host_of(self.service_url),
+            request,
+            name="Bluesky resolveHandle",
+            is_transient=_is_transient_upstream_response,
+        )
+        if response.is_success:
+            did = response.json().get("did")
+            return did if isinstance(did, str) else None
+        if response.status_code == 400:
+            logger.info("Bluesky handle not resolved: handle={}", handle)
+            return None
+        raise HandleResolutionError(f"resolveHandle returned HTTP {response.status_code}")
+
+    async def post_thread(self, chunks: list[str]) -> list[dict]:
+        """
+        以回复串发布多条文本，整条串在一个 applyWrites 请求中写入
+
+        每条回复需要引用上一条的 uri 和 cid：rkey 使用本地生成的 TID，
+        cid 按 DAG-CBOR 在本地计算，不需要等服务端返回后再发下一条。
+        applyWrites 是原子操作，要么全部发布，要么都不发布。
+
+        上一次请求结果未知（5xx、连接中断）时，重发前先用 getRecord 确认第一条是否已写入，
+        已写入则直接按成功处理，避免重复 rkey 导致已发布的串被报告为失败。
+        服务端返回的 cid 与本地计算不一致时回复引用无效：撤回整条串并按失败处理。
+        """
+        session = await self._get_session()
+        if not session or not chunks:
+            return []
+        chunk_facets = await asyncio.gather(
+            *(self.build_facets(analyze_text(chunk)) for chunk in chunks)
+        )
+
+        def build_writes(did: str) -> tuple[list[dict[str, Any]], list[dict[str, str]]]:
+            writes: list[dict[str, Any]] = []
+            refs: list[dict[str, str]] = []
+            root: Optional[dict[str, str]] = None
+            parent: Optional[dict[str, str]] = None
+            for chunk, facets in zip(chunks, chunk_facets):
+                rkey = tid_clock.next()
+                record: dict[str, Any] = {
+                    "$type": BLUESKY_POST_COLLECTION,
+                    "text": chunk,
+                    "createdAt": _utc_now_iso(),
+                }
+                if facets:
+                    record["facets"] = facets
+                if root and parent:
+                    record["reply"] = {"root": root, "parent": parent}
+                ref = {
+                    "uri": f"at://{did}/{BLUESKY_POST_COLLECTION}/{rkey}",
+                    "cid": record_cid(record),
+                }
+                writes.append(
+                    {
+                        "$type": "com.atproto.repo.applyWrites#create",
+                        "collection": BLUESKY_POST_COLLECTION,
+                        "rkey": rkey,
+                        "value": record,
+                    }
+                )
+                refs.append(ref)
+                root = root or ref
+                parent = ref
+            return writes, refs
+
+        writes, refs = build_writes(session["did"])
+        payload: dict[str, Any] = {"repo": session["did"], "writes": writes}
+
+        # 上一次请求可能已在服务端提交但响应丢失
+        uncertain = False
+        recovered = False
+
+        async def request(current_session: dict[str, Any]) -> httpx.Response:
+            nonlocal uncertain, recovered
+            if uncertain:
+                existing = await self._get_record(payload["repo"], payload["writes"][0]["rkey"])
+                if existing.is_success:
+                    recovered = True
+                    return existing
+                if _is_transient_upstream_response(existing):
+                    # 无法确认是否已写入，不重发，交给容错层稍后再查
+                    return existing
+            try:
+                response = await self._post_with_session(
+                    "/xrpc/com.atproto.repo.applyWrites",
+                    current_session,
+                    json=payload,
+                )
+            except RateLimitExceeded:
+                raise
+            except httpx.TransportError:
+                uncertain = True
+                raise
+            uncertain = response.status_code >= 500
+            return response
+
+        async def on_session_refresh(refreshed_session: dict[str, Any]) -> None:
+            nonlocal refs
+            if refreshed_session["did"] != payload["repo"]:
+                payload["writes"], refs = build_writes(refreshed_session["did"])
+                payload["repo"] = refreshed_session["did"]
+
+        def extract_success(response: httpx.Response, _session: dict[str, Any]) -> list[dict]:
+            if recovered:
+                # applyWrites 是原子的：第一条存在说明整条串都已写入
+                record = response.json()
+                results = [{"uri": record.get("uri"), "cid": record.get("cid")}]
+                results += [{} for _ in refs[1:]]
+            else:
+                results = response.json().get("results") or [{} for _ in refs]
+            return [{**ref, **result} for ref, result in zip(refs, results)]
+
+        posted = await self._execute_with_session_retry(
+            operation_name="applyWrites",
+            session=session,
+            request=request,
+            extract_success=extract_success,
+            on_session_refresh=on_session_refresh,
+            failure_result=[],
+        )
+        mismatched = [
+            (ref["cid"], result.get("cid"))
+            for ref, result in zip(refs, posted)
+            if result.get("cid") != ref["cid"]
+        ]
+        if mismatched:
+            logger.error(
+                "Bluesky thread record cid mismatch, reply refs are invalid: expected/actual={}",
+                mismatched,
+            )
+            await self._delete_records(refs)
+            return []
+        return posted
+
+    async def _get_record(self, repo: str, rkey: str) -> httpx.Response:
+        """请求 com.atproto.repo.getRecord；记录不存在时服务端返回 400"""
+        async with http_client("bluesky") as client:
+            return await client.get(
+                f"{self.service_url}/xrpc/com.atproto.repo.getRecord",
+                params={"repo": repo, "collection": BLUESKY_POST_COLLECTION, "rkey": rkey},
+            )
+
+    async def _delete_records(self, refs: list[dict[str, str]]) -> None:
+        """尽力删除已发布的帖子（失败只记录日志）"""
+        session = await self._get_session()
+        parsed = [_parse_at_uri(ref["uri"]) for ref in refs]
+        if not session or not all(parsed):
+            return
+        payload = {
+            "repo": parsed[0][0],
+            "writes": [
+                {
+                    "$type": "com.atproto.repo.applyWrites#delete",
+                    "collection": collection,
+                    "rkey": rkey,
+                }
+                for _repo, collection, rkey in parsed
+            ],
+        }
+        try:
+            response = await resilience.call(
+                host_of(self.service_url),
+                lambda: self._post_with_session(
+                    "/xrpc/com.atproto.repo.applyWrites", session, json=payload
+                ),
+                name="Bluesky applyWrites",
+                is_transient=_is_transient_upstream_response,
+            )
+        except Exception as e:
+            logger.warning("Failed to delete Bluesky thread records: error={}", e)
+            return
+        if not response.is_success:
+            logger.warning(
+                "Failed to delete Bluesky thread records: status_code={} body={}",
+                response.status_code,
+                response.text,
+            )
+
+    async def post_image(self, image: ImageSource, text: Optional[str] = None) -> Optional[dict]:
+        return await self.post_images([image], text)
+
+    async def post_images(
+        self,
+        images: list[ImageSource],
+        text: Optional[str] = None,
+        analysis: Optional[TextAnalysis] = None,
+    ) -> Optional[dict]:
+        """并发压缩、上传多张图片（最多 BLUESKY_MEDIA_LIMIT 张），发布一条带全部图片的帖子。"""
+        images = images[:BLUESKY_MEDIA_LIMIT]
+        if not images:
+            return None
+
+        upload_images = await asyncio.gather(*(self._fit_image_for_upload(i) for i in images))
+        if not all(upload_images):
             return None
 
         session = await self._get_session()
         if not session:
             return None
 
-        blob, uploaded_session = await self._upload_blob(upload_image_data, session)
-        if not blob or not uploaded_session:
+        uploads = await upload_slots.gather(
+            "bluesky",
+            [image for image in upload_images if image],
+            lambda image: self._upload_blob(image, session),
+        )
+        if not all(blob and uploaded_session for blob, uploaded_session in uploads):
             return None
+        # 上传过程中可能刷新过 session，用最后拿到的 session 发帖
+        uploaded_session = uploads[-1][1]
+        assert uploaded_session is not None
 
-        record = {
+        record: dict[str, Any] = {
             "$type": BLUESKY_POST_COLLECTION,
             "text": text or "",
             "createdAt": _utc_now_iso(),
             "embed": {
                 "$type": "app.bsky.embed.images",
-                "images": [
-                    {
-                        "alt": text or "image",
-                        "image": blob,
-                    }
-                ],
+                "images": [{"alt": text or "image", "image": blob} for blob, _ in uploads],
             },
         }
+        if text:
+            facets = await self.build_facets(analysis or analyze_text(text))
+            if facets:
+                record["facets"] = facets
         return await self._create_record(record, uploaded_session)
 
-    def _fit_image_for_upload(self, image_data: bytes) -> Optional[bytes]:
+    async def _fit_image_for_upload(self, image: ImageSource) -> Optional[ImageSource]:
+        """未超限的文件引用原样返回（从磁盘流式上传），超限时读入内存压缩"""
+        if isinstance(image, MediaHandle):
+            if image.size <= BLUESKY_IMAGE_LIMIT_BYTES:
+                return image
+            image_data = await image.aread()
+        else:
+            image_data = image
         if len(image_data) <= BLUESKY_IMAGE_LIMIT_BYTES:
             return image_data
 
         try:
-            compressed = compress_image_advanced(
+            compressed = await compress_image(
                 image_data,
                 target_size_mb=BLUESKY_IMAGE_LIMIT_BYTES / 1024 / 1024,
             )
@@ -260,7 +550,7 @@ class BlueskyClient:
             "identifier": self.identifier,
             "password": self.app_password,
         }
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client("bluesky") as client:
             response = await client.post(
                 f"{self.service_url}/xrpc/com.atproto.server.createSession",
                 json=payload,
@@ -284,7 +574,7 @@ class BlueskyClient:
 
     async def _refresh_session(self, refresh_jwt: str) -> Optional[dict[str, Any]]:
         headers = {"Authorization": f"Bearer {refresh_jwt}"}
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client("bluesky") as client:
             response = await client.post(
                 f"{self.service_url}/xrpc/com.atproto.server.refreshSession",
                 headers=headers,
@@ -335,14 +625,19 @@ class BlueskyClient:
         )
 
     async def _upload_blob(
-        self, image_data: bytes, session: dict[str, Any]
+        self, image: ImageSource, session: dict[str, Any]
     ) -> tuple[Optional[dict], Optional[dict[str, Any]]]:
+        content_type = image.content_type if isinstance(image, MediaHandle) else "image/jpeg"
+
         async def request(current_session: dict[str, Any]) -> httpx.Response:
+            # 每次请求（含 session 刷新后的重试）重新打开文件流
+            content, content_length = upload_body(image)
             return await self._post_with_session(
                 "/xrpc/com.atproto.repo.uploadBlob",
                 current_session,
-                content=image_data,
-                content_type="image/jpeg",
+                content=content,
+                content_type=content_type,
+                content_length=content_length,
                 timeout=30,
             )
 
@@ -368,8 +663,14 @@ class BlueskyClient:
         on_session_refresh: Optional[Callable[[dict[str, Any]], Awaitable[None]]] = None,
     ) -> R:
         current_session: dict[str, Any] = session
-        for attempt in range(3):
-            response = await request(current_session)
+        for attempt in range(2):
+            # 瞬时上游失败由容错层退避重试，这里只处理 session 过期
+            response = await resilience.call(
+                host_of(self.service_url),
+                lambda: request(current_session),
+                name=f"Bluesky {operation_name}",
+                is_transient=_is_transient_upstream_response,
+            )
 
             if response.is_success:
                 return extract_success(response, current_session)
@@ -382,17 +683,6 @@ class BlueskyClient:
                         await on_session_refresh(current_session)
                     continue
 
-            if attempt < 2 and _is_transient_upstream_response(response):
-                logger.warning(
-                    "Bluesky {} transient failure: status_code={} body={} retry={}",
-                    operation_name,
-                    response.status_code,
-                    response.text,
-                    attempt + 1,
-                )
-                await asyncio.sleep(0.5 * (attempt + 1))
-                continue
-
             logger.error(
                 "Bluesky {} failed: status_code={} body={}",
                 operation_name,
@@ -411,20 +701,24 @@ class BlueskyClient:
         session: dict[str, Any],
         *,
         json: Optional[dict[str, Any]] = None,
-        content: Optional[bytes] = None,
+        content: Optional[bytes | AsyncIterator[bytes]] = None,
         content_type: Optional[str] = None,
+        content_length: Optional[int] = None,
         timeout: int = 20,
     ) -> httpx.Response:
         headers = {"Authorization": f"Bearer {session['accessJwt']}"}
         if content_type:
             headers["Content-Type"] = content_type
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with http_client("bluesky") as client:
             return await client.post(
                 f"{self.service_url}{path}",
                 json=json,
                 content=content,
                 headers=headers,
+                timeout=timeout,
             )
 
     async def _load_session_from_db(self) -> Optional[dict[str, Any]]:
@@ -437,18 +731,8 @@ class BlueskyClient:
         if not db:
             return None
 
-        token_data = await db.get_any_token_for_sink("bluesky")
-        if not token_data:
-            return None
-
-        try:
-            payload = json.loads(token_data)
-        except json.JSONDecodeError:
-            logger.error("Bluesky persisted session is invalid JSON")
-            return None
-
-        if not isinstance(payload, dict):
-            logger.error("Bluesky persisted session has invalid payload type")
+        payload = await db.get_sink_credentials("bluesky")
+        if not payload:
             return None
 
         self._session = payload
@@ -541,7 +825,7 @@ class BlueskyClient:
         if cls._instance is not None:
             raise RuntimeError("BlueskyClient instance already exists")
         cls._instance = cls()
-        bus.register(cls._instance.handle_message)
+        bus.register(cls._instance.handle_message, sink="bluesky")
         logger.info("Bluesky client registered to event bus")
         return cls._instance
 
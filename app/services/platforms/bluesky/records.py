@@ -0,0 +1,90 @@
+"""
+Bluesky 记录的本地 CID / TID 计算
+
+回复链中每条帖子都要引用上一条的 uri 和 cid（strongRef）。服务端返回 cid 后才能
+发下一条，一条串就需要 N 次往返。记录的 cid 是 DAG-CBOR 编码后 sha256 的 CIDv1，
+rkey 是客户端可以自选的 TID：在本地算出每条的 uri 和 cid，整条串就可以放进一个
+com.atproto.repo.applyWrites 请求一次写入。
+
+只实现帖子记录用到的类型：dict / list / str / int / bool / None / bytes。
+"""
+
+import base64
+import hashlib
+import threading
+import time
+from typing import Any
+
+# CIDv1 + dag-cbor (0x71) + sha2-256 (0x12, 32 字节)
+_CID_PREFIX = bytes([0x01, 0x71, 0x12, 0x20])
+_TID_ALPHABET = "234567abcdefghijklmnopqrstuvwxyz"
+
+
+def _header(major: int, value: int) -> bytes:
+    if value < 24:
+        return bytes([major << 5 | value])
+    if value < 1 << 8:
+        return bytes([major << 5 | 24]) + value.to_bytes(1, "big")
+    if value < 1 << 16:
+        return bytes([major << 5 | 25]) + value.to_bytes(2, "big")
+    if value < 1 << 32:
+        return bytes([major << 5 | 26]) + value.to_bytes(4, "big")
+    return bytes([major << 5 | 27]) + value.to_bytes(8, "big")
+
+
+def dag_cbor_encode(value: Any) -> bytes:
+    """按 DAG-CBOR 规范编码（整数最短编码，map 键按编码长度再按字节序排序）"""
+    if value is None:
+        return b"\xf6"
+    if value is True:
+        return b"\xf5"
+    if value is False:
+        return b"\xf4"
+    if isinstance(value, int):
+        if value >= 0:
+            return _header(0, value)
+        return _header(1, -1 - value)
+    if isinstance(value, bytes):
+        return _header(2, len(value)) + value
+    if isinstance(value, str):
+        encoded = value.encode("utf-8")
+        return _header(3, len(encoded)) + encoded
+    if isinstance(value, (list, tuple)):
+        return _header(4, len(value)) + b"".join(dag_cbor_encode(item) for item in value)
+    if isinstance(value, dict):
+        items = []
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"DAG-CBOR map keys must be strings, got {type(key).__name__}")
+            items.append((key.encode("utf-8"), item))
+        items.sort(key=lambda pair: (len(pair[0]), pair[0]))
+        return _header(5, len(items)) + b"".join(
+            _header(3, len(key)) + key + dag_cbor_encode(item) for key, item in items
+        )
+    raise TypeError(f"Unsupported DAG-CBOR value: {type(value).__name__}")
+
+
+def record_cid(record: dict[str, Any]) -> str:
+    """记录的 CIDv1（base32 小写 multibase 字符串，与服务端返回的格式相同）"""
+    digest = hashlib.sha256(dag_cbor_encode(record)).digest()
+    encoded = base64.b32encode(_CID_PREFIX + digest).decode("ascii").lower().rstrip("=")
+    return "b" + encoded
+
+
+class TidClock:
+    """生成单调递增的 TID（53 位微秒时间戳 + 10 位时钟 ID，base32-sortable 编码）"""
+
+    def __init__(self, clock_id: int = 0):
+        self.clock_id = clock_id & 0x3FF
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            timestamp = max(time.time_ns() // 1000, self._last + 1)
+            self._last = timestamp
+        value = (timestamp << 10) | self.clock_id
+        return "".join(_TID_ALPHABET[(value >> shift) & 0x1F] for shift in range(60, -1, -5))
+
+
+tid_clock = TidClock()
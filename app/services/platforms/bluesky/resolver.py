@@ -0,0 +1,163 @@
+"""
+Bluesky Handle Resolver
+Bluesky handle → DID 解析缓存 - @提及生成 facet 时复用解析结果
+
+为什么需要解析缓存？
+每个 @handle 变成 mention facet 前都要调用一次 com.atproto.identity.resolveHandle，
+经常提及的账号每条帖子都重复同样的往返，长文拆成回复串时每条还会各解析一遍。
+handle 与 DID 的对应关系很少变化，缓存后重复提及不再产生请求。
+
+- 解析成功的结果缓存 bluesky_handle_cache_ttl 秒；handle 不存在（服务端明确拒绝）
+  也缓存 bluesky_handle_negative_ttl 秒，避免对拼错的 handle 反复请求
+- 网络错误、熔断等临时失败不缓存；有过期的旧结果时继续使用旧 DID
+- 缓存同时写入 SQLite，重启后直接从数据库恢复，不需要重新解析
+- 同一 handle 的并发解析合并为一次请求，其余调用等待同一个结果
+
+用法示例：
+```python
+did = await handle_resolver.resolve("alice.bsky.social", fetch_did)
+```
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+# 返回 DID；handle 不存在时返回 None；临时失败时抛出异常
+FetchDid = Callable[[str], Awaitable[Optional[str]]]
+
+# (did, expires_at)，did 为 None 表示无法解析
+_Entry = tuple[Optional[str], float]
+
+
+class HandleResolutionError(Exception):
+    """解析请求临时失败（服务端错误等），结果不应缓存"""
+
+
+class HandleResolver:
+    """handle → DID 的内存 LRU 缓存（带 SQLite 持久化和并发请求合并）"""
+
+    def __init__(self):
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[Optional[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def resolve(self, handle: str, fetch: FetchDid) -> Optional[str]:
+        """
+        解析 handle，优先使用缓存
+
+        Args:
+            handle: 不含 @ 的 handle（大小写不敏感）
+            fetch: 缓存未命中时实际请求解析的函数
+
+        Returns:
+            DID；无法解析或临时失败且没有旧结果时返回 None
+        """
+        handle = handle.lower()
+        entry = self._entries.get(handle)
+        if entry is not None and entry[1] > time.time():
+            self._entries.move_to_end(handle)
+            self.hits += 1
+            return entry[0]
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(handle)
+        if pending is not None and pending.get_loop() is loop:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        task = loop.create_task(self._lookup(handle, fetch))
+        self._inflight[handle] = task
+        task.add_done_callback(lambda _: self._discard_inflight(handle, task))
+        # shield：某个等待方被取消时，其他合并进来的调用仍能拿到结果
+        return await asyncio.shield(task)
+
+    def _discard_inflight(self, handle: str, task: asyncio.Future[Optional[str]]) -> None:
+        if self._inflight.get(handle) is task:
+            del self._inflight[handle]
+
+    async def _lookup(self, handle: str, fetch: FetchDid) -> Optional[str]:
+        stale = self._entries.get(handle)
+        persisted = await self._load(handle)
+        if persisted is not None:
+            if persisted[1] > time.time():
+                self._remember(handle, persisted)
+                self.hits += 1
+                return persisted[0]
+            stale = persisted
+
+        self.misses += 1
+        try:
+            did = await fetch(handle)
+        except Exception as e:
+            self.failures += 1
+            fallback = stale[0] if stale else None
+            logger.warning(
+                "Bluesky handle resolution failed: handle={} error={} stale_did={}",
+                handle,
+                e,
+                fallback,
+            )
+            return fallback
+
+        ttl = settings.bluesky_handle_cache_ttl if did else settings.bluesky_handle_negative_ttl
+        if ttl > 0:
+            entry = (did, time.time() + ttl)
+            self._remember(handle, entry)
+            await self._save(handle, entry)
+        return did
+
+    def _remember(self, handle: str, entry: _Entry) -> None:
+        self._entries[handle] = entry
+        self._entries.move_to_end(handle)
+        while len(self._entries) > max(1, settings.bluesky_handle_cache_size):
+            self._entries.popitem(last=False)
+
+    async def _load(self, handle: str) -> Optional[_Entry]:
+        from app.services.storage.db import DatabaseManager
+
+        db = DatabaseManager.get_instance()
+        if not db:
+            return None
+        try:
+            return await db.get_bluesky_handle(handle)
+        except Exception as e:
+            logger.warning("Failed to load cached Bluesky handle: handle={} error={}", handle, e)
+            return None
+
+    async def _save(self, handle: str, entry: _Entry) -> None:
+        from app.services.storage.db import DatabaseManager
+
+        db = DatabaseManager.get_instance()
+        if not db:
+            return
+        try:
+            await db.save_bluesky_handle(handle, entry[0], entry[1])
+        except Exception as e:
+            logger.warning("Failed to persist Bluesky handle: handle={} error={}", handle, e)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+        }
+
+    def reset(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+        self.hits = self.misses = self.coalesced = self.failures = 0
+
+
+handle_resolver = HandleResolver()
@@ -16,15 +16,21 @@ from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.resilience import is_transient_response, is_unsent_error, resilience
 from app.schemas.event import UnifiedMessage
+from app.schemas.media import ImageSource, upload_file
 from app.services.platforms.fanfou.sdk import Fanfou
 from app.services.platforms.limits import (
     FANFOU_TEXT_LIMIT,
     caption_too_long_error,
     caption_too_long_reply,
+    images_dropped_note,
     text_too_long_error,
     text_too_long_reply,
+    thread_note,
 )
+from app.services.platforms.splitter import post_reply_chain, thread_chunks
 
 
 class FanfouAuthHandler:
@@ -45,6 +51,7 @@ class FanfouAuthHandler:
         ff = Fanfou(
             consumer_key=self.consumer_key,
             consumer_secret=self.consumer_secret,
+            client=get_http_client("fanfou"),
         )
         token, _ = await ff.request_token()
 
@@ -92,6 +99,7 @@ class FanfouAuthHandler:
         ff = Fanfou(
             consumer_key=self.consumer_key,
             consumer_secret=self.consumer_secret,
+            client=get_http_client("fanfou"),
         )
         access_token, response = await ff.access_token(token)
 
@@ -122,6 +130,12 @@ class FanfouAuthHandler:
         )
 
 
+def _is_transient_result(result: tuple) -> bool:
+    """SDK 返回 (数据, 响应)，失败时数据为 None"""
+    ret, response = result
+    return ret is None and is_transient_response(response)
+
+
 class FanfouClient:
     """
     Fanfou 客户端
@@ -137,6 +151,7 @@ class FanfouClient:
     def __init__(self):
         self.consumer_key = settings.fanfou_consumer_key
         self.consumer_secret = settings.fanfou_consumer_secret
+        self._fanfou: Optional[tuple[tuple[str, str, int], Fanfou]] = None
         logger.info("FanfouClient initialized")
 
     async def start(self) -> None:
@@ -153,34 +168,73 @@ class FanfouClient:
         if not db:
             return None
 
-        token_data = await db.get_any_token_for_sink("fanfou")
-        if not token_data:
+        token = await db.get_sink_credentials("fanfou")
+        if not token:
             return None
 
-        token = json.loads(token_data)
-        return Fanfou(
-            consumer_key=self.consumer_key,
-            consumer_secret=self.consumer_secret,
-            oauth_token=token["oauth_token"],
-            oauth_token_secret=token["oauth_token_secret"],
-        )
+        # 凭证和共享连接不变时复用 SDK 实例，避免每次发帖重新构建 OAuth
+        http = get_http_client("fanfou")
+        key = (token["oauth_token"], token["oauth_token_secret"], id(http))
+        if self._fanfou is None or self._fanfou[0] != key:
+            self._fanfou = (
+                key,
+                Fanfou(
+                    consumer_key=self.consumer_key,
+                    consumer_secret=self.consumer_secret,
+                    oauth_token=token["oauth_token"],
+                    oauth_token_secret=token["oauth_token_secret"],
+                    client=http,
+                ),
+            )
+        return self._fanfou[1]
 
-    async def post_text(self, text: str) -> Optional[dict]:
-        """发文本到 Fanfou"""
+    async def post_text(
+        self, text: str, in_reply_to_status_id: Optional[str] = None
+    ) -> Optional[dict]:
+        """发文本到 Fanfou；in_reply_to_status_id 不为空时作为该消息的回复"""
         ff = await self._get_fanfou()
         if not ff:
             return None
-        ret, response = await ff.post_text("/statuses/update", {"status": text})
+        params = {"status": text}
+        if in_reply_to_status_id:
+            params["in_reply_to_status_id"] = in_reply_to_status_id
+        ret, _ = await resilience.call(
+            ff.api_domain,
+            lambda: ff.post_text("/statuses/update", params),
+            name="Fanfou text post",
+            is_transient=_is_transient_result,
+            # 发帖不是幂等操作：只在连接失败时重试，超时或 5xx 时可能已经发出
+            retry_if=is_unsent_error,
+        )
         return ret
 
-    async def post_photo(self, image_data: bytes, text: Optional[str] = None) -> Optional[dict]:
-        """发图片到 Fanfou"""
+    async def post_thread(self, chunks: list[str]) -> list[dict]:
+        """以回复串发布多条文本：每条回复上一条（需要上一条的 status id，只能依次发送）"""
+        return await post_reply_chain(
+            chunks,
+            lambda chunk, parent: self.post_text(chunk, parent["id"] if parent else None),
+        )
+
+    async def post_photo(self, image: ImageSource, text: Optional[str] = None) -> Optional[dict]:
+        """发图片到 Fanfou（文件引用从磁盘流式上传）"""
         ff = await self._get_fanfou()
         if not ff:
             return None
-        files = {"photo": image_data}
         params = {"status": text} if text else {}
-        ret, response = await ff.post_photo("/photos/upload", files, params)
+
+        async def request():
+            # 每次尝试重新打开图片，文件流可以从头读取
+            with upload_file(image) as photo:
+                return await ff.post_photo("/photos/upload", {"photo": photo}, params)
+
+        ret, _ = await resilience.call(
+            ff.api_domain,
+            request,
+            name="Fanfou photo upload",
+            is_transient=_is_transient_result,
+            # 发帖不是幂等操作：只在连接失败时重试，超时或 5xx 时可能已经发出
+            retry_if=is_unsent_error,
+        )
         return ret
 
     async def handle_message(self, message: UnifiedMessage) -> None:
@@ -251,19 +305,23 @@ class FanfouClient:
         from app.core.reply import ReplyService
 
         reply_service = ReplyService.get_instance()
-        if len(message.content) > FANFOU_TEXT_LIMIT.default_limit:
+        chunks = thread_chunks(message.content, FANFOU_TEXT_LIMIT)
+        if chunks is None:
             if reply_service:
                 reply_service.reply(message, text_too_long_reply(FANFOU_TEXT_LIMIT))
             await self._save_sink_result(message, None, text_too_long_error(FANFOU_TEXT_LIMIT))
             return
 
-        ret = await self.post_text(message.content)
+        posted = await self.post_thread(chunks)
+        ret = posted[0] if posted else None
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
             status_id = ret.get("id", "")
             reply_service.reply(
-                message, f"[饭否] 消息发送成功\n\nhttps://fanfou.com/statuses/{status_id}"
+                message,
+                f"[饭否] 消息发送成功\n\nhttps://fanfou.com/statuses/{status_id}"
+                + thread_note(FANFOU_TEXT_LIMIT.reply_label, len(posted), len(chunks)),
             )
         elif reply_service:
             reply_service.reply(message, "[饭否] 消息发送失败")
@@ -274,26 +332,32 @@ class FanfouClient:
 
         reply_service = ReplyService.get_instance()
 
-        if not message.image_data:
+        image = message.image_source()
+        if image is None:
             if reply_service:
                 reply_service.reply(message, "图片数据为空，无法发送。")
             return
 
         text = message.content if message.content else None
-        if text and len(text) > FANFOU_TEXT_LIMIT.default_limit:
+        if text and FANFOU_TEXT_LIMIT.count(text) > FANFOU_TEXT_LIMIT.default_limit:
             if reply_service:
                 reply_service.reply(message, caption_too_long_reply(FANFOU_TEXT_LIMIT))
             await self._save_sink_result(message, None, caption_too_long_error(FANFOU_TEXT_LIMIT))
             return
 
-        ret = await self.post_photo(message.image_data, text)
+        ret = await self.post_photo(image, text)
 
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
             status_id = ret.get("id", "")
+            # 饭否 photos/upload 每条只能带一张图片，多图消息只发送第一张
             reply_service.reply(
-                message, f"[饭否] 图片发送成功\n\nhttps://fanfou.com/statuses/{status_id}"
+                message,
+                f"[饭否] 图片发送成功\n\nhttps://fanfou.com/statuses/{status_id}"
+                + images_dropped_note(
+                    FANFOU_TEXT_LIMIT.reply_label, 1, len(message.image_sources())
+                ),
             )
         elif reply_service:
             reply_service.reply(message, "[饭否] 图片发送失败")
@@ -337,7 +401,7 @@ class FanfouClient:
         if cls._instance is not None:
             raise RuntimeError("FanfouClient instance already exists")
         cls._instance = cls()
-        bus.register(cls._instance.handle_message)
+        bus.register(cls._instance.handle_message, sink="fanfou")
         logger.info("Fanfou client registered to event bus")
         return cls._instance
 
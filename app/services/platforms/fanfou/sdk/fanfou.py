@@ -1,4 +1,5 @@
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 from urllib import parse
 
 import httpx
@@ -18,6 +19,7 @@ class Fanfou:
         api_domain="api.fanfou.com",
         oauth_domain="fanfou.com",
         protocol="http",
+        client: httpx.AsyncClient | None = None,
     ):
         self.consumer_key = consumer_key
         self.consumer_secret = consumer_secret
@@ -32,11 +34,21 @@ class Fanfou:
         self.api_endpoint = self.protocol + "://" + self.api_domain
         self.oauth_endpoint = self.protocol + "://" + self.oauth_domain
         self.access_oauth_token = {"key": self.oauth_token, "secret": self.oauth_token_secret}
+        self.client = client
+
+    @asynccontextmanager
+    async def _http(self) -> AsyncIterator[httpx.AsyncClient]:
+        """复用传入的共享客户端，未传入时使用一次性客户端"""
+        if self.client is not None:
+            yield self.client
+            return
+        async with httpx.AsyncClient() as client:
+            yield client
 
     async def request_token(self):
         url = self.oauth_endpoint + "/oauth/request_token"
         authorization = self.o.gen_authorization({"url": url, "method": "GET"})
-        async with httpx.AsyncClient() as client:
+        async with self._http() as client:
             r = await client.get(url, headers={"Authorization": authorization}, timeout=10)
 
         if r.status_code != 200:
@@ -54,7 +66,7 @@ class Fanfou:
             {"key": token["oauth_token"], "secret": token["oauth_token_secret"]},
         )
 
-        async with httpx.AsyncClient() as client:
+        async with self._http() as client:
             r = await client.get(url, headers={"Authorization": authorization}, timeout=10)
 
         if r.status_code != 200:
@@ -74,7 +86,7 @@ class Fanfou:
         }
         authorization = self.o.gen_authorization({"url": url, "method": "POST"})
 
-        async with httpx.AsyncClient() as client:
+        async with self._http() as client:
             r = await client.post(
                 url,
                 headers={
@@ -104,7 +116,7 @@ class Fanfou:
             {"url": url, "method": "GET"},
             self.access_oauth_token,
         )
-        async with httpx.AsyncClient() as client:
+        async with self._http() as client:
             r = await client.get(
                 url,
                 headers={
@@ -131,7 +143,7 @@ class Fanfou:
             "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
         }
 
-        async with httpx.AsyncClient() as client:
+        async with self._http() as client:
             r = await client.post(url, headers=headers, data=params, timeout=10)
 
         if r.status_code != 200:
@@ -157,8 +169,8 @@ class Fanfou:
             "Authorization": authorization,
         }
 
-        async with httpx.AsyncClient() as client:
-            r = await client.post(url, headers=headers, data=params, files=files, timeout=10)
+        async with self._http() as client:
+            r = await client.post(url, headers=headers, data=params, files=files, timeout=30)
 
         if r.status_code != 200:
             return None, r
@@ -6,15 +6,18 @@ Feishu Platform Adapter with Thread Isolation
 1. lark-oapi SDK 是同步阻塞的，运行在独立线程
 2. Monkey Patch 修正 SDK 的 event loop 绑定问题
 3. 使用 lark.ws.Client + EventDispatcherHandler（与旧版一致）
-4. 线程安全地将消息发布到主事件循环的消息总线
+4. WebSocket 回调只做校验和去重，下载/压缩/发布交给 IngestPipeline 异步处理
 """
 
 import asyncio
+import contextvars
 import json
 import sys
 import threading
+import time
 from collections import OrderedDict
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any, ClassVar, Optional, cast
 
 import lark_oapi as lark
@@ -33,9 +36,12 @@ from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.tracing import tracer
 from app.schemas.event import MessageSource, UnifiedMessage
-from app.utils.feishu import extract_img_and_first_text_group
-from app.utils.image import compress_image_advanced
+from app.schemas.media import MediaHandle
+from app.services.media.processor import compress_image_blocking
+from app.services.platforms.feishu.ingest import IngestPipeline
+from app.utils.feishu import extract_imgs_and_first_text_group
 
 
 class OrderedDictDeduplicator:
@@ -65,7 +71,7 @@ class FeishuManager:
     核心职责：
     1. 在独立线程中运行 lark.ws.Client WebSocket 长连接
     2. 接收飞书消息并转换为 UnifiedMessage
-    3. 线程安全地将消息发布到主事件总线
+    3. 通过 IngestPipeline 按会话保序、跨会话并发地处理消息并发布到事件总线
     4. 提供 send_message / reply_message 供 ReplyService 使用
     """
 
@@ -76,6 +82,18 @@ class FeishuManager:
         self.thread: Optional[threading.Thread] = None
         self.client: Optional[lark.Client] = None
         self._dedup = OrderedDictDeduplicator()
+        self._ingest = IngestPipeline(
+            main_loop,
+            bus.publish,
+            max_workers=settings.feishu_ingest_workers,
+            max_pending=settings.feishu_ingest_queue_size,
+            name="feishu-ingest",
+        )
+        # 多图富文本消息的图片并发下载（与接入管线分开，避免工作线程互相等待）
+        self._image_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.feishu_image_download_workers),
+            thread_name_prefix="feishu-image",
+        )
         logger.info("FeishuManager initialized")
 
     def _require_client(self) -> lark.Client:
@@ -131,10 +149,14 @@ class FeishuManager:
             )
             client = self._require_client()
             im_api = cast(Any, client.im)
-            response: GetMessageResourceResponse = im_api.v1.message_resource.get(request)
+            with tracer.span("feishu.download_image"):
+                response: GetMessageResourceResponse = im_api.v1.message_resource.get(request)
 
             if response.code == 0 and response.file:
-                return compress_image_advanced(response.file.read())
+                with tracer.span("image.compress"):
+                    return compress_image_blocking(
+                        response.file.read(), target_size_mb=settings.image_max_size_mb
+                    )
             else:
                 logger.error(f"下载飞书图片失败: {response.msg}")
         except Exception as e:
@@ -164,7 +186,11 @@ class FeishuManager:
             logger.error(f"飞书发送失败: {e}")
 
     def _do_handle_message(self, data: P2ImMessageReceiveV1) -> None:
-        """处理飞书消息接收事件（在子线程中执行）"""
+        """
+        处理飞书消息接收事件（在 WebSocket 线程中执行）
+
+        只做校验和去重，实际处理提交到接入管线后立即返回。
+        """
         try:
             event = data.event
             if event is None or event.sender is None or event.message is None:
@@ -192,35 +218,89 @@ class FeishuManager:
                 return
             self._dedup.add(message_id)
 
-            if message_type == "text":
-                self._handle_text_message(data, open_id, message_id, chat_id)
-            elif message_type == "image":
-                self._handle_image_message(data, open_id, message_id, chat_id)
-            elif message_type == "post":
-                self._handle_post_message(data, open_id, message_id, chat_id)
-            else:
-                self.send_message(
-                    open_id,
-                    f"当前饭薯不支持该消息类型. message_type: {message_type}",
-                )
+            job = partial(
+                self._build_message,
+                data,
+                message_type,
+                open_id,
+                message_id,
+                chat_id,
+                received_at=time.time(),
+            )
+            if not self._ingest.submit(chat_id, job):
+                logger.warning(f"飞书接入管线已满，丢弃消息: {message_id}")
+                threading.Thread(
+                    target=self._reply_safely,
+                    args=(message_id, "消息处理繁忙，请稍后重试。"),
+                    daemon=True,
+                ).start()
 
         except Exception as e:
             logger.error(f"处理飞书消息异常: {e}", exc_info=True)
 
+    def _build_message(
+        self,
+        data: P2ImMessageReceiveV1,
+        message_type: str,
+        open_id: str,
+        message_id: str,
+        chat_id: str,
+        received_at: Optional[float] = None,
+    ) -> Optional[UnifiedMessage]:
+        """
+        把飞书事件转换为 UnifiedMessage（在接入管线的工作线程中执行）
+
+        feishu.ingest span 从 WebSocket 回调收到事件开始计时，包含在管线中排队的时间。
+        """
+        with (
+            tracer.trace() as trace,
+            tracer.span("feishu.ingest", start_time=received_at, message_type=message_type),
+        ):
+            message = self._convert_message(data, message_type, open_id, message_id, chat_id)
+            if message is not None:
+                trace.bind(message.event_id)
+            return message
+
+    def _convert_message(
+        self,
+        data: P2ImMessageReceiveV1,
+        message_type: str,
+        open_id: str,
+        message_id: str,
+        chat_id: str,
+    ) -> Optional[UnifiedMessage]:
+        if message_type == "text":
+            return self._handle_text_message(data, open_id, message_id, chat_id)
+        if message_type == "image":
+            return self._handle_image_message(data, open_id, message_id, chat_id)
+        if message_type == "post":
+            return self._handle_post_message(data, open_id, message_id, chat_id)
+        self.send_message(
+            open_id,
+            f"当前饭薯不支持该消息类型. message_type: {message_type}",
+        )
+        return None
+
+    def _reply_safely(self, message_id: str, text: str) -> None:
+        try:
+            self.reply_message(message_id, text)
+        except Exception as e:
+            logger.error(f"飞书回复失败: {e}")
+
     def _handle_text_message(
         self, data: P2ImMessageReceiveV1, open_id: str, message_id: str, chat_id: str
-    ) -> None:
+    ) -> Optional[UnifiedMessage]:
         """处理文本消息"""
         event = data.event
         if event is None or event.message is None or event.message.content is None:
             logger.warning("飞书文本消息缺少 content")
-            return
+            return None
 
         content = json.loads(event.message.content)["text"]
 
         # 检查命令
         if content.startswith("/"):
-            msg = UnifiedMessage(
+            return UnifiedMessage(
                 source=MessageSource.FEISHU,
                 content=content,
                 message_type="text",
@@ -229,10 +309,8 @@ class FeishuManager:
                 command=content,
                 raw_data={"message_id": message_id, "message_type": "text"},
             )
-            self._publish_to_bus(msg)
-            return
 
-        msg = UnifiedMessage(
+        return UnifiedMessage(
             source=MessageSource.FEISHU,
             content=content,
             message_type="text",
@@ -240,78 +318,79 @@ class FeishuManager:
             chat_id=chat_id,
             raw_data={"message_id": message_id, "message_type": "text"},
         )
-        self._publish_to_bus(msg)
 
     def _handle_image_message(
         self, data: P2ImMessageReceiveV1, open_id: str, message_id: str, chat_id: str
-    ) -> None:
+    ) -> Optional[UnifiedMessage]:
         """处理图片消息"""
         event = data.event
         if event is None or event.message is None or event.message.content is None:
             logger.warning("飞书图片消息缺少 content")
-            return
+            return None
 
         content = json.loads(event.message.content)
         image_key = content.get("image_key")
 
         if not image_key:
             self.reply_message(message_id, "未找到图片文件。")
-            return
+            return None
 
         image_data = self.get_feishu_image_data(message_id, image_key)
         if not image_data:
             self.reply_message(message_id, "下载图片失败，无法发送。")
-            return
+            return None
 
-        # 保存图片到文件系统
-        image_path = self._save_image(str(message_id), image_data)
+        # 保存图片到文件系统，消息中只携带文件引用
+        media = self._save_image(str(message_id), image_data)
 
-        msg = UnifiedMessage(
+        return UnifiedMessage(
             source=MessageSource.FEISHU,
             content="",
             message_type="image",
             sender_id=open_id,
             chat_id=chat_id,
-            image_data=image_data,
+            media=media,
             image_key=image_key,
-            image_path=image_path,
+            image_path=media.path,
             raw_data={"message_id": message_id, "message_type": "image"},
         )
-        self._publish_to_bus(msg)
 
     def _handle_post_message(
         self, data: P2ImMessageReceiveV1, open_id: str, message_id: str, chat_id: str
-    ) -> None:
+    ) -> Optional[UnifiedMessage]:
         """处理富文本消息"""
         event = data.event
         if event is None or event.message is None or event.message.content is None:
             logger.warning("飞书富文本消息缺少 content")
-            return
+            return None
 
         content = json.loads(event.message.content)
-        image_key, text = extract_img_and_first_text_group(content)
+        image_keys, text = extract_imgs_and_first_text_group(content)
 
-        if image_key:
-            image_data = self.get_feishu_image_data(message_id, image_key)
-            if not image_data:
+        if image_keys:
+            attachments = self._download_images(message_id, image_keys)
+            if attachments is None:
                 self.reply_message(message_id, "下载图片失败，无法发送。")
-                return
+                return None
 
-            image_path = self._save_image(str(message_id), image_data)
-            msg = UnifiedMessage(
+            return UnifiedMessage(
                 source=MessageSource.FEISHU,
                 content=text or "",
                 message_type="image",
                 sender_id=open_id,
                 chat_id=chat_id,
-                image_data=image_data,
-                image_key=image_key,
-                image_path=image_path,
-                raw_data={"message_id": message_id, "message_type": "post"},
+                media=attachments[0],
+                attachments=attachments if len(attachments) > 1 else [],
+                image_key=image_keys[0],
+                image_path=attachments[0].path,
+                raw_data={
+                    "message_id": message_id,
+                    "message_type": "post",
+                    "image_keys": image_keys,
+                },
             )
-            self._publish_to_bus(msg)
-        elif text:
-            msg = UnifiedMessage(
+        if text:
+            return UnifiedMessage(
                 source=MessageSource.FEISHU,
                 content=text,
                 message_type="text",
@@ -319,25 +398,43 @@ class FeishuManager:
                 chat_id=chat_id,
                 raw_data={"message_id": message_id, "message_type": "post"},
             )
-            self._publish_to_bus(msg)
+        self.reply_message(message_id, "发送富文本内容失败。")
+        return None
+
+    def _download_images(
+        self, message_id: str, image_keys: list[str]
+    ) -> Optional[list[MediaHandle]]:
+        """
+        并发下载、压缩并保存富文本中的全部图片，按原顺序返回；任意一张失败返回 None
+
+        单张图片直接在当前线程处理；文件名为 {message_id}.jpg 或 {message_id}_{序号}.jpg。
+        """
+
+        def download(index: int, image_key: str) -> Optional[MediaHandle]:
+            image_data = self.get_feishu_image_data(message_id, image_key)
+            if not image_data:
+                return None
+            name = message_id if len(image_keys) == 1 else f"{message_id}_{index}"
+            return self._save_image(name, image_data)
+
+        if len(image_keys) == 1:
+            results = [download(0, image_keys[0])]
         else:
-            self.reply_message(message_id, "发送富文本内容失败。")
-
-    def _save_image(self, event_id: str, image_data: bytes) -> str:
-        """保存图片到文件系统，返回相对路径"""
-        image_dir = Path("data/images")
-        image_dir.mkdir(parents=True, exist_ok=True)
-        image_path = f"data/images/{event_id}.jpg"
-        Path(image_path).write_bytes(image_data)
-        return image_path
-
-    def _publish_to_bus(self, message: UnifiedMessage) -> None:
-        """线程安全地将消息发布到主事件循环的 EventBus"""
-        try:
-            future = asyncio.run_coroutine_threadsafe(bus.publish(message), self.main_loop)
-            future.result(timeout=10.0)
-        except Exception as e:
-            logger.error(f"发布消息到 EventBus 失败: {e}", exc_info=True)
+            # 每个任务复制一份 context，span 归入当前消息的 trace
+            futures = [
+                self._image_executor.submit(contextvars.copy_context().run, download, i, key)
+                for i, key in enumerate(image_keys)
+            ]
+            results = [future.result() for future in futures]
+
+        if not all(results):
+            return None
+        return [media for media in results if media is not None]
+
+    def _save_image(self, event_id: str, image_data: bytes) -> MediaHandle:
+        """保存图片到文件系统，返回文件引用（路径为相对路径）"""
+        with tracer.span("feishu.save_image", size=len(image_data)):
+            return MediaHandle.from_bytes(image_data, f"data/images/{event_id}.jpg")
 
     def _run_in_thread(self) -> None:
         """在独立线程中运行 lark.ws.Client WebSocket 长连接"""
@@ -396,8 +493,10 @@ class FeishuManager:
         self.thread.start()
         logger.info("Feishu thread started")
 
-    def stop(self) -> None:
-        """停止飞书客户端"""
+    async def stop(self) -> None:
+        """停止飞书客户端：等待接入管线中已接收的消息处理完成"""
+        await self._ingest.stop()
+        self._image_executor.shutdown(wait=False, cancel_futures=True)
         if self.thread and self.thread.is_alive():
             logger.info("Feishu thread is daemon, will stop with main process")
 
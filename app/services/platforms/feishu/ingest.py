@@ -0,0 +1,128 @@
+"""
+Feishu Ingestion Pipeline
+飞书消息接入管线 - 让 WebSocket 回调立即返回
+
+为什么需要接入管线？
+SDK 回调在 WebSocket 线程上串行执行，图片消息要下载、压缩、落盘，
+再等待 EventBus 发布完成。一张慢图片会拖住之后所有飞书事件。
+
+管线设计：
+- submit() 线程安全、不阻塞：只做计数和 call_soon_threadsafe
+- 同一 key（chat_id）的任务按提交顺序串行处理，不同 key 之间并发
+- 阻塞部分（下载/压缩/落盘）在有界线程池中执行，发布在主事件循环中执行
+- 待处理任务总数有上限，超出时 submit() 返回 False 由调用方处理
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.schemas.event import UnifiedMessage
+
+IngestJob = Callable[[], Optional[UnifiedMessage]]
+
+
+class IngestPipeline:
+    """按 key 保序、跨 key 并发的有界接入管线"""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        publish: Callable[[UnifiedMessage], Awaitable[None]],
+        max_workers: int = 4,
+        max_pending: int = 100,
+        name: str = "ingest",
+    ):
+        self.loop = loop
+        self.publish = publish
+        self.max_pending = max_pending
+        self.name = name
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix=f"{name}-worker"
+        )
+        self._queues: dict[str, deque[IngestJob]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def submit(self, key: str, job: IngestJob) -> bool:
+        """
+        提交任务（可在任意线程调用，立即返回）
+
+        Returns:
+            False 表示管线已满或已关闭，任务未被接受
+        """
+        with self._lock:
+            if self._closed or self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, key, job)
+        except RuntimeError:
+            # 主事件循环已关闭
+            with self._lock:
+                self._pending -= 1
+            return False
+        return True
+
+    def _enqueue(self, key: str, job: IngestJob) -> None:
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(job)
+            return
+        self._queues[key] = deque([job])
+        task = self.loop.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: str) -> None:
+        """依次处理同一 key 的任务，队列清空后退出"""
+        queue = self._queues[key]
+        try:
+            while queue:
+                job = queue.popleft()
+                try:
+                    message = await self.loop.run_in_executor(self._executor, job)
+                    if message is not None:
+                        await self.publish(message)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"{self.name} job failed for {key}: {e}", exc_info=True)
+                finally:
+                    with self._lock:
+                        self._pending -= 1
+        finally:
+            self._queues.pop(key, None)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """停止接收新任务，等待已提交任务完成（超时后取消）"""
+        with self._lock:
+            self._closed = True
+        # 让已提交但尚未入队的 _enqueue 回调先执行
+        await asyncio.sleep(0)
+        deadline = self.loop.time() + timeout
+        while self._tasks:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.wait(list(self._tasks), timeout=remaining)
+
+        still_running = list(self._tasks)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            logger.warning(
+                f"{self.name} pipeline stopped with {len(still_running)} chat(s) pending"
+            )
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,9 @@
 """Per-platform text limit helpers."""
 
 from dataclasses import dataclass
+from typing import Literal, Optional
+
+from app.utils.text import TextAnalysis, count_graphemes
 
 
 @dataclass(frozen=True)
@@ -8,6 +11,23 @@ class TextLimit:
     platform: str
     reply_label: str
     default_limit: int
+    # 平台计算字数的方式
+    unit: Literal["code_points", "graphemes"] = "code_points"
+    # UTF-8 字节数上限（Bluesky 同时限制 300 字素簇和 3000 字节）
+    max_bytes: Optional[int] = None
+
+    def count(self, text: str) -> int:
+        """按平台的方式计算字数"""
+        return count_graphemes(text) if self.unit == "graphemes" else len(text)
+
+    def length(self, analysis: TextAnalysis) -> int:
+        return analysis.graphemes if self.unit == "graphemes" else analysis.code_points
+
+    def exceeds(self, analysis: TextAnalysis, max_characters: int | None = None) -> bool:
+        """文本是否超过字数（或字节数）限制"""
+        if self.length(analysis) > (max_characters or self.default_limit):
+            return True
+        return self.max_bytes is not None and analysis.utf8_bytes > self.max_bytes
 
 
 FANFOU_TEXT_LIMIT = TextLimit(
@@ -26,6 +46,8 @@ BLUESKY_TEXT_LIMIT = TextLimit(
     platform="bluesky",
     reply_label="Bluesky",
     default_limit=300,
+    unit="graphemes",
+    max_bytes=3000,
 )
 
 MASTODON_TEXT_LIMIT = TextLimit(
@@ -61,3 +83,19 @@ def caption_too_long_error(limit: TextLimit, max_characters: int | None = None)
     if actual_limit == limit.default_limit:
         return f"图片说明超过 {limit.reply_label} {actual_limit} 字限制"
     return f"图片说明超过 {limit.reply_label} 实例 {actual_limit} 字限制"
+
+
+def images_dropped_note(reply_label: str, max_images: int, total: int) -> str:
+    """图片数超过平台单条上限时附加在成功回复后的提示；未超限返回空字符串"""
+    if total <= max_images:
+        return ""
+    return f"\n[{reply_label}] 单条最多 {max_images} 张图片，其余 {total - max_images} 张未发送"
+
+
+def thread_note(reply_label: str, posted: int, total: int) -> str:
+    """长文以回复串发布时附加在成功回复后的说明"""
+    if total <= 1:
+        return ""
+    if posted < total:
+        return f"\n[{reply_label}] 长文拆分为 {total} 条，仅发布了前 {posted} 条"
+    return f"\n[{reply_label}] 长文已拆分为 {total} 条回复串发布"
@@ -3,22 +3,36 @@ Mastodon Platform Sink
 Mastodon 平台消费者 - 接收统一消息并发送到 Mastodon
 """
 
+import asyncio
 import json
 from typing import ClassVar, Optional
+from uuid import uuid4
 
 import httpx
 from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.http import http_client
+from app.core.resilience import host_of, is_transient_response, resilience
 from app.schemas.event import UnifiedMessage
+from app.schemas.media import ImageSource, upload_file
+from app.services.media.uploads import upload_slots
 from app.services.platforms.limits import (
     MASTODON_TEXT_LIMIT,
     caption_too_long_error,
     caption_too_long_reply,
+    images_dropped_note,
     text_too_long_error,
     text_too_long_reply,
+    thread_note,
 )
+from app.services.platforms.splitter import post_reply_chain, thread_chunks
+
+# 单条嘟文最多附带的图片数
+MASTODON_MEDIA_LIMIT = 4
+# 媒体处理状态轮询的最大间隔（秒）
+MASTODON_MEDIA_POLL_MAX_INTERVAL = 5.0
 
 
 class MastodonClient:
@@ -55,7 +69,7 @@ class MastodonClient:
     async def _fetch_max_characters(self) -> int:
         endpoints = ("/api/v2/instance", "/api/v1/instance")
 
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client("mastodon") as client:
             for endpoint in endpoints:
                 try:
                     response = await client.get(f"{self.base_url}{endpoint}")
@@ -91,23 +105,19 @@ class MastodonClient:
             return max_characters
         return None
 
-    async def post_text(self, text: str) -> Optional[dict]:
-        """发布纯文本状态。"""
+    async def post_text(self, text: str, in_reply_to_id: Optional[str] = None) -> Optional[dict]:
+        """发布纯文本状态；in_reply_to_id 不为空时作为该状态的回复。"""
         if not self.access_token:
             return None
 
-        data = {
+        data: dict[str, str | list[str]] = {
             "status": text,
             "visibility": self.visibility,
         }
+        if in_reply_to_id:
+            data["in_reply_to_id"] = in_reply_to_id
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.post(
-                f"{self.base_url}/api/v1/statuses",
-                headers=self._headers(),
-                data=data,
-            )
-
+        response = await self._post_status(data, "text post")
         if response.is_success:
             return response.json()
 
@@ -118,33 +128,44 @@ class MastodonClient:
         )
         return None
 
+    async def post_thread(self, chunks: list[str]) -> list[dict]:
+        """以回复串发布多条文本：每条回复上一条（需要上一条的状态 id，只能依次发送）。"""
+        return await post_reply_chain(
+            chunks,
+            lambda chunk, parent: self.post_text(chunk, str(parent["id"]) if parent else None),
+        )
+
     async def post_image(
         self,
-        image_data: bytes,
+        image: ImageSource,
         text: Optional[str] = None,
     ) -> Optional[dict]:
-        """上传图片并发布带图状态。"""
-        if not self.access_token:
+        """上传图片并发布带图状态。image 可以是字节或文件引用（从磁盘流式上传）。"""
+        return await self.post_images([image], text)
+
+    async def post_images(
+        self,
+        images: list[ImageSource],
+        text: Optional[str] = None,
+    ) -> Optional[dict]:
+        """并发上传多张图片（最多 MASTODON_MEDIA_LIMIT 张），发布一条带全部图片的状态。"""
+        if not self.access_token or not images:
             return None
 
-        media = await self._upload_media(image_data)
-        if not media:
+        uploaded = await asyncio.gather(
+            *(self._prepare_media(image) for image in images[:MASTODON_MEDIA_LIMIT])
+        )
+        if not all(uploaded):
             return None
 
-        data: dict[str, str] = {
+        data: dict[str, str | list[str]] = {
             "visibility": self.visibility,
-            "media_ids[]": str(media["id"]),
+            "media_ids[]": [str(media["id"]) for media in uploaded if media],
         }
         if text:
             data["status"] = text
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.post(
-                f"{self.base_url}/api/v1/statuses",
-                headers=self._headers(),
-                data=data,
-            )
-
+        response = await self._post_status(data, "image post")
         if response.is_success:
             return response.json()
 
@@ -155,14 +176,93 @@ class MastodonClient:
         )
         return None
 
-    async def _upload_media(self, image_data: bytes) -> Optional[dict]:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{self.base_url}/api/v2/media",
-                headers=self._headers(),
-                files={"file": ("image.jpg", image_data, "image/jpeg")},
+    async def _post_status(
+        self, data: dict[str, str | list[str]], operation_name: str
+    ) -> httpx.Response:
+        # 同一个 Idempotency-Key 的重复请求只会发布一次，重试不会产生重复嘟文
+        headers = {**self._headers(), "Idempotency-Key": uuid4().hex}
+
+        async def request() -> httpx.Response:
+            async with http_client("mastodon") as client:
+                return await client.post(
+                    f"{self.base_url}/api/v1/statuses",
+                    headers=headers,
+                    data=data,
+                )
+
+        return await resilience.call(
+            host_of(self.base_url),
+            request,
+            name=f"Mastodon {operation_name}",
+            is_transient=is_transient_response,
+        )
+
+    async def _prepare_media(self, image: ImageSource) -> Optional[dict]:
+        """上传一张图片（占用 mastodon 上传槽位），需要异步处理时在槽位外等待处理完成"""
+        media = await upload_slots.run("mastodon", lambda: self._upload_media(image))
+        if media and media.get("url") is None:
+            # 202 Accepted：媒体仍在处理，url 为空，发帖前需要等待处理完成
+            return await self._wait_for_media(str(media["id"]))
+        return media
+
+    async def _wait_for_media(self, media_id: str) -> Optional[dict]:
+        """轮询 GET /api/v1/media/:id 直到处理完成（200），206 表示仍在处理"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.mastodon_media_poll_timeout
+        interval = settings.mastodon_media_poll_interval
+
+        async def request() -> httpx.Response:
+            async with http_client("mastodon") as client:
+                return await client.get(
+                    f"{self.base_url}/api/v1/media/{media_id}",
+                    headers=self._headers(),
+                )
+
+        while True:
+            await asyncio.sleep(min(interval, max(0.0, deadline - loop.time())))
+            response = await resilience.call(
+                host_of(self.base_url),
+                request,
+                name="Mastodon media status",
+                is_transient=is_transient_response,
             )
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 206:
+                logger.error(
+                    "Mastodon media processing failed: media_id={} status_code={} body={}",
+                    media_id,
+                    response.status_code,
+                    response.text,
+                )
+                return None
+            if loop.time() >= deadline:
+                logger.error(
+                    "Mastodon media not processed in {}s: media_id={}",
+                    settings.mastodon_media_poll_timeout,
+                    media_id,
+                )
+                return None
+            interval = min(interval * 2, MASTODON_MEDIA_POLL_MAX_INTERVAL)
+
+    async def _upload_media(self, image: ImageSource) -> Optional[dict]:
+        async def request() -> httpx.Response:
+            # 每次尝试重新打开图片，文件流可以从头读取
+            async with http_client("mastodon") as client:
+                with upload_file(image) as file:
+                    return await client.post(
+                        f"{self.base_url}/api/v2/media",
+                        headers=self._headers(),
+                        files={"file": file},
+                        timeout=30,
+                    )
 
+        response = await resilience.call(
+            host_of(self.base_url),
+            request,
+            name="Mastodon media upload",
+            is_transient=is_transient_response,
+        )
         if response.is_success:
             return response.json()
 
@@ -194,7 +294,8 @@ class MastodonClient:
 
         reply_service = ReplyService.get_instance()
         max_characters = await self.get_max_characters()
-        if len(message.content) > max_characters:
+        chunks = thread_chunks(message.content, MASTODON_TEXT_LIMIT, max_characters)
+        if chunks is None:
             if reply_service:
                 reply_service.reply(
                     message,
@@ -207,11 +308,16 @@ class MastodonClient:
             )
             return
 
-        ret = await self.post_text(message.content)
+        posted = await self.post_thread(chunks)
+        ret = posted[0] if posted else None
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
-            reply_service.reply(message, self._success_text(ret))
+            reply_service.reply(
+                message,
+                self._success_text(ret)
+                + thread_note(MASTODON_TEXT_LIMIT.reply_label, len(posted), len(chunks)),
+            )
         elif reply_service:
             reply_service.reply(message, "[Mastodon] 消息发送失败")
 
@@ -219,14 +325,15 @@ class MastodonClient:
         from app.core.reply import ReplyService
 
         reply_service = ReplyService.get_instance()
-        if not message.image_data:
+        images = message.image_sources()
+        if not images:
             if reply_service:
                 reply_service.reply(message, "[Mastodon] 图片数据为空，无法发送。")
             return
 
         if message.content:
             max_characters = await self.get_max_characters()
-            if len(message.content) > max_characters:
+            if MASTODON_TEXT_LIMIT.count(message.content) > max_characters:
                 if reply_service:
                     reply_service.reply(
                         message,
@@ -239,11 +346,17 @@ class MastodonClient:
                 )
                 return
 
-        ret = await self.post_image(message.image_data, message.content or None)
+        ret = await self.post_images(images, message.content or None)
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
-            reply_service.reply(message, self._success_text(ret))
+            reply_service.reply(
+                message,
+                self._success_text(ret)
+                + images_dropped_note(
+                    MASTODON_TEXT_LIMIT.reply_label, MASTODON_MEDIA_LIMIT, len(images)
+                ),
+            )
         elif reply_service:
             reply_service.reply(message, "[Mastodon] 图片发送失败")
 
@@ -291,7 +404,7 @@ class MastodonClient:
         if cls._instance is not None:
             raise RuntimeError("MastodonClient instance already exists")
         cls._instance = cls()
-        bus.register(cls._instance.handle_message)
+        bus.register(cls._instance.handle_message, sink="mastodon")
         logger.info("Mastodon client registered to event bus")
         return cls._instance
 
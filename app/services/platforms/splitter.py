@@ -0,0 +1,210 @@
+"""
+Long Text Splitter
+长文拆分 - 超过平台字数限制的文本拆成多条，以回复链（thread）发布
+
+为什么需要拆分？
+饭否 140 字、Bluesky 300 字、Mastodon 默认 500 字，超出的文本以前直接被拒绝，
+用户只能手动删减后重发。拆分后第一条作为主帖，后续每条回复上一条，
+在各平台上显示为一个连续的串。
+
+- 按平台的计数方式计算长度（Bluesky 按字素簇，饭否/Mastodon 按码位），
+  不会把 emoji、国旗、组合字符切成两半
+- 优先在段落/换行处断开，其次句末标点，再次逗号等分句标点和空白，
+  都找不到时才在字素簇边界硬切
+- 每条末尾追加 " (序号/总数)"，追加后的长度也不超过限制
+
+用法示例：
+```python
+chunks = split_text(text, 300, count_graphemes)
+posted = await post_reply_chain(chunks, lambda chunk, parent: client.post(chunk, parent))
+```
+"""
+
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.core.config import settings
+from app.services.platforms.limits import TextLimit
+from app.utils.text import TextAnalysis, analyze_text, count_code_points, graphemes, utf8_length
+
+T = TypeVar("T")
+
+TextCounter = Callable[[str], int]
+
+# 句末标点（中英文）；英文句号只在后面是空白时算句末，避免切开 1.5、example.com
+_SENTENCE_ENDS = set("。！？!?…")
+_ASCII_SENTENCE_ENDS = set(".")
+_CLOSING_QUOTES = set("\"'”’」』）)》")
+_CLAUSE_MARKS = set("，,；;、：:")
+
+# 断点优先级：数值越大越优先
+_LINE_BREAK = 3
+_SENTENCE_BREAK = 2
+_CLAUSE_BREAK = 1
+
+
+def _break_priority(clusters: list[str], index: int) -> int:
+    """clusters[index - 1] 与 clusters[index] 之间作为断点的优先级，0 表示不宜断开"""
+    prev = clusters[index - 1]
+    following = clusters[index] if index < len(clusters) else ""
+    if prev == "\n" or prev == "\r\n":
+        return _LINE_BREAK
+
+    end = prev
+    if prev in _CLOSING_QUOTES and index >= 2:
+        end = clusters[index - 2]
+    if end in _SENTENCE_ENDS:
+        return _SENTENCE_BREAK
+    if end in _ASCII_SENTENCE_ENDS and (not following or following.isspace()):
+        return _SENTENCE_BREAK
+
+    if prev in _CLAUSE_MARKS or following.isspace():
+        return _CLAUSE_BREAK
+    return 0
+
+
+def _split(
+    clusters: list[str], budget: int, count: TextCounter, byte_budget: Optional[int]
+) -> list[str]:
+    chunks: list[str] = []
+    start = 0
+    total = len(clusters)
+    while start < total:
+        while start < total and clusters[start].isspace():
+            start += 1
+        if start >= total:
+            break
+
+        used = 0
+        used_bytes = 0
+        end = start
+        best: dict[int, int] = {}
+        while end < total:
+            size = count(clusters[end])
+            size_bytes = utf8_length(clusters[end])
+            too_long = used + size > budget or (
+                byte_budget is not None and used_bytes + size_bytes > byte_budget
+            )
+            if too_long and end > start:
+                break
+            used += size
+            used_bytes += size_bytes
+            end += 1
+            priority = _break_priority(clusters, end)
+            if priority:
+                best[priority] = end
+
+        cut = end
+        if end < total:
+            # 断点太靠前会产生过短的一条，要求至少用掉一半长度
+            min_cut = start + (end - start) // 2
+            for priority in (_LINE_BREAK, _SENTENCE_BREAK, _CLAUSE_BREAK):
+                if best.get(priority, 0) > min_cut:
+                    cut = best[priority]
+                    break
+
+        chunk = "".join(clusters[start:cut]).strip()
+        if chunk:
+            chunks.append(chunk)
+        start = cut
+    return chunks
+
+
+def split_text(
+    text: str,
+    limit: int,
+    count: TextCounter = count_code_points,
+    *,
+    numbering: bool = True,
+    max_bytes: Optional[int] = None,
+) -> list[str]:
+    """
+    把文本拆成每条不超过 limit 的若干条
+
+    Args:
+        limit: 单条长度上限（按 count 计算）
+        count: 平台的计数方式
+        numbering: 是否在每条末尾追加 " (序号/总数)"
+        max_bytes: 单条 UTF-8 字节数上限（可选）
+
+    Returns:
+        未超限时返回 [text]；否则按顺序返回各条文本
+    """
+    text = text.strip()
+    if count(text) <= limit and (max_bytes is None or utf8_length(text) <= max_bytes):
+        return [text]
+
+    clusters = graphemes(text)
+    if not numbering:
+        return _split(clusters, limit, count, max_bytes)
+
+    # 序号占用的长度取决于总条数的位数，总条数变化时重新拆分直到稳定
+    expected = 2
+    while True:
+        suffix = f" ({expected}/{expected})"
+        chunks = _split(
+            clusters,
+            max(1, limit - count(suffix)),
+            count,
+            max(1, max_bytes - len(suffix)) if max_bytes is not None else None,
+        )
+        if len(str(len(chunks))) <= len(str(expected)):
+            break
+        expected = len(chunks)
+
+    total = len(chunks)
+    return [f"{chunk} ({index}/{total})" for index, chunk in enumerate(chunks, start=1)]
+
+
+def thread_chunks(
+    text: str,
+    limit: TextLimit,
+    max_characters: Optional[int] = None,
+    analysis: Optional[TextAnalysis] = None,
+) -> Optional[list[str]]:
+    """
+    按配置拆分超长文本
+
+    Args:
+        limit: 平台的字数限制与计数方式
+        max_characters: 实例实际限制（如 Mastodon 实例配置），为空时使用平台默认值
+        analysis: 已有的文本分析结果，避免重复解析
+
+    Returns:
+        未超限时返回 [text]；关闭拆分或拆分后条数超过 long_text_max_posts 时返回 None（应拒绝发送）
+    """
+    analysis = analysis or analyze_text(text)
+    if not limit.exceeds(analysis, max_characters):
+        return [text]
+    if not settings.long_text_threading_enabled:
+        return None
+    chunks = split_text(
+        text,
+        max_characters or limit.default_limit,
+        limit.count,
+        numbering=settings.long_text_numbering,
+        max_bytes=limit.max_bytes,
+    )
+    if len(chunks) > settings.long_text_max_posts:
+        return None
+    return chunks
+
+
+async def post_reply_chain(
+    chunks: list[str],
+    post: Callable[[str, Optional[T]], Awaitable[Optional[T]]],
+) -> list[T]:
+    """
+    按顺序发布回复链：每条作为上一条的回复
+
+    post(chunk, parent) 发布一条并返回结果，parent 为上一条的发布结果（第一条为 None）。
+    某条失败时停止，返回已发布的结果（可能少于 chunks）。
+    """
+    posted: list[T] = []
+    parent: Optional[T] = None
+    for chunk in chunks:
+        result = await post(chunk, parent)
+        if result is None:
+            break
+        posted.append(result)
+        parent = result
+    return posted
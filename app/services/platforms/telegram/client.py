@@ -3,23 +3,69 @@ Telegram Platform Adapter
 Telegram 平台适配器 - 使用 aiogram 异步客户端
 
 职责：
-1. Source: 通过 polling 接收 Telegram 消息，转换为 UnifiedMessage 发布到事件总线
+1. Source: 通过 polling 或 webhook 接收 Telegram 消息，转换为 UnifiedMessage 发布到事件总线
 2. Sink: 监听事件总线消息，转发到配置的 Telegram 频道/群组
 """
 
 import asyncio
 import json
-from typing import ClassVar, Optional
+import mimetypes
+import secrets
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar, Optional, Union
 
+import aiohttp
 from aiogram import Bot, Dispatcher, types
 from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
 from aiogram.filters import Command
-from aiogram.types import BufferedInputFile
+from aiogram.types import BufferedInputFile, FSInputFile, InputFile, InputMediaPhoto
 from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.ratelimit import rate_limiter
+from app.core.resilience import resilience
+from app.core.tracing import tracer
 from app.schemas.event import MessageSource, UnifiedMessage
+from app.schemas.media import ImageSource, MediaHandle
+from app.services.platforms.limits import images_dropped_note
+
+TELEGRAM_API_HOST = "api.telegram.org"
+TELEGRAM_ALBUM_LIMIT = 10
+IMAGE_DIR = Path("data/images")
+
+# 可作为图片接收的附件：压缩后的照片或以文件形式发送的图片
+ImageAttachment = Union[types.PhotoSize, types.Document]
+
+
+def _is_unsent_error(error: BaseException) -> bool:
+    """aiogram 把 aiohttp 错误包装为 TelegramNetworkError；只有连接失败时请求确定没有发出"""
+    return isinstance(error.__cause__, aiohttp.ClientConnectorError)
+
+
+def select_photo_size(photos: list[types.PhotoSize], target_dimension: int) -> types.PhotoSize:
+    """
+    选择要下载的照片尺寸
+
+    Telegram 为每张照片提供多个缩放版本。取最长边不小于 target_dimension 的最小版本，
+    都不够大时取最大的版本，避免下载用不到的原图。
+    """
+    ordered = sorted(photos, key=lambda photo: photo.width * photo.height)
+    for photo in ordered:
+        if max(photo.width, photo.height) >= target_dimension:
+            return photo
+    return ordered[-1]
+
+
+@dataclass
+class _PendingAlbum:
+    """正在聚合的相册（同一 media_group_id 的消息）"""
+
+    messages: list[types.Message]
+    last_seen: float
 
 
 class TelegramClient:
@@ -39,6 +85,10 @@ class TelegramClient:
         self.bot: Optional[Bot] = None
         self.dp: Optional[Dispatcher] = None
         self._polling_task: Optional[asyncio.Task] = None
+        self._webhook_active: bool = False
+        self._webhook_secret: str = ""
+        self._update_tasks: set[asyncio.Task] = set()
+        self._albums: dict[str, _PendingAlbum] = {}
         self._channel_id: str = settings.telegram_channel_id
         self._channel_name: str = ""
 
@@ -91,9 +141,17 @@ class TelegramClient:
             logger.debug("Skipping message without sender info")
             return
 
-        # 只处理文本消息
+        # 图片消息：相册先聚合，单张直接处理
+        if self._image_attachment(message) is not None:
+            if message.media_group_id:
+                self._collect_album(message)
+            else:
+                await self._publish_images([message])
+            return
+
+        # 其余只处理文本消息
         if not message.text:
-            logger.debug(f"Skipping non-text message from {message.from_user.id}")
+            logger.debug(f"Skipping unsupported message from {message.from_user.id}")
             return
 
         # 识别命令消息（/login fanfou, /logout fanfou 等）
@@ -106,51 +164,187 @@ class TelegramClient:
             command = message.text
             content = message.text
 
-        # 构建统一消息对象
-        unified_msg = UnifiedMessage(
-            source=MessageSource.TELEGRAM,
-            content=content,
-            sender_id=str(message.from_user.id),
-            sender_name=message.from_user.full_name,
-            chat_id=str(message.chat.id),
-            command=command,
-            raw_data={
-                "message_id": message.message_id,
-                "chat_type": message.chat.type,
-                "username": message.from_user.username,
-                "date": message.date.isoformat() if message.date else None,
-            },
-        )
+        with tracer.trace() as trace, tracer.span("telegram.receive"):
+            # 构建统一消息对象
+            unified_msg = UnifiedMessage(
+                source=MessageSource.TELEGRAM,
+                content=content,
+                sender_id=str(message.from_user.id),
+                sender_name=message.from_user.full_name,
+                chat_id=str(message.chat.id),
+                command=command,
+                raw_data=self._raw_data(message),
+            )
+            trace.bind(unified_msg.event_id)
 
-        logger.info(
-            f"Received Telegram message: {unified_msg.event_id} "
-            f"from {unified_msg.sender_name} ({unified_msg.sender_id})"
-        )
+            logger.info(
+                f"Received Telegram message: {unified_msg.event_id} "
+                f"from {unified_msg.sender_name} ({unified_msg.sender_id})"
+            )
 
-        # 发布到事件总线
-        await bus.publish(unified_msg)
+            # 发布到事件总线
+            await bus.publish(unified_msg)
 
         # 发送确认消息（不再在这里直接回复，由 Sink 通过 ReplyService 回复）
 
+    @staticmethod
+    def _raw_data(message: types.Message) -> dict:
+        assert message.from_user is not None
+        return {
+            "message_id": message.message_id,
+            "chat_type": message.chat.type,
+            "username": message.from_user.username,
+            "date": message.date.isoformat() if message.date else None,
+        }
+
+    def _image_attachment(self, message: types.Message) -> Optional[ImageAttachment]:
+        """消息中要下载的图片：照片取合适尺寸，文件只接受 image/* 类型"""
+        if message.photo:
+            return select_photo_size(message.photo, settings.telegram_photo_target_dimension)
+        document = message.document
+        if document and (document.mime_type or "").startswith("image/"):
+            return document
+        return None
+
+    def _collect_album(self, message: types.Message) -> None:
+        """
+        聚合相册
+
+        Telegram 把相册拆成多条带相同 media_group_id 的消息依次推送，
+        最后一条到达后静默 telegram_media_group_window 秒再作为一条多图消息发布。
+        """
+        assert message.media_group_id is not None
+        loop = asyncio.get_running_loop()
+        album = self._albums.get(message.media_group_id)
+        if album is not None:
+            album.messages.append(message)
+            album.last_seen = loop.time()
+            return
+
+        self._albums[message.media_group_id] = _PendingAlbum([message], loop.time())
+        task = asyncio.create_task(self._flush_album(message.media_group_id))
+        self._update_tasks.add(task)
+        task.add_done_callback(self._update_tasks.discard)
+
+    async def _flush_album(self, media_group_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            album = self._albums[media_group_id]
+            delay = album.last_seen + settings.telegram_media_group_window - loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        album = self._albums.pop(media_group_id)
+        messages = sorted(album.messages, key=lambda m: m.message_id)
+        if len(messages) > TELEGRAM_ALBUM_LIMIT:
+            logger.warning(f"Telegram album {media_group_id} has {len(messages)} items, truncating")
+            messages = messages[:TELEGRAM_ALBUM_LIMIT]
+
+        try:
+            await self._publish_images(messages)
+        except Exception as e:
+            logger.error(f"Error processing Telegram album {media_group_id}: {e}", exc_info=True)
+            await messages[0].answer("❌ Sorry, failed to process your message.")
+
+    async def _publish_images(self, messages: list[types.Message]) -> None:
+        """并发下载一条或一组图片消息，作为一条多图 UnifiedMessage 发布"""
+        first = messages[0]
+        assert first.from_user is not None
+        caption = next((m.caption for m in messages if m.caption), "")
+
+        with (
+            tracer.trace() as trace,
+            tracer.span("telegram.receive", images=len(messages)),
+        ):
+            downloads = await asyncio.gather(
+                *(self._download_image(m) for m in messages),
+                return_exceptions=True,
+            )
+            attachments = [media for media in downloads if isinstance(media, MediaHandle)]
+            for error in downloads:
+                if isinstance(error, BaseException):
+                    logger.error(f"Telegram image download failed: {error}")
+            if not attachments:
+                await first.answer("❌ 下载图片失败，无法发送。")
+                return
+
+            raw_data = self._raw_data(first)
+            if first.media_group_id:
+                raw_data["media_group_id"] = first.media_group_id
+                raw_data["message_ids"] = [m.message_id for m in messages]
+
+            unified_msg = UnifiedMessage(
+                source=MessageSource.TELEGRAM,
+                content=caption,
+                message_type="image",
+                sender_id=str(first.from_user.id),
+                sender_name=first.from_user.full_name,
+                chat_id=str(first.chat.id),
+                media=attachments[0],
+                attachments=attachments,
+                image_path=attachments[0].path,
+                raw_data=raw_data,
+            )
+            trace.bind(unified_msg.event_id)
+
+            logger.info(
+                f"Received Telegram image message: {unified_msg.event_id} "
+                f"with {len(attachments)} image(s) "
+                f"from {unified_msg.sender_name} ({unified_msg.sender_id})"
+            )
+            await bus.publish(unified_msg)
+
+    async def _download_image(self, message: types.Message) -> Optional[MediaHandle]:
+        """把图片流式下载到 data/images（先写临时文件再 rename），返回文件引用"""
+        assert self.bot is not None, "Bot not initialized"
+        attachment = self._image_attachment(message)
+        if attachment is None:
+            return None
+
+        max_bytes = int(settings.telegram_max_download_mb * 1024 * 1024)
+        if attachment.file_size and attachment.file_size > max_bytes:
+            logger.warning(
+                f"Skipping Telegram image {attachment.file_unique_id}: "
+                f"{attachment.file_size} bytes exceeds {max_bytes}"
+            )
+            return None
+
+        content_type = getattr(attachment, "mime_type", None) or "image/jpeg"
+        extension = mimetypes.guess_extension(content_type) or ".jpg"
+        target = IMAGE_DIR / f"telegram_{message.chat.id}_{message.message_id}{extension}"
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        with tracer.span("telegram.download_image", size=attachment.file_size or 0):
+            try:
+                await self.bot.download(attachment, destination=tmp_path)
+                tmp_path.replace(target)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            return await asyncio.to_thread(MediaHandle.from_path, target, content_type)
+
     async def start(self) -> None:
         """
         启动 Telegram 客户端
 
-        使用 polling 方式接收消息：
-        - 优点：简单，不需要公网 IP 和 SSL 证书
-        - 缺点：会有轻微延迟（通常 1-2 秒）
-
-        生产环境建议使用 webhook 方式
+        接收方式：
+        - polling（默认）：简单，不需要公网 IP 和 SSL 证书，但会有轻微延迟（通常 1-2 秒）
+        - webhook（配置 TELEGRAM_WEBHOOK_URL 时）：Telegram 主动推送到 /webhook/telegram，
+          延迟更低且没有常驻的长轮询连接，生产环境建议使用
         """
-        if self._polling_task and not self._polling_task.done():
+        if self.is_running:
             logger.warning("Telegram client already running")
             return
 
         try:
-            # 初始化 Bot 和 Dispatcher（支持代理）
-            session = (
-                AiohttpSession(proxy=settings.telegram_proxy) if settings.telegram_proxy else None
-            )
+            # 初始化 Bot 和 Dispatcher（支持代理和自建 Bot API 服务）
+            session_kwargs: dict = {}
+            if settings.telegram_proxy:
+                session_kwargs["proxy"] = settings.telegram_proxy
+            if settings.telegram_api_server:
+                session_kwargs["api"] = TelegramAPIServer.from_base(settings.telegram_api_server)
+            session = AiohttpSession(**session_kwargs) if session_kwargs else None
             self.bot = Bot(token=settings.telegram_bot_token, session=session)
             self.dp = Dispatcher()
 
@@ -176,14 +370,63 @@ class TelegramClient:
                     logger.warning(f"Failed to get channel info: {e}")
                     self._channel_name = self._channel_id
 
-            # 启动 polling
-            logger.info("Starting Telegram polling...")
-            self._polling_task = asyncio.create_task(self._run_polling())
+            if settings.telegram_webhook_url:
+                await self._set_webhook()
+            else:
+                # 启动 polling
+                logger.info("Starting Telegram polling...")
+                self._polling_task = asyncio.create_task(self._run_polling())
 
         except Exception as e:
             logger.error(f"Failed to start Telegram client: {e}", exc_info=True)
             raise
 
+    @property
+    def is_running(self) -> bool:
+        return self._webhook_active or bool(self._polling_task and not self._polling_task.done())
+
+    @property
+    def webhook_active(self) -> bool:
+        return self._webhook_active
+
+    async def _set_webhook(self) -> None:
+        """向 Telegram 注册 webhook；未配置 secret 时每次启动随机生成"""
+        assert self.bot is not None, "Bot not initialized"
+        self._webhook_secret = settings.telegram_webhook_secret or secrets.token_urlsafe(32)
+        await self.bot.set_webhook(
+            url=settings.telegram_webhook_url,
+            secret_token=self._webhook_secret,
+            allowed_updates=["message"],
+        )
+        self._webhook_active = True
+        logger.info(f"Telegram webhook set: {settings.telegram_webhook_url}")
+
+    def verify_webhook_secret(self, secret_token: Optional[str]) -> bool:
+        """校验 X-Telegram-Bot-Api-Secret-Token 请求头"""
+        if not self._webhook_active or not secret_token:
+            return False
+        return secrets.compare_digest(secret_token, self._webhook_secret)
+
+    def feed_webhook_update(self, payload: dict) -> None:
+        """
+        把 webhook 收到的 update 交给 Dispatcher（后台处理，webhook 立即返回 200）
+
+        Raises:
+            pydantic.ValidationError: payload 不是合法的 Update
+        """
+        assert self.bot is not None and self.dp is not None, "Telegram client not started"
+        update = types.Update.model_validate(payload, context={"bot": self.bot})
+        task = asyncio.create_task(self._feed_update(update))
+        self._update_tasks.add(task)
+        task.add_done_callback(self._update_tasks.discard)
+
+    async def _feed_update(self, update: types.Update) -> None:
+        assert self.bot is not None and self.dp is not None
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.error(f"Error handling Telegram update {update.update_id}: {e}", exc_info=True)
+
     async def _run_polling(self) -> None:
         """
         运行 polling 循环
@@ -206,21 +449,35 @@ class TelegramClient:
 
     async def stop(self) -> None:
         """停止 Telegram 客户端"""
-        if not self._polling_task or self._polling_task.done():
+        if not self.is_running:
             logger.warning("Telegram client not running")
             return
 
         logger.info("Stopping Telegram client...")
 
-        # 通知 dispatcher 停止 polling，再取消任务
-        if self.dp:
-            await self.dp.stop_polling()
-        self._polling_task.cancel()
+        if self._polling_task and not self._polling_task.done():
+            # 通知 dispatcher 停止 polling，再取消任务
+            if self.dp:
+                await self.dp.stop_polling()
+            self._polling_task.cancel()
 
-        try:
-            await self._polling_task
-        except asyncio.CancelledError:
-            pass
+            try:
+                await self._polling_task
+            except asyncio.CancelledError:
+                pass
+
+        if self._webhook_active:
+            self._webhook_active = False
+            # 删除 webhook，停机期间的消息留在 Telegram 侧，下次启动后继续投递
+            try:
+                if self.bot:
+                    await self.bot.delete_webhook()
+            except Exception as e:
+                logger.warning(f"Failed to delete Telegram webhook: {e}")
+
+        # 等待已接收的 update 处理完
+        if self._update_tasks:
+            await asyncio.wait(self._update_tasks, timeout=5)
 
         # 关闭 Bot session
         if self.bot:
@@ -276,18 +533,26 @@ class TelegramClient:
 
         reply_service = ReplyService.get_instance()
 
-        if not message.image_data:
+        images = message.image_sources()
+        if not images:
             if reply_service:
                 reply_service.reply(message, f"[{self._channel_name}] 图片数据为空，无法发送。")
             return
 
         caption = self._format_channel_message(message) if message.content else None
-        ret = await self._send_to_channel(image_data=message.image_data, caption=caption)
+        if len(images) > 1:
+            ret = await self._send_to_channel(images=images, caption=caption)
+        else:
+            ret = await self._send_to_channel(image=images[0], caption=caption)
 
         await self._save_sink_result(message, ret)
 
         if reply_service and ret:
-            reply_service.reply(message, f"[{self._channel_name}] 图片发送成功")
+            reply_service.reply(
+                message,
+                f"[{self._channel_name}] 图片发送成功"
+                + images_dropped_note(self._channel_name, TELEGRAM_ALBUM_LIMIT, len(images)),
+            )
         elif reply_service:
             reply_service.reply(message, f"[{self._channel_name}] 图片发送失败")
 
@@ -298,43 +563,78 @@ class TelegramClient:
     async def _send_to_channel(
         self,
         text: Optional[str] = None,
-        image_data: Optional[bytes] = None,
+        image: Optional[ImageSource] = None,
         caption: Optional[str] = None,
+        images: Optional[list[ImageSource]] = None,
     ) -> Optional[dict]:
-        """发送消息到 Telegram 频道，返回结果 dict 或 None"""
+        """发送消息到 Telegram 频道，返回结果 dict 或 None；images 以相册形式发送"""
         try:
-            if self.bot is None:
+            bot = self.bot
+            if bot is None:
                 logger.warning("Telegram bot not initialized")
                 return None
+            if not image and not images and not text:
+                return None
 
             channel_id = (
                 self._channel_id if self._channel_id.startswith("@") else int(self._channel_id)
             )
 
-            if image_data:
-                photo = BufferedInputFile(image_data, filename="image.jpg")
-                result = await self.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=photo,
-                    caption=caption,
-                )
-            elif text:
-                result = await self.bot.send_message(
-                    chat_id=channel_id,
-                    text=text,
-                )
-            else:
-                return None
+            async def send() -> list[types.Message]:
+                # aiogram 使用自己的 aiohttp 会话，不经过共享 httpx 传输层，在此显式限流
+                await rate_limiter.acquire("telegram")
+                if images:
+                    # 说明文字放在相册第一张上，Telegram 客户端会显示为整个相册的说明
+                    media = [
+                        InputMediaPhoto(
+                            media=self._input_file(item), caption=caption if i == 0 else None
+                        )
+                        for i, item in enumerate(images[:TELEGRAM_ALBUM_LIMIT])
+                    ]
+                    return await bot.send_media_group(chat_id=channel_id, media=media)
+                if image:
+                    return [
+                        await bot.send_photo(
+                            chat_id=channel_id,
+                            photo=self._input_file(image),
+                            caption=caption,
+                        )
+                    ]
+                return [await bot.send_message(chat_id=channel_id, text=text or "")]
+
+            results = await resilience.call(
+                TELEGRAM_API_HOST,
+                send,
+                name="Telegram send to channel",
+                retry_on=(TelegramNetworkError, TelegramServerError),
+                # 发送消息不是幂等操作：超时或 5xx 时消息可能已经发出，只在连接失败时重试
+                retry_if=_is_unsent_error,
+            )
 
-            return {
+            result = results[0]
+            ret = {
                 "message_id": result.message_id,
                 "chat_id": result.chat.id,
                 "date": result.date.isoformat() if result.date else None,
             }
+            if len(results) > 1:
+                ret["message_ids"] = [item.message_id for item in results]
+            return ret
+        except TelegramRetryAfter as e:
+            rate_limiter.pause("telegram", e.retry_after)
+            logger.error(f"TelegramSink rate limited, retry after {e.retry_after}s")
+            return None
         except Exception as e:
             logger.error(f"TelegramSink send to channel failed: {e}", exc_info=True)
             return None
 
+    @staticmethod
+    def _input_file(image: ImageSource) -> InputFile:
+        """文件引用使用 FSInputFile 从磁盘分块读取上传，字节使用 BufferedInputFile"""
+        if isinstance(image, MediaHandle):
+            return FSInputFile(image.path, filename=image.filename)
+        return BufferedInputFile(image, filename="image.jpg")
+
     async def _save_sink_result(self, message: UnifiedMessage, ret: Optional[dict]) -> None:
         """保存发送结果到数据库"""
         from app.services.storage.db import DatabaseManager
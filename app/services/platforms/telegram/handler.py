@@ -0,0 +1,42 @@
+"""
+Telegram Webhook Handler
+Telegram Webhook 路由 - webhook 模式下接收 Telegram 推送的 update
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from loguru import logger
+from pydantic import ValidationError
+
+router = APIRouter(tags=["webhook"])
+
+
+@router.post("/webhook/telegram")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(default=None),
+) -> dict:
+    """
+    Telegram webhook 端点
+
+    校验 secret token 后把 update 交给 Dispatcher 在后台处理并立即返回，
+    避免 Telegram 因响应慢而重复投递。
+    """
+    from app.services.platforms.telegram.client import TelegramClient
+
+    client = TelegramClient.get_instance()
+    if client is None or not client.webhook_active:
+        raise HTTPException(status_code=404, detail="Telegram webhook not enabled")
+
+    if not client.verify_webhook_secret(x_telegram_bot_api_secret_token):
+        logger.warning("Rejected Telegram webhook request with invalid secret token")
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+
+    try:
+        client.feed_webhook_update(await request.json())
+    except (ValueError, ValidationError) as e:
+        logger.warning(f"Invalid Telegram update: {e}")
+        raise HTTPException(status_code=400, detail="Invalid update") from e
+
+    return {"ok": True}
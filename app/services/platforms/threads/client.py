@@ -6,7 +6,7 @@ Threads 平台消费者 - 接收统一消息并发送到 Threads
 import asyncio
 import ipaddress
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Awaitable, Callable, ClassVar, Optional
@@ -18,7 +18,16 @@ from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.http import http_client
+from app.core.resilience import (
+    CircuitOpenError,
+    host_of,
+    is_transient_response,
+    resilience,
+)
+from app.core.tracing import tracer
 from app.schemas.event import UnifiedMessage
+from app.services.media.uploads import upload_slots
 from app.services.platforms.limits import (
     THREADS_TEXT_LIMIT,
     caption_too_long_error,
@@ -26,19 +35,20 @@ from app.services.platforms.limits import (
     text_too_long_error,
     text_too_long_reply,
 )
+from app.services.platforms.threads.poller import ContainerPoller
 
 THREADS_SCOPES = "threads_basic,threads_content_publish"
 THREADS_AUTHORIZE_URL = "https://threads.net/oauth/authorize"
 THREADS_ALT_TEXT_LIMIT = 1_000
-THREADS_CONTAINER_FINISHED_STATUS = "FINISHED"
-THREADS_CONTAINER_ERROR_STATUSES = {"ERROR", "EXPIRED"}
-THREADS_TRANSIENT_STATUS_CODES = {502, 503, 504}
+THREADS_CAROUSEL_LIMIT = 20
 
 
 @dataclass(frozen=True)
 class ThreadsPostResult:
     response: Optional[dict] = None
     error_message: Optional[str] = None
+    # 发布所用 token，供后台补充 permalink
+    access_token: Optional[str] = field(default=None, repr=False)
 
     @property
     def success(self) -> bool:
@@ -137,7 +147,7 @@ class ThreadsAuthHandler:
             "redirect_uri": self.redirect_uri,
             "code": code,
         }
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client("threads") as client:
             response = await client.post(f"{self.base_url}/oauth/access_token", data=params)
 
         if response.is_success:
@@ -156,7 +166,7 @@ class ThreadsAuthHandler:
             "client_secret": self.app_secret,
             "access_token": access_token,
         }
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client("threads") as client:
             response = await client.get(
                 f"{self.base_url}/access_token",
                 params=params,
@@ -188,22 +198,29 @@ class ThreadsAuthHandler:
 
 
 class ThreadsClient:
-    """Threads 客户端，支持文本和单图 sink。"""
+    """Threads 客户端，支持文本、单图和多图轮播 sink。"""
 
     _instance: ClassVar[Optional["ThreadsClient"]] = None
-    _publish_retry_delays: ClassVar[tuple[float, ...]] = (1.0, 2.0)
-    _container_status_retry_delays: ClassVar[tuple[float, ...]] = (1.0, 2.0, 4.0)
-    _request_retry_delays: ClassVar[tuple[float, ...]] = (0.5, 1.0)
+    _publish_retry_attempts: ClassVar[int] = 3
 
     def __init__(self):
         self.base_url = settings.threads_base_url.rstrip("/")
         self.refresh_window_days = settings.threads_refresh_window_days
+        self.container_poller = ContainerPoller(
+            lambda creation_id, access_token: self.get_container_status(creation_id, access_token)
+        )
+        self._background_tasks: set[asyncio.Task] = set()
         logger.info("ThreadsClient initialized")
 
     async def start(self) -> None:
         logger.info("Threads client started")
 
     async def stop(self) -> None:
+        # 等待进行中的 permalink 查询，超时则放弃
+        if self._background_tasks:
+            _, pending = await asyncio.wait(self._background_tasks, timeout=5)
+            for task in pending:
+                task.cancel()
         logger.info("Threads client stopped")
 
     async def handle_message(self, message: UnifiedMessage) -> None:
@@ -232,7 +249,7 @@ class ThreadsClient:
             await self._save_sink_result(message, None, error_message)
             return
 
-        if len(message.content) > THREADS_TEXT_LIMIT.default_limit:
+        if THREADS_TEXT_LIMIT.count(message.content) > THREADS_TEXT_LIMIT.default_limit:
             if reply_service:
                 reply_service.reply(message, text_too_long_reply(THREADS_TEXT_LIMIT))
             await self._save_sink_result(
@@ -242,28 +259,17 @@ class ThreadsClient:
             )
             return
 
-        result = await self.try_post_text(message.content)
-        if result.success:
-            await self._save_sink_result(message, result.response)
-            if reply_service:
-                reply_service.reply(message, self._success_text(result.response or {}))
-            return
-
-        await self._save_sink_result(
-            message,
-            None,
-            result.error_message or "发送到 Threads 失败",
-        )
-        if reply_service and result.error_message:
-            reply_service.reply(message, f"[Threads] {result.error_message}")
-        elif reply_service:
-            reply_service.reply(message, "[Threads] 消息发送失败")
+        result = await self.try_post_text(message.content, fetch_permalink=False)
+        await self._finish_post(message, result, "[Threads] 消息发送失败")
 
     async def _handle_image(self, message: UnifiedMessage) -> None:
         from app.core.reply import ReplyService
 
         reply_service = ReplyService.get_instance()
-        if message.content and len(message.content) > THREADS_TEXT_LIMIT.default_limit:
+        if (
+            message.content
+            and THREADS_TEXT_LIMIT.count(message.content) > THREADS_TEXT_LIMIT.default_limit
+        ):
             if reply_service:
                 reply_service.reply(message, caption_too_long_reply(THREADS_TEXT_LIMIT))
             await self._save_sink_result(
@@ -273,47 +279,105 @@ class ThreadsClient:
             )
             return
 
-        image_url = self._image_url_for_message(message)
-        if not image_url:
+        image_urls = self._image_urls_for_message(message)
+        if not image_urls:
             error_message = "图片发送失败：缺少可公开访问的图片 URL"
             if reply_service:
                 reply_service.reply(message, f"[Threads] {error_message}")
             await self._save_sink_result(message, None, error_message)
             return
 
-        ret = await self.post_image(image_url, message.content or None)
-        await self._save_sink_result(message, ret)
+        if len(image_urls) > 1:
+            result = await self.try_post_carousel(
+                image_urls, message.content or None, fetch_permalink=False
+            )
+        else:
+            result = await self.try_post_image(
+                image_urls[0], message.content or None, fetch_permalink=False
+            )
+        await self._finish_post(message, result, "[Threads] 图片发送失败")
+
+    async def _finish_post(
+        self,
+        message: UnifiedMessage,
+        result: ThreadsPostResult,
+        failure_reply: str,
+    ) -> None:
+        """保存结果并立即回复；permalink 由后台任务补充"""
+        from app.core.reply import ReplyService
+
+        reply_service = ReplyService.get_instance()
+        if not result.success:
+            await self._save_sink_result(
+                message,
+                None,
+                result.error_message or "发送到 Threads 失败",
+            )
+            if reply_service:
+                reply_service.reply(
+                    message,
+                    f"[Threads] {result.error_message}" if result.error_message else failure_reply,
+                )
+            return
+
+        response = result.response or {}
+        await self._save_sink_result(message, response)
+        if reply_service:
+            reply_service.reply(message, self._success_text(response))
+
+        if result.access_token and response.get("id") and not response.get("permalink"):
+            task = asyncio.create_task(
+                self._complete_permalink(message, response, result.access_token)
+            )
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _complete_permalink(
+        self,
+        message: UnifiedMessage,
+        response: dict,
+        access_token: str,
+    ) -> None:
+        """后台查询 permalink，更新发送结果并把链接回复给用户"""
+        from app.core.reply import ReplyService
+
+        try:
+            with tracer.span("threads.get_permalink"):
+                permalink = await self.get_post_permalink(response["id"], access_token)
+            if not permalink:
+                return
 
-        if reply_service and ret:
-            reply_service.reply(message, self._success_text(ret))
-        elif reply_service:
-            reply_service.reply(message, "[Threads] 图片发送失败")
+            response = {**response, "permalink": permalink}
+            await self._save_sink_result(message, response)
+            reply_service = ReplyService.get_instance()
+            if reply_service:
+                reply_service.reply(message, f"[Threads] {permalink}")
+        except Exception as e:
+            logger.warning(
+                "Threads permalink update failed: post_id={} error={}", response["id"], e
+            )
 
     async def post_text(self, text: str) -> Optional[dict]:
         result = await self.try_post_text(text)
         return result.response
 
-    async def try_post_text(self, text: str) -> ThreadsPostResult:
-        token_payload = await self.get_valid_token()
+    async def try_post_text(self, text: str, fetch_permalink: bool = True) -> ThreadsPostResult:
+        with tracer.span("threads.get_token"):
+            token_payload = await self.get_valid_token()
         if not token_payload:
             return ThreadsPostResult(error_message="未授权或 token 不可用")
+        access_token = token_payload["access_token"]
 
-        creation_id = await self.create_text_container(text, token_payload["access_token"])
+        creation_id = await self.create_text_container(text, access_token)
         if not creation_id:
             return ThreadsPostResult(error_message="文本容器创建失败")
 
-        ready = await self.wait_for_container_ready(creation_id, token_payload["access_token"])
+        with tracer.span("threads.wait_container", creation_id=creation_id):
+            ready = await self.wait_for_container_ready(creation_id, access_token)
         if not ready:
             return ThreadsPostResult(error_message="文本容器未完成处理")
 
-        publish_response = await self.publish_container(creation_id, token_payload["access_token"])
-        if not publish_response:
-            return ThreadsPostResult(error_message="文本发布失败")
-
-        enriched_response = await self._enrich_publish_response(
-            publish_response, creation_id, token_payload["access_token"]
-        )
-        return ThreadsPostResult(response=enriched_response)
+        return await self._publish(creation_id, access_token, "文本发布失败", fetch_permalink)
 
     async def post_image(self, image_url: str, text: Optional[str] = None) -> Optional[dict]:
         result = await self.try_post_image(image_url, text)
@@ -323,54 +387,113 @@ class ThreadsClient:
         self,
         image_url: str,
         text: Optional[str] = None,
+        fetch_permalink: bool = True,
     ) -> ThreadsPostResult:
-        token_payload = await self.get_valid_token()
+        with tracer.span("threads.get_token"):
+            token_payload = await self.get_valid_token()
         if not token_payload:
             return ThreadsPostResult(error_message="未授权或 token 不可用")
+        access_token = token_payload["access_token"]
 
         creation_id = await self.create_image_container(
             image_url,
-            token_payload["access_token"],
+            access_token,
             text,
             alt_text=text,
         )
         if not creation_id:
             return ThreadsPostResult(error_message="图片容器创建失败")
 
-        ready = await self.wait_for_container_ready(creation_id, token_payload["access_token"])
+        with tracer.span("threads.wait_container", creation_id=creation_id):
+            ready = await self.wait_for_container_ready(creation_id, access_token, "IMAGE")
         if not ready:
             return ThreadsPostResult(error_message="图片容器未完成处理")
 
-        publish_response = await self.publish_container(creation_id, token_payload["access_token"])
-        if not publish_response:
-            return ThreadsPostResult(error_message="图片发布失败")
+        return await self._publish(creation_id, access_token, "图片发布失败", fetch_permalink)
+
+    async def try_post_carousel(
+        self,
+        image_urls: list[str],
+        text: Optional[str] = None,
+        fetch_permalink: bool = True,
+    ) -> ThreadsPostResult:
+        """
+        发布多图轮播：并发创建并等待子容器，再创建并发布轮播容器
+
+        超过 THREADS_CAROUSEL_LIMIT 张时只发布前 THREADS_CAROUSEL_LIMIT 张。
+        """
+        if len(image_urls) > THREADS_CAROUSEL_LIMIT:
+            logger.warning(
+                "Threads carousel supports at most {} images, dropping {}",
+                THREADS_CAROUSEL_LIMIT,
+                len(image_urls) - THREADS_CAROUSEL_LIMIT,
+            )
+            image_urls = image_urls[:THREADS_CAROUSEL_LIMIT]
+
+        with tracer.span("threads.get_token"):
+            token_payload = await self.get_valid_token()
+        if not token_payload:
+            return ThreadsPostResult(error_message="未授权或 token 不可用")
+        access_token = token_payload["access_token"]
+
+        async def prepare_child(image_url: str) -> Optional[str]:
+            # 创建容器时 Threads 会拉取图片，占用上传槽位；等待就绪在槽位外进行
+            child_id = await upload_slots.run(
+                "threads",
+                lambda: self.create_image_container(
+                    image_url,
+                    access_token,
+                    alt_text=text,
+                    is_carousel_item=True,
+                ),
+            )
+            if child_id and await self.wait_for_container_ready(child_id, access_token, "IMAGE"):
+                return child_id
+            return None
+
+        with tracer.span("threads.prepare_children", count=len(image_urls)):
+            children = await asyncio.gather(*(prepare_child(url) for url in image_urls))
+        if not all(children):
+            return ThreadsPostResult(error_message="轮播图片容器创建失败")
 
-        enriched_response = await self._enrich_publish_response(
-            publish_response, creation_id, token_payload["access_token"]
+        creation_id = await self.create_carousel_container(
+            [child for child in children if child], access_token, text
         )
-        return ThreadsPostResult(response=enriched_response)
+        if not creation_id:
+            return ThreadsPostResult(error_message="轮播容器创建失败")
+
+        with tracer.span("threads.wait_container", creation_id=creation_id):
+            ready = await self.wait_for_container_ready(creation_id, access_token, "CAROUSEL")
+        if not ready:
+            return ThreadsPostResult(error_message="轮播容器未完成处理")
+
+        return await self._publish(creation_id, access_token, "轮播发布失败", fetch_permalink)
 
-    async def _enrich_publish_response(
+    async def _publish(
         self,
-        publish_response: Optional[dict],
         creation_id: str,
         access_token: str,
-    ) -> Optional[dict]:
-        if publish_response:
-            publish_response.setdefault("creation_id", creation_id)
-            post_id = publish_response.get("id")
-            if post_id:
-                permalink = await self.get_post_permalink(post_id, access_token)
-                if permalink:
-                    publish_response["permalink"] = permalink
-        return publish_response
+        error_message: str,
+        fetch_permalink: bool,
+    ) -> ThreadsPostResult:
+        publish_response = await self.publish_container(creation_id, access_token)
+        if not publish_response:
+            return ThreadsPostResult(error_message=error_message)
+
+        publish_response.setdefault("creation_id", creation_id)
+        post_id = publish_response.get("id")
+        if fetch_permalink and post_id:
+            permalink = await self.get_post_permalink(post_id, access_token)
+            if permalink:
+                publish_response["permalink"] = permalink
+        return ThreadsPostResult(response=publish_response, access_token=access_token)
 
     async def create_text_container(self, text: str, access_token: str) -> Optional[str]:
         data = {"media_type": "TEXT", "text": text}
         headers = {"Authorization": f"Bearer {access_token}"}
 
         async def request() -> httpx.Response:
-            async with httpx.AsyncClient(timeout=20) as client:
+            async with http_client("threads") as client:
                 return await client.post(
                     f"{self.base_url}/me/threads",
                     data=data,
@@ -397,37 +520,17 @@ class ThreadsClient:
         operation_name: str,
         request: Callable[[], Awaitable[httpx.Response]],
     ) -> Optional[httpx.Response]:
-        for attempt, delay in enumerate((0.0, *self._request_retry_delays)):
-            if delay:
-                await asyncio.sleep(delay)
-
-            try:
-                response = await request()
-            except httpx.TimeoutException as e:
-                logger.warning(
-                    "Threads {} timed out: attempt={} error={}",
-                    operation_name,
-                    attempt + 1,
-                    e,
-                )
-                if attempt < len(self._request_retry_delays):
-                    continue
-                return None
-
-            if response.status_code in THREADS_TRANSIENT_STATUS_CODES:
-                logger.warning(
-                    "Threads {} transient failure: status_code={} attempt={} body={}",
-                    operation_name,
-                    response.status_code,
-                    attempt + 1,
-                    response.text,
-                )
-                if attempt < len(self._request_retry_delays):
-                    continue
-
-            return response
-
-        return None
+        """经由容错层执行请求；重试耗尽的超时/连接错误或熔断时返回 None"""
+        try:
+            return await resilience.call(
+                host_of(self.base_url),
+                request,
+                name=f"Threads {operation_name}",
+                is_transient=is_transient_response,
+            )
+        except (httpx.TransportError, CircuitOpenError) as e:
+            logger.warning("Threads {} failed: error={}", operation_name, e)
+            return None
 
     async def create_image_container(
         self,
@@ -435,8 +538,11 @@ class ThreadsClient:
         access_token: str,
         text: Optional[str] = None,
         alt_text: Optional[str] = None,
+        is_carousel_item: bool = False,
     ) -> Optional[str]:
         data = {"media_type": "IMAGE", "image_url": image_url}
+        if is_carousel_item:
+            data["is_carousel_item"] = "true"
         if text:
             data["text"] = text
         if alt_text:
@@ -445,7 +551,7 @@ class ThreadsClient:
         headers = {"Authorization": f"Bearer {access_token}"}
 
         async def request() -> httpx.Response:
-            async with httpx.AsyncClient(timeout=20) as client:
+            async with http_client("threads") as client:
                 return await client.post(
                     f"{self.base_url}/me/threads",
                     data=data,
@@ -467,37 +573,45 @@ class ThreadsClient:
         )
         return None
 
-    async def wait_for_container_ready(self, creation_id: str, access_token: str) -> bool:
-        for attempt, delay in enumerate((0.0, *self._container_status_retry_delays)):
-            if delay:
-                await asyncio.sleep(delay)
-
-            status_payload = await self.get_container_status(creation_id, access_token)
-            if not status_payload:
-                return False
-
-            status = status_payload.get("status")
-            if status == THREADS_CONTAINER_FINISHED_STATUS:
-                return True
-
-            if status in THREADS_CONTAINER_ERROR_STATUSES:
-                logger.error(
-                    "Threads container processing failed: creation_id={} status={} error={}",
-                    creation_id,
-                    status,
-                    status_payload.get("error_message"),
+    async def create_carousel_container(
+        self,
+        children: list[str],
+        access_token: str,
+        text: Optional[str] = None,
+    ) -> Optional[str]:
+        data = {"media_type": "CAROUSEL", "children": ",".join(children)}
+        if text:
+            data["text"] = text
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        async def request() -> httpx.Response:
+            async with http_client("threads") as client:
+                return await client.post(
+                    f"{self.base_url}/me/threads",
+                    data=data,
+                    headers=headers,
                 )
-                return False
 
-            logger.debug(
-                "Threads container not ready: creation_id={} status={} attempt={}",
-                creation_id,
-                status,
-                attempt + 1,
-            )
+        response = await self._request_with_retry("create carousel container", request)
+        if not response:
+            return None
 
-        logger.error("Threads container did not become ready: creation_id={}", creation_id)
-        return False
+        if response.is_success:
+            payload = response.json()
+            return payload.get("id")
+
+        logger.error(
+            "Threads create carousel container failed: status_code={} body={}",
+            response.status_code,
+            response.text,
+        )
+        return None
+
+    async def wait_for_container_ready(
+        self, creation_id: str, access_token: str, kind: str = "TEXT"
+    ) -> bool:
+        return await self.container_poller.wait(creation_id, access_token, kind)
 
     async def get_container_status(
         self,
@@ -508,7 +622,7 @@ class ThreadsClient:
         params = {"fields": "id,status,error_message"}
 
         async def request() -> httpx.Response:
-            async with httpx.AsyncClient(timeout=20) as client:
+            async with http_client("threads") as client:
                 return await client.get(
                     f"{self.base_url}/{creation_id}",
                     params=params,
@@ -530,16 +644,17 @@ class ThreadsClient:
         )
         return None
 
-    def _image_url_for_message(self, message: UnifiedMessage) -> Optional[str]:
+    def _image_urls_for_message(self, message: UnifiedMessage) -> list[str]:
         public_base_url = settings.public_base_url.rstrip("/")
-        if not message.image_path or not self._is_public_https_url(public_base_url):
-            return None
+        if not self._is_public_https_url(public_base_url):
+            return []
 
-        filename = Path(message.image_path).name
-        if not filename:
-            return None
+        paths = [media.path for media in message.attachments]
+        if not paths and message.image_path:
+            paths = [message.image_path]
 
-        return f"{public_base_url}/cookbook/media/{filename}"
+        filenames = [Path(path).name for path in paths]
+        return [f"{public_base_url}/cookbook/media/{name}" for name in filenames if name]
 
     def _is_public_https_url(self, value: str) -> bool:
         parsed = urlparse(value)
@@ -589,12 +704,21 @@ class ThreadsClient:
         return None
 
     async def _publish_request(self, creation_id: str, headers: dict[str, str]) -> httpx.Response:
-        async with httpx.AsyncClient(timeout=20) as client:
-            return await client.post(
-                f"{self.base_url}/me/threads_publish",
-                params={"creation_id": creation_id},
-                headers=headers,
-            )
+        async def request() -> httpx.Response:
+            async with http_client("threads") as client:
+                return await client.post(
+                    f"{self.base_url}/me/threads_publish",
+                    params={"creation_id": creation_id},
+                    headers=headers,
+                )
+
+        # 同一容器重复发布会被平台拒绝，瞬时失败可以安全重试
+        return await resilience.call(
+            host_of(self.base_url),
+            request,
+            name="Threads publish",
+            is_transient=is_transient_response,
+        )
 
     async def _retry_publish_if_container_not_ready(
         self,
@@ -606,7 +730,8 @@ class ThreadsClient:
             return response
 
         current_response = response
-        for retry_index, delay in enumerate(self._publish_retry_delays):
+        delays = self.container_poller.intervals(self._publish_retry_attempts)
+        for retry_index, delay in enumerate(delays):
             logger.warning(
                 "Threads container not ready for publish yet: "
                 "creation_id={} status_code={} retry_attempt={} retry_in={}s body={}",
@@ -636,7 +761,7 @@ class ThreadsClient:
         params = {"fields": "id,permalink"}
 
         async def request() -> httpx.Response:
-            async with httpx.AsyncClient(timeout=20) as client:
+            async with http_client("threads") as client:
                 return await client.get(
                     f"{self.base_url}/{post_id}",
                     params=params,
@@ -665,11 +790,10 @@ class ThreadsClient:
         if not db:
             return None
 
-        token_data = await db.get_any_token_for_sink("threads")
-        if not token_data:
+        payload = await db.get_sink_credentials("threads")
+        if not payload:
             return None
 
-        payload = json.loads(token_data)
         refreshed = await self.refresh_access_token_if_needed(payload)
         return refreshed or payload
 
@@ -700,7 +824,7 @@ class ThreadsClient:
             "grant_type": "th_refresh_token",
             "access_token": access_token,
         }
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client("threads") as client:
             response = await client.get(
                 f"{self.base_url}/refresh_access_token",
                 params=params,
@@ -734,11 +858,10 @@ class ThreadsClient:
         if not db:
             return None
 
-        token_data = await db.get_any_token_for_sink("threads")
-        if not token_data:
+        payload = await db.get_sink_credentials("threads")
+        if not payload:
             return None
 
-        payload = json.loads(token_data)
         access_token = payload.get("access_token")
         if not access_token:
             return None
@@ -825,7 +948,7 @@ class ThreadsClient:
         if cls._instance is not None:
             raise RuntimeError("ThreadsClient instance already exists")
         cls._instance = cls()
-        bus.register(cls._instance.handle_message)
+        bus.register(cls._instance.handle_message, sink="threads")
         logger.info("Threads client registered to event bus")
         return cls._instance
 
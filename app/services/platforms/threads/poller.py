@@ -0,0 +1,255 @@
+"""
+Threads Container Readiness Poller
+Threads 容器就绪轮询器 - 自适应间隔 + 共享轮询循环
+
+为什么需要自适应轮询？
+Threads 发布需要先创建容器，等容器处理完成（status=FINISHED）后才能发布。
+以前按固定的 1s/2s/4s 间隔轮询：文本容器几乎立即完成却要多查一次，
+图片容器通常需要几秒，前几次查询基本都是浪费。
+
+- 首次查询时间取同类容器最近就绪耗时的中位数（没有历史时立即查询）
+- 之后从 initial_interval 开始按 multiplier 指数增长，不超过 max_interval，
+  到达 deadline 仍未完成则放弃
+- 所有正在等待的容器共用一个后台轮询循环，同一时刻到期的容器并发查询
+
+用法示例：
+```python
+poller = ContainerPoller(client.get_container_status)
+ready = await poller.wait(creation_id, access_token, kind="IMAGE")
+```
+"""
+
+import asyncio
+import contextvars
+import statistics
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+THREADS_CONTAINER_FINISHED_STATUS = "FINISHED"
+THREADS_CONTAINER_ERROR_STATUSES = {"ERROR", "EXPIRED"}
+
+StatusFetcher = Callable[[str, str], Awaitable[Optional[dict]]]
+
+
+@dataclass
+class _Waiter:
+    creation_id: str
+    access_token: str
+    kind: str
+    started: float
+    deadline: float
+    next_poll: float
+    interval: float
+    future: asyncio.Future
+    polls: int = 0
+
+
+@dataclass
+class _KindStats:
+    """某类容器最近的就绪耗时（秒）"""
+
+    durations: deque[float] = field(default_factory=lambda: deque(maxlen=50))
+    waits: int = 0
+    polls: int = 0
+
+    def expected(self) -> float:
+        return statistics.median(self.durations) if self.durations else 0.0
+
+
+class ContainerPoller:
+    """等待 Threads 容器处理完成；多个等待者共享一个轮询任务"""
+
+    def __init__(
+        self,
+        fetch_status: StatusFetcher,
+        *,
+        initial_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        multiplier: float = 2.0,
+    ):
+        self._fetch_status = fetch_status
+        self.initial_interval = (
+            initial_interval
+            if initial_interval is not None
+            else settings.threads_container_poll_initial_interval
+        )
+        self.max_interval = (
+            max_interval
+            if max_interval is not None
+            else settings.threads_container_poll_max_interval
+        )
+        self.timeout = timeout if timeout is not None else settings.threads_container_poll_timeout
+        self.multiplier = max(1.0, multiplier)
+        self._waiters: dict[str, _Waiter] = {}
+        self._stats: dict[str, _KindStats] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _kind_stats(self, kind: str) -> _KindStats:
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = _KindStats()
+        return stats
+
+    async def wait(self, creation_id: str, access_token: str, kind: str = "TEXT") -> bool:
+        """
+        等待容器处理完成
+
+        Args:
+            kind: 容器类型（TEXT / IMAGE / CAROUSEL），按类型分别学习就绪耗时
+
+        Returns:
+            True 表示可以发布；查询失败、处理出错或超时返回 False
+        """
+        existing = self._waiters.get(creation_id)
+        if existing is not None:
+            return await asyncio.shield(existing.future)
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        waiter = _Waiter(
+            creation_id=creation_id,
+            access_token=access_token,
+            kind=kind,
+            started=now,
+            deadline=now + self.timeout,
+            next_poll=now + min(self._kind_stats(kind).expected(), self.timeout),
+            interval=self.initial_interval,
+            future=loop.create_future(),
+        )
+        self._waiters[creation_id] = waiter
+        self._kind_stats(kind).waits += 1
+        self._ensure_running(loop)
+
+        try:
+            return await waiter.future
+        finally:
+            if self._waiters.get(creation_id) is waiter:
+                del self._waiters[creation_id]
+
+    def _ensure_running(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            # 共享循环不属于任何一条消息，不继承调用方的追踪上下文
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            now = loop.time()
+            pending = [w for w in self._waiters.values() if not w.future.done()]
+            if not pending:
+                await asyncio.sleep(0)
+                continue
+
+            due = [w for w in pending if w.next_poll <= now]
+            if due:
+                await asyncio.gather(*(self._poll(w) for w in due))
+                continue
+
+            assert self._wakeup is not None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(w.next_poll for w in pending) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, waiter: _Waiter) -> None:
+        loop = asyncio.get_running_loop()
+        waiter.polls += 1
+        self._kind_stats(waiter.kind).polls += 1
+        try:
+            payload = await self._fetch_status(waiter.creation_id, waiter.access_token)
+        except Exception as e:
+            self._resolve(waiter, exception=e)
+            return
+
+        if not payload:
+            self._resolve(waiter, False)
+            return
+
+        now = loop.time()
+        status = payload.get("status")
+        if status == THREADS_CONTAINER_FINISHED_STATUS:
+            self._kind_stats(waiter.kind).durations.append(now - waiter.started)
+            logger.debug(
+                "Threads container ready: creation_id={} waited={:.2f}s polls={}",
+                waiter.creation_id,
+                now - waiter.started,
+                waiter.polls,
+            )
+            self._resolve(waiter, True)
+            return
+
+        if status in THREADS_CONTAINER_ERROR_STATUSES:
+            logger.error(
+                "Threads container processing failed: creation_id={} status={} error={}",
+                waiter.creation_id,
+                status,
+                payload.get("error_message"),
+            )
+            self._resolve(waiter, False)
+            return
+
+        if now >= waiter.deadline:
+            logger.error(
+                "Threads container did not become ready: creation_id={} waited={:.1f}s polls={}",
+                waiter.creation_id,
+                now - waiter.started,
+                waiter.polls,
+            )
+            self._resolve(waiter, False)
+            return
+
+        logger.debug(
+            "Threads container not ready: creation_id={} status={} attempt={} retry_in={:.2f}s",
+            waiter.creation_id,
+            status,
+            waiter.polls,
+            waiter.interval,
+        )
+        waiter.next_poll = min(waiter.deadline, now + waiter.interval)
+        waiter.interval = min(self.max_interval, waiter.interval * self.multiplier)
+
+    def intervals(self, count: int) -> list[float]:
+        """与轮询相同的退避间隔序列（用于发布时遇到容器未就绪的重试）"""
+        intervals = []
+        interval = self.initial_interval
+        for _ in range(count):
+            intervals.append(interval)
+            interval = min(self.max_interval, interval * self.multiplier)
+        return intervals
+
+    @staticmethod
+    def _resolve(
+        waiter: _Waiter, result: bool = False, exception: Optional[BaseException] = None
+    ) -> None:
+        if waiter.future.done():
+            return
+        if exception is not None:
+            waiter.future.set_exception(exception)
+        else:
+            waiter.future.set_result(result)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            kind: {
+                "expected_ready_s": round(stats.expected(), 3),
+                "waits": stats.waits,
+                "polls": stats.polls,
+                "polls_per_wait": round(stats.polls / stats.waits, 2) if stats.waits else 0.0,
+            }
+            for kind, stats in self._stats.items()
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._waiters)
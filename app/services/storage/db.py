@@ -6,18 +6,29 @@ SQLite 存储消费者 + 认证 Token 管理
 1. 监听事件总线的消息，持久化到 messages 表
 2. 管理 sink_results 表（各 Sink 的发送结果）
 3. 管理 auth_tokens / auth_requests 表（OAuth Token 存储）
+4. 管理 outbox 表（各 Sink 的待投递记录，重启后恢复）
+5. 管理 spans 表（消息处理各阶段的追踪记录）
 """
 
+import asyncio
 import json
+import time
 from pathlib import Path
-from typing import ClassVar, Optional
+from typing import Any, ClassVar, List, Optional
 
 import aiosqlite
 from loguru import logger
 
 from app.core.bus import bus
 from app.core.config import settings
+from app.core.tracing import Span
 from app.schemas.event import UnifiedMessage
+from app.schemas.media import MediaHandle
+from app.services.storage.pool import LatencyStats, ReadPool, apply_pragmas
+from app.services.storage.writer import GroupCommitWriter, Statement
+
+# 同一 (event_id, sink) 最多恢复投递的次数，避免持续崩溃的消息反复重放
+OUTBOX_MAX_ATTEMPTS = 3
 
 
 class DatabaseManager:
@@ -25,7 +36,7 @@ class DatabaseManager:
     数据库管理器
 
     使用 aiosqlite 实现异步数据库操作。
-    包含 messages、sink_results、auth_tokens、auth_requests 四张表。
+    包含 messages、sink_results、auth_tokens、auth_requests、outbox、spans 六张表。
     """
 
     _instance: ClassVar[Optional["DatabaseManager"]] = None
@@ -33,6 +44,15 @@ class DatabaseManager:
     def __init__(self):
         self.db_path = settings.database_path
         self.conn: Optional[aiosqlite.Connection] = None
+        self._writer: Optional[GroupCommitWriter] = None
+        self._read_pool: Optional[ReadPool] = None
+        # 未启用读连接池时，读操作在写连接上执行的延迟
+        self._read_latency = LatencyStats()
+        self.journal_mode = ""
+        # sink_platform -> 解析后的凭证（None 表示未授权），save/delete token 时失效
+        self._credentials: dict[str, Optional[dict[str, Any]]] = {}
+        self._credential_generation = 0
+        self._prune_task: Optional[asyncio.Task] = None
         logger.info(f"DatabaseManager initialized with path: {self.db_path}")
 
     async def start(self) -> None:
@@ -42,16 +62,122 @@ class DatabaseManager:
         db_dir = Path(self.db_path).parent
         db_dir.mkdir(parents=True, exist_ok=True)
         self.conn = await aiosqlite.connect(self.db_path)
+        self.journal_mode = await self._set_journal_mode(self.conn)
+        await apply_pragmas(self.conn, self._connection_pragmas())
         await self._create_tables()
-        logger.info(f"Database connected: {self.db_path}")
+        self._writer = GroupCommitWriter(
+            self.conn,
+            max_batch=settings.database_batch_size,
+            max_delay=settings.database_batch_delay_ms / 1000,
+        )
+        # 只有 WAL 模式下读者才不会被写事务阻塞，才值得使用独立的读连接
+        if self.journal_mode == "wal" and settings.database_read_pool_size > 0:
+            self._read_pool = ReadPool(
+                self.db_path, settings.database_read_pool_size, self._connection_pragmas()
+            )
+            await self._read_pool.start()
+        logger.info(
+            f"Database connected: {self.db_path} (journal_mode={self.journal_mode}, "
+            f"read_pool={self._read_pool.size if self._read_pool else 0})"
+        )
 
     async def stop(self) -> None:
         if not self.conn:
             return
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            try:
+                await self._prune_task
+            except asyncio.CancelledError:
+                pass
+            self._prune_task = None
+        if self._writer is not None:
+            await self._writer.flush()
+            self._writer = None
+        if self._read_pool is not None:
+            await self._read_pool.close()
+            self._read_pool = None
         await self.conn.close()
         self.conn = None
         logger.info("Database connection closed")
 
+    async def prune_history(self) -> dict[str, int]:
+        """按保留期删除已完成的历史记录，返回各表删除的行数"""
+        return {
+            "outbox": await self.prune_outbox(settings.outbox_retention_days * 86400),
+            "spans": await self.prune_spans(settings.tracing_retention_days * 86400),
+        }
+
+    def start_pruning(self) -> None:
+        """启动后台清理任务（database_prune_interval 为 0 时不启动），stop 时取消"""
+        if self._prune_task is None and settings.database_prune_interval > 0:
+            self._prune_task = asyncio.create_task(self._prune_loop())
+
+    async def _prune_loop(self) -> None:
+        """启动时清理一次，之后每 database_prune_interval 秒清理一次"""
+        while True:
+            try:
+                deleted = await self.prune_history()
+                if any(deleted.values()):
+                    logger.info(f"Pruned database history: {deleted}")
+            except Exception as e:
+                logger.error(f"Database history pruning failed: {e}")
+            await asyncio.sleep(settings.database_prune_interval)
+
+    @property
+    def writer(self) -> GroupCommitWriter:
+        """批量提交写入器；所有写操作经由它执行"""
+        if self._writer is None:
+            raise RuntimeError("Database not connected")
+        return self._writer
+
+    async def _set_journal_mode(self, conn: aiosqlite.Connection) -> str:
+        mode = "wal" if settings.database_wal_enabled else "delete"
+        cursor = await conn.execute(f"PRAGMA journal_mode = {mode}")
+        row = await cursor.fetchone()
+        return str(row[0]).lower() if row else mode
+
+    def _connection_pragmas(self) -> list[tuple[str, object]]:
+        """写连接和读连接共用的调优参数"""
+        return [
+            ("synchronous", settings.database_synchronous),
+            ("cache_size", -settings.database_cache_size_kb),
+            ("mmap_size", settings.database_mmap_size_mb * 1024 * 1024),
+            ("busy_timeout", 5000),
+            ("temp_store", "MEMORY"),
+        ]
+
+    async def _fetchone(self, sql: str, params: Any = ()) -> Optional[Any]:
+        """读查询：优先走只读连接池"""
+        if self._read_pool is not None:
+            return await self._read_pool.fetchone(sql, params)
+        assert self.conn is not None
+        started = time.perf_counter()
+        cursor = await self.conn.execute(sql, params)
+        row = await cursor.fetchone()
+        self._read_latency.record((time.perf_counter() - started) * 1000)
+        return row
+
+    async def _fetchall(self, sql: str, params: Any = ()) -> list[Any]:
+        if self._read_pool is not None:
+            return await self._read_pool.fetchall(sql, params)
+        assert self.conn is not None
+        started = time.perf_counter()
+        cursor = await self.conn.execute(sql, params)
+        rows = await cursor.fetchall()
+        self._read_latency.record((time.perf_counter() - started) * 1000)
+        return list(rows)
+
+    def get_latency_stats(self) -> dict[str, Any]:
+        """读/写两类连接的查询延迟"""
+        read_latency = self._read_pool.latency if self._read_pool else self._read_latency
+        return {
+            "journal_mode": self.journal_mode,
+            "read_pool_size": self._read_pool.size if self._read_pool else 0,
+            "read": read_latency.snapshot(),
+            "write": self._writer.latency.snapshot() if self._writer else {},
+        }
+
     async def _create_tables(self) -> None:
         if not self.conn:
             raise RuntimeError("Database not connected")
@@ -116,6 +242,44 @@ class DatabaseManager:
             )
         """)
 
+        # outbox 表 — 每个 (event_id, sink) 的投递状态：pending / done / abandoned
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL,
+                sink_platform TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(event_id, sink_platform)
+            )
+        """)
+
+        # spans 表 — 追踪记录，trace_id 即 messages.event_id
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS spans (
+                span_id TEXT PRIMARY KEY,
+                trace_id TEXT NOT NULL,
+                parent_id TEXT,
+                name TEXT NOT NULL,
+                start_time REAL NOT NULL,
+                end_time REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'ok',
+                attributes TEXT
+            )
+        """)
+
+        # bluesky_handles 表 — @提及 handle → DID 解析缓存，did 为 NULL 表示无法解析
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS bluesky_handles (
+                handle TEXT PRIMARY KEY,
+                did TEXT,
+                expires_at REAL NOT NULL
+            )
+        """)
+
         # 索引
         await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_event_id ON messages(event_id)")
         await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_source ON messages(source)")
@@ -124,6 +288,9 @@ class DatabaseManager:
         await self.conn.execute(
             "CREATE INDEX IF NOT EXISTS idx_sink_results_event ON sink_results(event_id)"
         )
+        await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status)")
+        await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id)")
+        await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_end ON spans(end_time)")
 
         await self.conn.commit()
         logger.info("Database tables created/verified")
@@ -136,7 +303,7 @@ class DatabaseManager:
             return False
         try:
             raw_data_json = json.dumps(message.raw_data)
-            await self.conn.execute(
+            await self.writer.execute(
                 """
                 INSERT INTO messages (
                     event_id, source, content, message_type, sender_id,
@@ -156,7 +323,6 @@ class DatabaseManager:
                     message.timestamp.isoformat(),
                 ),
             )
-            await self.conn.commit()
             logger.debug(f"Message {message.event_id} saved to database")
             return True
         except aiosqlite.IntegrityError:
@@ -177,21 +343,19 @@ class DatabaseManager:
     async def get_message_count(self) -> int:
         if not self.conn:
             return 0
-        cursor = await self.conn.execute("SELECT COUNT(*) FROM messages")
-        row = await cursor.fetchone()
+        row = await self._fetchone("SELECT COUNT(*) FROM messages")
         return row[0] if row else 0
 
     async def get_recent_messages(self, limit: int = 10) -> list:
         if not self.conn:
             return []
-        cursor = await self.conn.execute(
+        rows = await self._fetchall(
             """
             SELECT event_id, source, content, message_type, sender_name, timestamp
             FROM messages ORDER BY timestamp DESC LIMIT ?
         """,
             (limit,),
         )
-        rows = await cursor.fetchall()
         return [
             {
                 "event_id": row[0],
@@ -219,29 +383,267 @@ class DatabaseManager:
         if not self.conn:
             return False
         try:
-            await self.conn.execute(
-                """
+            # 结果已落库，即视为投递完成，重启后不再重放（同一事务）
+            await self.writer.transaction(
+                [
+                    Statement(
+                        """
                 INSERT OR REPLACE INTO sink_results (
                     event_id, sink_platform, status_id, status_url,
                     response_data, success, error_message
                 ) VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-                (
-                    event_id,
-                    sink_platform,
-                    status_id,
-                    status_url,
-                    response_data,
-                    success,
-                    error_message,
-                ),
+                        (
+                            event_id,
+                            sink_platform,
+                            status_id,
+                            status_url,
+                            response_data,
+                            success,
+                            error_message,
+                        ),
+                    ),
+                    Statement(
+                        """
+                UPDATE outbox SET status = 'done', updated_at = CURRENT_TIMESTAMP
+                WHERE event_id = ? AND sink_platform = ?
+            """,
+                        (event_id, sink_platform),
+                    ),
+                ]
             )
-            await self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to save sink result: {e}")
             return False
 
+    async def has_sink_result(self, event_id: str, sink_platform: str) -> bool:
+        if not self.conn:
+            return False
+        row = await self._fetchone(
+            "SELECT 1 FROM sink_results WHERE event_id = ? AND sink_platform = ?",
+            (event_id, sink_platform),
+        )
+        return row is not None
+
+    # ===== spans 操作 =====
+
+    async def save_spans(self, spans: List[Span]) -> None:
+        """批量写入追踪 span（Tracer 的导出器）"""
+        if not self.conn or not spans:
+            return
+        await self.writer.executemany(
+            """
+            INSERT OR REPLACE INTO spans (
+                span_id, trace_id, parent_id, name, start_time, end_time, status, attributes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            [
+                (
+                    span.span_id,
+                    span.trace_id,
+                    span.parent_id,
+                    span.name,
+                    span.start_time,
+                    span.end_time,
+                    span.status,
+                    json.dumps(span.attributes, ensure_ascii=False, default=str),
+                )
+                for span in spans
+            ],
+        )
+
+    async def prune_spans(self, retention_seconds: float) -> int:
+        """删除结束时间早于 retention_seconds 的 span，返回删除行数"""
+        if not self.conn:
+            return 0
+        return await self.writer.execute(
+            "DELETE FROM spans WHERE end_time < ?", (time.time() - retention_seconds,)
+        )
+
+    async def get_trace(self, trace_id: str) -> list[dict[str, Any]]:
+        """按开始时间返回某条消息的全部 span"""
+        if not self.conn:
+            return []
+        rows = await self._fetchall(
+            """
+            SELECT span_id, parent_id, name, start_time, end_time, status, attributes
+            FROM spans WHERE trace_id = ? ORDER BY start_time, rowid
+        """,
+            (trace_id,),
+        )
+        return [
+            {
+                "span_id": row[0],
+                "parent_id": row[1],
+                "name": row[2],
+                "start_time": row[3],
+                "end_time": row[4],
+                "duration_ms": round((row[4] - row[3]) * 1000, 3),
+                "status": row[5],
+                "attributes": json.loads(row[6]) if row[6] else {},
+            }
+            for row in rows
+        ]
+
+    # ===== bluesky_handles 操作 =====
+    async def get_bluesky_handle(self, handle: str) -> Optional[tuple[Optional[str], float]]:
+        """返回缓存的 (did, expires_at)；未缓存时返回 None（过期与否由调用方判断）"""
+        if not self.conn:
+            return None
+        row = await self._fetchone(
+            "SELECT did, expires_at FROM bluesky_handles WHERE handle = ?", (handle,)
+        )
+        return (row[0], row[1]) if row else None
+
+    async def save_bluesky_handle(self, handle: str, did: Optional[str], expires_at: float) -> None:
+        if not self.conn:
+            return
+        await self.writer.execute(
+            "INSERT OR REPLACE INTO bluesky_handles (handle, did, expires_at) VALUES (?, ?, ?)",
+            (handle, did, expires_at),
+        )
+
+    # ===== outbox 操作 =====
+
+    async def add_pending_deliveries(self, message: UnifiedMessage, sinks: List[str]) -> None:
+        """分发前记录每个 (event_id, sink) 为 pending，已存在的记录保持不变"""
+        if not self.conn:
+            return
+        payload = message.model_dump_json()
+        await self.writer.executemany(
+            """
+            INSERT OR IGNORE INTO outbox (event_id, sink_platform, payload)
+            VALUES (?, ?, ?)
+        """,
+            [(str(message.event_id), sink, payload) for sink in sinks],
+        )
+
+    async def mark_delivery_done(self, event_id: str, sink: str) -> None:
+        if not self.conn:
+            return
+        await self.writer.execute(
+            """
+            UPDATE outbox SET status = 'done', updated_at = CURRENT_TIMESTAMP
+            WHERE event_id = ? AND sink_platform = ? AND status = 'pending'
+        """,
+            (event_id, sink),
+        )
+
+    async def mark_delivery_abandoned(self, event_id: str, sink: str) -> None:
+        if not self.conn:
+            return
+        await self.writer.execute(
+            """
+            UPDATE outbox SET status = 'abandoned', updated_at = CURRENT_TIMESTAMP
+            WHERE event_id = ? AND sink_platform = ? AND status = 'pending'
+        """,
+            (event_id, sink),
+        )
+
+    async def prune_outbox(self, retention_seconds: float) -> int:
+        """删除 updated_at 早于 retention_seconds 的 done / abandoned 记录，返回删除行数"""
+        if not self.conn:
+            return 0
+        return await self.writer.execute(
+            """
+            DELETE FROM outbox
+            WHERE status IN ('done', 'abandoned') AND updated_at < datetime('now', ?)
+        """,
+            (f"-{int(retention_seconds)} seconds",),
+        )
+
+    async def get_pending_deliveries(self) -> list:
+        if not self.conn:
+            return []
+        rows = await self._fetchall(
+            """
+            SELECT event_id, sink_platform, payload, attempts
+            FROM outbox WHERE status = 'pending' ORDER BY id
+        """
+        )
+        return [
+            {
+                "event_id": row[0],
+                "sink_platform": row[1],
+                "payload": row[2],
+                "attempts": row[3],
+            }
+            for row in rows
+        ]
+
+    async def resume_pending_deliveries(self) -> int:
+        """
+        恢复上次进程退出时仍处于 pending 的投递
+
+        - 已有 sink_results 的记录直接标记 done，避免重复发帖
+        - 超过 OUTBOX_MAX_ATTEMPTS 次的记录标记为 abandoned
+        - 图片以 media 文件引用随 payload 持久化；旧记录只有 image_path 时据此重建引用
+
+        Returns:
+            重新分发的 (event_id, sink) 数量
+        """
+        if not self.conn:
+            return 0
+
+        grouped: dict[str, tuple[str, list[str]]] = {}
+        for row in await self.get_pending_deliveries():
+            event_id = row["event_id"]
+            sink = row["sink_platform"]
+            if await self.has_sink_result(event_id, sink):
+                await self.mark_delivery_done(event_id, sink)
+                continue
+            if row["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+                await self._set_outbox_status(event_id, sink, "abandoned")
+                logger.warning(f"Outbox delivery abandoned after retries: {event_id}/{sink}")
+                continue
+            grouped.setdefault(event_id, (row["payload"], []))[1].append(sink)
+
+        resumed = 0
+        for event_id, (payload, sinks) in grouped.items():
+            try:
+                message = UnifiedMessage.model_validate_json(payload)
+            except Exception as e:
+                logger.error(f"Outbox payload invalid for {event_id}: {e}")
+                for sink in sinks:
+                    await self._set_outbox_status(event_id, sink, "abandoned")
+                continue
+
+            if message.media is None and message.image_path and Path(message.image_path).is_file():
+                message.media = MediaHandle.from_path(message.image_path)
+
+            await self.writer.executemany(
+                """
+                UPDATE outbox SET attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE event_id = ? AND sink_platform = ?
+            """,
+                [(event_id, sink) for sink in sinks],
+            )
+
+            delivered = await bus.redeliver(message, sinks)
+            missing = set(sinks) - set(delivered)
+            if missing:
+                logger.warning(
+                    f"Outbox entries for {event_id} kept pending, sinks not registered: "
+                    f"{', '.join(sorted(missing))}"
+                )
+            resumed += len(delivered)
+
+        if resumed:
+            logger.info(f"Resumed {resumed} pending outbox deliveries")
+        return resumed
+
+    async def _set_outbox_status(self, event_id: str, sink: str, status: str) -> None:
+        if not self.conn:
+            return
+        await self.writer.execute(
+            """
+            UPDATE outbox SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE event_id = ? AND sink_platform = ?
+        """,
+            (status, event_id, sink),
+        )
+
     # ===== auth_requests (临时 request token) 操作 =====
 
     async def save_request_token(
@@ -255,7 +657,7 @@ class DatabaseManager:
         if not self.conn:
             return False
         try:
-            await self.conn.execute(
+            await self.writer.execute(
                 """
                 INSERT OR REPLACE INTO auth_requests (
                     oauth_token, source_platform, source_user_id, sink_platform, token_data
@@ -263,7 +665,6 @@ class DatabaseManager:
             """,
                 (oauth_token, source_platform, source_user_id, sink_platform, token_data),
             )
-            await self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to save request token: {e}")
@@ -272,10 +673,9 @@ class DatabaseManager:
     async def get_request_token(self, oauth_token: str) -> Optional[dict]:
         if not self.conn:
             return None
-        cursor = await self.conn.execute(
+        row = await self._fetchone(
             "SELECT * FROM auth_requests WHERE oauth_token = ?", (oauth_token,)
         )
-        row = await cursor.fetchone()
         if not row:
             return None
         return {
@@ -289,8 +689,7 @@ class DatabaseManager:
     async def delete_request_token(self, oauth_token: str) -> bool:
         if not self.conn:
             return False
-        await self.conn.execute("DELETE FROM auth_requests WHERE oauth_token = ?", (oauth_token,))
-        await self.conn.commit()
+        await self.writer.execute("DELETE FROM auth_requests WHERE oauth_token = ?", (oauth_token,))
         return True
 
     # ===== auth_tokens (永久 user token) 操作 =====
@@ -305,7 +704,7 @@ class DatabaseManager:
         if not self.conn:
             return False
         try:
-            await self.conn.execute(
+            await self.writer.execute(
                 """
                 INSERT OR REPLACE INTO auth_tokens (
                     source_platform, source_user_id, sink_platform, token_data, updated_at
@@ -313,17 +712,18 @@ class DatabaseManager:
             """,
                 (source_platform, source_user_id, sink_platform, token_data),
             )
-            await self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to save user token: {e}")
             return False
+        finally:
+            self._invalidate_credentials(sink_platform)
 
     async def get_any_token_for_sink(self, sink_platform: str) -> Optional[str]:
         """获取任意一个可用的 sink token（不限来源平台）"""
         if not self.conn:
             return None
-        cursor = await self.conn.execute(
+        row = await self._fetchone(
             """
             SELECT token_data FROM auth_tokens
             WHERE sink_platform = ?
@@ -332,33 +732,67 @@ class DatabaseManager:
         """,
             (sink_platform,),
         )
-        row = await cursor.fetchone()
         return row[0] if row else None
 
+    async def get_sink_credentials(self, sink_platform: str) -> Optional[dict[str, Any]]:
+        """
+        获取 sink 的凭证（解析后的 JSON），带内存缓存
+
+        命中时不访问数据库；save_user_token / delete_user_token /
+        delete_any_token_for_sink 会使对应 sink 的缓存失效。
+        返回浅拷贝，调用方修改不会影响缓存。
+        """
+        if sink_platform in self._credentials:
+            cached = self._credentials[sink_platform]
+            return dict(cached) if cached is not None else None
+
+        generation = self._credential_generation
+        token_data = await self.get_any_token_for_sink(sink_platform)
+        payload: Optional[dict[str, Any]] = None
+        if token_data:
+            try:
+                decoded = json.loads(token_data)
+            except json.JSONDecodeError:
+                logger.error(f"Persisted credentials for {sink_platform} are invalid JSON")
+            else:
+                if isinstance(decoded, dict):
+                    payload = decoded
+                else:
+                    logger.error(f"Persisted credentials for {sink_platform} are not an object")
+
+        # 加载期间凭证被修改时不回填，避免缓存旧值
+        if generation == self._credential_generation:
+            self._credentials[sink_platform] = payload
+        return dict(payload) if payload is not None else None
+
+    def _invalidate_credentials(self, sink_platform: str) -> None:
+        self._credentials.pop(sink_platform, None)
+        self._credential_generation += 1
+
     async def delete_user_token(
         self, source_platform: str, source_user_id: str, sink_platform: str
     ) -> bool:
         if not self.conn:
             return False
-        cursor = await self.conn.execute(
+        rowcount = await self.writer.execute(
             """
             DELETE FROM auth_tokens
             WHERE source_platform = ? AND source_user_id = ? AND sink_platform = ?
         """,
             (source_platform, source_user_id, sink_platform),
         )
-        await self.conn.commit()
-        return cursor.rowcount > 0
+        self._invalidate_credentials(sink_platform)
+        return rowcount > 0
 
     async def delete_any_token_for_sink(self, sink_platform: str) -> bool:
         if not self.conn:
             return False
-        cursor = await self.conn.execute(
+        rowcount = await self.writer.execute(
             "DELETE FROM auth_tokens WHERE sink_platform = ?",
             (sink_platform,),
         )
-        await self.conn.commit()
-        return cursor.rowcount > 0
+        self._invalidate_credentials(sink_platform)
+        return rowcount > 0
 
     # ===== 单例管理 =====
 
@@ -372,9 +806,12 @@ class DatabaseManager:
             raise RuntimeError("DatabaseManager instance already exists")
         cls._instance = cls()
         bus.register(cls._instance.handle_message)
+        bus.set_outbox(cls._instance)
         logger.info("Database manager registered to event bus")
         return cls._instance
 
     @classmethod
     def reset_instance(cls) -> None:
+        if cls._instance is not None:
+            bus.set_outbox(None)
         cls._instance = None
@@ -0,0 +1,106 @@
+"""
+SQLite Read Connection Pool
+SQLite 只读连接池 + 查询延迟统计
+
+WAL 模式下读者不阻塞写者、写者也不阻塞读者。
+/messages、/stats 等查询走只读连接池，不再排在批量写入后面。
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Optional
+
+import aiosqlite
+
+
+class LatencyStats:
+    """最近 N 次操作的延迟统计（毫秒）"""
+
+    def __init__(self, window: int = 1024):
+        self._samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float) -> None:
+        self._samples.append(elapsed_ms)
+        self.count += 1
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def snapshot(self) -> dict[str, float]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "count": self.count,
+            "avg_ms": round(sum(samples) / len(samples), 3),
+            "p50_ms": round(samples[len(samples) // 2], 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+async def apply_pragmas(conn: aiosqlite.Connection, pragmas: Iterable[tuple[str, Any]]) -> None:
+    for name, value in pragmas:
+        await conn.execute(f"PRAGMA {name} = {value}")
+
+
+class ReadPool:
+    """
+    只读连接池
+
+    每个连接以 mode=ro 打开并设置 query_only，
+    acquire() 在所有连接都忙时排队等待。
+    """
+
+    def __init__(self, db_path: str, size: int, pragmas: Iterable[tuple[str, Any]] = ()):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.pragmas = list(pragmas)
+        self.latency = LatencyStats()
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue[aiosqlite.Connection]] = None
+
+    async def start(self) -> None:
+        self._idle = asyncio.Queue()
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(uri, uri=True)
+            await apply_pragmas(conn, [*self.pragmas, ("query_only", 1)])
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._idle = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._idle is None:
+            raise RuntimeError("Read pool not started")
+        idle = self._idle
+        conn = await idle.get()
+        try:
+            yield conn
+        finally:
+            idle.put_nowait(conn)
+
+    async def fetchone(self, sql: str, params: Any = ()) -> Optional[Any]:
+        started = time.perf_counter()
+        async with self.acquire() as conn:
+            cursor = await conn.execute(sql, params)
+            row = await cursor.fetchone()
+        self.latency.record((time.perf_counter() - started) * 1000)
+        return row
+
+    async def fetchall(self, sql: str, params: Any = ()) -> list[Any]:
+        started = time.perf_counter()
+        async with self.acquire() as conn:
+            cursor = await conn.execute(sql, params)
+            rows = await cursor.fetchall()
+        self.latency.record((time.perf_counter() - started) * 1000)
+        return list(rows)
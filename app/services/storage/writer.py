@@ -0,0 +1,151 @@
+"""
+SQLite Group-Commit Writer
+SQLite 批量提交写入器
+
+为什么需要批量提交？
+每次 commit 都是一次 fsync。一条消息发布会产生 1 + N 次写入
+（messages + 每个 Sink 的 sink_results），逐条提交时写入吞吐被 fsync 延迟封顶。
+
+写入器把几毫秒内（或最多 N 个）的写操作合并到一个事务中提交：
+- 每个写操作在独立 SAVEPOINT 中执行，单个操作失败只回滚它自己
+- 调用方 await 得到自己那一个操作的结果（影响行数）或异常
+- 写入器空闲时第一个操作只等待 max_delay，突发写入时批量随之变大
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional, Sequence
+
+import aiosqlite
+from loguru import logger
+
+from app.services.storage.pool import LatencyStats
+
+
+@dataclass(frozen=True)
+class Statement:
+    """单条 SQL；many=True 时 params 为多组参数（executemany）"""
+
+    sql: str
+    params: Any = ()
+    many: bool = False
+
+
+@dataclass
+class _PendingWrite:
+    statements: Sequence[Statement]
+    future: asyncio.Future = field(repr=False)
+
+
+class GroupCommitWriter:
+    """
+    批量提交写入器
+
+    只能在单个事件循环中使用；同一连接上的所有写操作都应经由写入器，
+    否则其他协程的 commit 可能提前提交半个批次。
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, max_batch: int = 64, max_delay: float = 0.005):
+        self.conn = conn
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay)
+        self._buffer: list[_PendingWrite] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.writes = 0
+        # 从提交到拿到结果的延迟（包含等待批次的时间）
+        self.latency = LatencyStats()
+
+    async def execute(self, sql: str, params: Any = ()) -> int:
+        """执行单条写 SQL，返回影响行数"""
+        return await self.transaction([Statement(sql, params)])
+
+    async def executemany(self, sql: str, params: Iterable[Any]) -> int:
+        return await self.transaction([Statement(sql, list(params), many=True)])
+
+    async def transaction(self, statements: Sequence[Statement]) -> int:
+        """
+        原子执行一组语句（同一 SAVEPOINT 内），返回影响行数之和
+
+        任一语句失败时整组回滚，异常抛给调用方，同批次其他操作不受影响。
+        """
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append(_PendingWrite(statements, future))
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            return await future
+        finally:
+            self.latency.record((time.perf_counter() - started) * 1000)
+
+    async def flush(self) -> None:
+        """等待当前缓冲的所有写操作提交完成"""
+        self._wakeup.set()
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self) -> None:
+        while self._buffer:
+            if len(self._buffer) < self.max_batch and self.max_delay:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            batch = self._buffer[: self.max_batch]
+            del self._buffer[: self.max_batch]
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: list[_PendingWrite]) -> None:
+        results: list[tuple[_PendingWrite, int]] = []
+        try:
+            await self.conn.execute("BEGIN")
+            for index, pending in enumerate(batch):
+                savepoint = f"w{index}"
+                await self.conn.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    rowcount = 0
+                    for statement in pending.statements:
+                        if statement.many:
+                            cursor = await self.conn.executemany(statement.sql, statement.params)
+                        else:
+                            cursor = await self.conn.execute(statement.sql, statement.params)
+                        rowcount += max(cursor.rowcount, 0)
+                except Exception as e:
+                    await self.conn.execute(f"ROLLBACK TO {savepoint}")
+                    await self.conn.execute(f"RELEASE {savepoint}")
+                    _resolve(pending.future, error=e)
+                    continue
+                await self.conn.execute(f"RELEASE {savepoint}")
+                results.append((pending, rowcount))
+            await self.conn.commit()
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} write(s) failed: {e}")
+            try:
+                await self.conn.rollback()
+            except Exception:
+                pass
+            for pending in batch:
+                _resolve(pending.future, error=e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for pending, rowcount in results:
+            _resolve(pending.future, result=rowcount)
+
+
+def _resolve(
+    future: asyncio.Future, result: int = 0, error: Optional[BaseException] = None
+) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
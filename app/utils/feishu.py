@@ -1,17 +1,17 @@
 import json
 
 
-def extract_img_and_first_text_group(data, separator=""):
+def extract_imgs_and_first_text_group(data, separator=""):
     """
-    从JSON数据中提取第一个img标签的image_key值和第一个包含text的列表中的所有text值
+    从JSON数据中按出现顺序提取所有img标签的image_key值和第一个包含text的列表中的所有text值
 
     Args:
         data: dict 或 JSON字符串
         separator: text值之间的分隔符，默认为空字符串（直接连接）
 
     Returns:
-        tuple: (image_key, combined_text_from_first_group)
-               - image_key: 第一个img标签的image_key值，如果没有则为None
+        tuple: (image_keys, combined_text_from_first_group)
+               - image_keys: 所有img标签的image_key值（去重，保持顺序），没有则为空列表
                - combined_text_from_first_group: 第一个包含text的列表中所有text值合并后的字符串
     """
     # 如果输入是字符串，先解析为字典
@@ -20,7 +20,7 @@ def extract_img_and_first_text_group(data, separator=""):
 
     content = data.get("content", [])
 
-    first_image_key = None
+    image_keys = []
     first_text_group = []
     first_text_group_found = False
 
@@ -32,9 +32,11 @@ def extract_img_and_first_text_group(data, separator=""):
         for item in item_list:
             tag = item.get("tag")
 
-            # 查找第一个img
-            if tag == "img" and first_image_key is None:
-                first_image_key = item.get("image_key")
+            # 收集所有img
+            if tag == "img":
+                image_key = item.get("image_key")
+                if image_key and image_key not in image_keys:
+                    image_keys.append(image_key)
 
             # 收集当前列表中的text（如果还没找到第一个text组）
             elif tag == "text" and not first_text_group_found:
@@ -47,11 +49,24 @@ def extract_img_and_first_text_group(data, separator=""):
             first_text_group = current_list_texts
             first_text_group_found = True
 
-        # 如果已经找到了img和第一个text组，可以提前退出
-        if first_image_key is not None and first_text_group_found:
-            break
-
     # 合并第一个text组的所有text值
     combined_text = separator.join(first_text_group) if first_text_group else ""
 
-    return first_image_key, combined_text
+    return image_keys, combined_text
+
+
+def extract_img_and_first_text_group(data, separator=""):
+    """
+    从JSON数据中提取第一个img标签的image_key值和第一个包含text的列表中的所有text值
+
+    Args:
+        data: dict 或 JSON字符串
+        separator: text值之间的分隔符，默认为空字符串（直接连接）
+
+    Returns:
+        tuple: (image_key, combined_text_from_first_group)
+               - image_key: 第一个img标签的image_key值，如果没有则为None
+               - combined_text_from_first_group: 第一个包含text的列表中所有text值合并后的字符串
+    """
+    image_keys, combined_text = extract_imgs_and_first_text_group(data, separator)
+    return (image_keys[0] if image_keys else None), combined_text
@@ -1,7 +1,41 @@
 import io
+import math
+import time
+from dataclasses import dataclass
 
+from loguru import logger
 from PIL import Image
 
+# 全尺寸 JPEG 编码（optimize=True）次数上限
+MAX_FULL_ENCODES = 4
+# 质量搜索在缩小后的代理图上进行，代理图最长边
+PROXY_MAX_DIMENSION = 512
+QUALITY_MAX = 95
+# 优先保证画质：质量降到该值仍超限时改为缩小尺寸
+QUALITY_MIN = 60
+# 最后一次全尺寸编码的兜底质量（平台有硬性字节上限，宁可降画质也要满足）
+QUALITY_FLOOR = 10
+# 兜底编码在实测大小基础上额外保留的余量
+FALLBACK_MARGIN = 0.8
+# 目标大小的安全余量，抵消代理图估算误差
+TARGET_MARGIN = 0.92
+
+
+@dataclass(frozen=True)
+class CompressionStats:
+    """单次压缩的统计信息"""
+
+    original_size: int
+    output_size: int
+    width: int
+    height: int
+    quality: int
+    encodes: int
+    proxy_encodes: int
+    elapsed_ms: float
+    # 输出是否在目标大小以内（编码次数用完仍超限时为 False）
+    within_target: bool = True
+
 
 def compress_image_advanced(
     image_bytes: bytes, target_size_mb: float = 2, max_dimension: int | None = None
@@ -17,101 +51,248 @@ def compress_image_advanced(
     Returns:
         bytes: 压缩后的图片bytes数据
     """
-    target_size_bytes = target_size_mb * 1024 * 1024
+    output, stats = compress_image_with_stats(image_bytes, target_size_mb, max_dimension)
+    if stats.encodes:
+        logger.info(
+            "Image compressed: {} -> {} bytes, {}x{} q={}, encodes={} proxy_encodes={} "
+            "elapsed={:.1f}ms",
+            stats.original_size,
+            stats.output_size,
+            stats.width,
+            stats.height,
+            stats.quality,
+            stats.encodes,
+            stats.proxy_encodes,
+            stats.elapsed_ms,
+        )
+    return output
+
+
+def compress_image_with_stats(
+    image_bytes: bytes,
+    target_size_mb: float = 2,
+    max_dimension: int | None = None,
+    max_encodes: int = MAX_FULL_ENCODES,
+) -> tuple[bytes, CompressionStats]:
+    """
+    自适应压缩：按每像素字节数估算目标尺寸和质量，全尺寸编码次数有上限
+
+    流程：
+    1. 根据原图每像素字节数估算缩放比例，JPEG 源图用 draft 在解码阶段直接降采样，
+       其他格式用 reduce 做整数倍快速缩小
+    2. 在代理小图上搜索质量，得到目标质量下的每像素字节数
+    3. 由每像素字节数推算最终尺寸，全尺寸编码后按实际大小修正，最多 max_encodes 次
+    4. 最后一次编码作为兜底：质量降到 QUALITY_FLOOR，尺寸按实测大小加余量缩小
+
+    Returns:
+        (压缩后的图片 bytes, 统计信息)
+    """
+    started = time.perf_counter()
+    target_size_bytes = int(target_size_mb * 1024 * 1024)
 
     if len(image_bytes) <= target_size_bytes:
-        return image_bytes
+        return image_bytes, CompressionStats(
+            original_size=len(image_bytes),
+            output_size=len(image_bytes),
+            width=0,
+            height=0,
+            quality=0,
+            encodes=0,
+            proxy_encodes=0,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
 
     image = Image.open(io.BytesIO(image_bytes))
+    original_width, original_height = image.size
 
-    # 处理透明度
-    if image.mode in ("RGBA", "LA", "P"):
-        background = Image.new("RGB", image.size, (255, 255, 255))
-        if image.mode == "P":
-            image = image.convert("RGBA")
-        if image.mode in ("RGBA", "LA"):
-            background.paste(image, mask=image.split()[-1])
+    # 最大边长限制
+    limit_scale = 1.0
+    if max_dimension and max(original_width, original_height) > max_dimension:
+        limit_scale = max_dimension / max(original_width, original_height)
+
+    # 粗略估算：保持源图压缩率时需要的缩放比例，留 2 倍余量给降低质量带来的空间
+    size_guess = math.sqrt(target_size_bytes / len(image_bytes))
+    decode_scale = min(limit_scale, size_guess * 2)
+    image = _decode_reduced(image, decode_scale)
+    image = _flatten_to_rgb(image)
+
+    if limit_scale < 1.0:
+        limit_size = (
+            max(1, int(original_width * limit_scale)),
+            max(1, int(original_height * limit_scale)),
+        )
+        if image.size[0] > limit_size[0]:
+            image = image.resize(limit_size, Image.Resampling.LANCZOS)
+
+    base_width, base_height = image.size
+    base_pixels = base_width * base_height
+    budget = target_size_bytes * TARGET_MARGIN
+
+    # 在代理图上搜索质量
+    proxy = _make_proxy(image)
+    proxy_pixels = proxy.size[0] * proxy.size[1]
+    proxy_encodes = 0
+    quality = QUALITY_MIN
+    quality_bpp = 0.0
+    low, high = QUALITY_MIN, QUALITY_MAX
+    while low <= high:
+        mid = (low + high) // 2
+        bpp = _encoded_size(proxy, mid, optimize=False) / proxy_pixels
+        proxy_encodes += 1
+        if bpp * base_pixels <= budget:
+            quality, quality_bpp = mid, bpp
+            low = mid + 1
         else:
-            background.paste(image)
-        image = background
-    elif image.mode != "RGB":
-        image = image.convert("RGB")
-
-    # 如果指定了最大尺寸限制
-    if max_dimension:
-        width, height = image.size
-        if max(width, height) > max_dimension:
-            if width > height:
-                new_width = max_dimension
-                new_height = int(height * max_dimension / width)
-            else:
-                new_height = max_dimension
-                new_width = int(width * max_dimension / height)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-    # 先尝试不缩放
-    low_quality, high_quality = 10, 95
-    best_quality = 10
-
-    while low_quality <= high_quality:
-        mid_quality = (low_quality + high_quality) // 2
-        size = _get_compressed_size(image, mid_quality)
-
-        if size <= target_size_bytes:
-            best_quality = mid_quality
-            low_quality = mid_quality + 1
+            high = mid - 1
+
+    scale = 1.0
+    if not quality_bpp:
+        # 最低质量仍超限，需要缩小尺寸
+        quality_bpp = _encoded_size(proxy, QUALITY_MIN, optimize=False) / proxy_pixels
+        proxy_encodes += 1
+        scale = min(1.0, math.sqrt(budget / (quality_bpp * base_pixels)))
+
+    output = b""
+    width, height = base_width, base_height
+    encodes = 0
+    attempts = max(1, max_encodes)
+    for attempt in range(attempts):
+        width = max(1, int(base_width * scale))
+        height = max(1, int(base_height * scale))
+        candidate = image
+        if (width, height) != image.size:
+            candidate = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        output = _encode(candidate, quality, optimize=True)
+        encodes += 1
+        if len(output) <= target_size_bytes or (width, height) == (1, 1):
+            break
+
+        if attempt == attempts - 2:
+            # 最后一次尝试是兜底：降到 QUALITY_FLOOR，并按实测每像素字节数加额外余量缩小，
+            # 估算偏差大的图片也能在编码次数内满足硬性字节上限
+            quality = QUALITY_FLOOR
+            scale *= math.sqrt(budget * FALLBACK_MARGIN / len(output))
         else:
-            high_quality = mid_quality - 1
+            # 实际大小超限，按比例修正尺寸；倒数第二次尝试同时降到 QUALITY_MIN
+            scale *= math.sqrt(budget / len(output))
+            if attempt == attempts - 3:
+                quality = min(quality, QUALITY_MIN)
 
-    # 检查是否需要缩放
-    if _get_compressed_size(image, best_quality) <= target_size_bytes:
-        output = io.BytesIO()
-        image.save(output, format="JPEG", quality=best_quality, optimize=True)
-        return output.getvalue()
+    within_target = len(output) <= target_size_bytes
+    if not within_target:
+        logger.warning(
+            "Image still exceeds target after compression: {} > {} bytes",
+            len(output),
+            target_size_bytes,
+        )
+    stats = CompressionStats(
+        original_size=len(image_bytes),
+        output_size=len(output),
+        width=width,
+        height=height,
+        quality=quality,
+        encodes=encodes,
+        proxy_encodes=proxy_encodes,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        within_target=within_target,
+    )
+    return output, stats
 
-    # 需要缩放，使用二分查找找到最佳尺寸
-    original_width, original_height = image.size
-    min_scale, max_scale = 0.1, 1.0
-    best_scale = 0.1
 
-    while max_scale - min_scale > 0.01:
-        mid_scale = (min_scale + max_scale) / 2
-        new_width = int(original_width * mid_scale)
-        new_height = int(original_height * mid_scale)
+def resize_image(image_bytes: bytes, max_dimension: int, quality: int = 90) -> bytes:
+    """
+    按最大边长等比缩放并编码为 JPEG，原图不超过限制时原样返回
 
-        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    Args:
+        image_bytes: 原始图片bytes数据
+        max_dimension: 最大边长
+        quality: JPEG 质量
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    width, height = image.size
+    if max(width, height) <= max_dimension:
+        return image_bytes
 
-        # 对缩放后的图片找最佳质量
-        low_q, high_q = 10, 95
-        best_q = 10
+    ratio = max_dimension / max(width, height)
+    size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    image = _decode_reduced(image, ratio)
+    image = _flatten_to_rgb(image)
+    if image.size != size:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    return _encode(image, quality, optimize=True)
 
-        while low_q <= high_q:
-            mid_q = (low_q + high_q) // 2
-            size = _get_compressed_size(resized_image, mid_q)
 
-            if size <= target_size_bytes:
-                best_q = mid_q
-                low_q = mid_q + 1
-            else:
-                high_q = mid_q - 1
+def transcode_image(image_bytes: bytes, image_format: str = "JPEG", quality: int = 90) -> bytes:
+    """
+    转换图片格式（JPEG 会去除透明通道），源格式相同时原样返回
 
-        if _get_compressed_size(resized_image, best_q) <= target_size_bytes:
-            best_scale = mid_scale
-            min_scale = mid_scale
-        else:
-            max_scale = mid_scale
+    Args:
+        image_bytes: 原始图片bytes数据
+        image_format: 目标格式，如 JPEG / PNG / WEBP
+        quality: 有损格式的编码质量
+    """
+    image_format = image_format.upper()
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == image_format:
+        return image_bytes
 
-    # 生成最终结果
-    final_width = int(original_width * best_scale)
-    final_height = int(original_height * best_scale)
-    final_image = image.resize((final_width, final_height), Image.Resampling.LANCZOS)
+    if image_format == "JPEG":
+        return _encode(_flatten_to_rgb(image), quality, optimize=True)
 
     output = io.BytesIO()
-    final_image.save(output, format="JPEG", quality=best_quality, optimize=True)
+    image.save(output, format=image_format, quality=quality)
     return output.getvalue()
 
 
-def _get_compressed_size(img: Image.Image, quality: int) -> int:
+def _decode_reduced(image: Image.Image, scale: float) -> Image.Image:
+    """按估算比例降采样解码：JPEG 使用 draft（DCT 域缩放），其他格式使用 reduce"""
+    if scale >= 0.5:
+        return image
+
+    width, height = image.size
+    requested = (max(1, int(width * scale)), max(1, int(height * scale)))
+    if image.format == "JPEG":
+        image.draft("RGB", requested)
+        return image
+
+    factor = int(1 / scale)
+    if factor >= 2:
+        image.load()
+        return image.reduce(factor)
+    return image
+
+
+def _flatten_to_rgb(image: Image.Image) -> Image.Image:
+    """处理透明度，统一转换为 RGB"""
+    if image.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        if image.mode == "P":
+            image = image.convert("RGBA")
+        if image.mode in ("RGBA", "LA"):
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image)
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
+
+
+def _make_proxy(image: Image.Image) -> Image.Image:
+    width, height = image.size
+    if max(width, height) <= PROXY_MAX_DIMENSION:
+        return image
+    ratio = PROXY_MAX_DIMENSION / max(width, height)
+    proxy_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    return image.resize(proxy_size, Image.Resampling.BILINEAR)
+
+
+def _encode(img: Image.Image, quality: int, optimize: bool) -> bytes:
     output = io.BytesIO()
-    img.save(output, format="JPEG", quality=quality, optimize=True)
-    return len(output.getvalue())
+    img.save(output, format="JPEG", quality=quality, optimize=optimize)
+    return output.getvalue()
+
+
+def _encoded_size(img: Image.Image, quality: int, optimize: bool) -> int:
+    return len(_encode(img, quality, optimize))
@@ -0,0 +1,280 @@
+"""
+文本长度计算与富文本分析工具
+
+各平台计算字数的方式不同：饭否、Mastodon 按 Unicode 码位计数，
+Bluesky 按字素簇（用户看到的一个“字”，如 👍🏽、🇨🇳、é）计数，同时限制 UTF-8 字节数，
+富文本 facet（链接、@提及、#话题）的位置也以 UTF-8 字节偏移表示。
+这里用标准库 unicodedata 实现 UAX #29 字素簇切分中常用的规则，避免额外依赖。
+
+analyze_text 一次遍历同时得到字素簇数、码位数、字节数和各 facet 的字节偏移，
+Sink 做长度检查和构造 facet 时不需要重复解析文本。
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Literal
+
+ZWJ = "\u200d"
+ZWNJ = "\u200c"
+
+# Hangul 音节类型
+_L = "L"
+_V = "V"
+_T = "T"
+_LV = "LV"
+_LVT = "LVT"
+
+
+def _hangul_type(ch: str) -> str | None:
+    cp = ord(ch)
+    if 0x1100 <= cp <= 0x115F or 0xA960 <= cp <= 0xA97C:
+        return _L
+    if 0x1160 <= cp <= 0x11A7 or 0xD7B0 <= cp <= 0xD7C6:
+        return _V
+    if 0x11A8 <= cp <= 0x11FF or 0xD7CB <= cp <= 0xD7FB:
+        return _T
+    if 0xAC00 <= cp <= 0xD7A3:
+        return _LV if (cp - 0xAC00) % 28 == 0 else _LVT
+    return None
+
+
+def _is_regional_indicator(ch: str) -> bool:
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+
+def _is_extend(ch: str) -> bool:
+    """组合附加符号、ZWJ/ZWNJ、变体选择符、肤色修饰符、emoji tag、SpacingMark"""
+    cp = ord(ch)
+    if ch in (ZWJ, ZWNJ):
+        return True
+    if 0xFE00 <= cp <= 0xFE0F or 0xE0100 <= cp <= 0xE01EF:
+        return True
+    if 0x1F3FB <= cp <= 0x1F3FF or 0xE0020 <= cp <= 0xE007F:
+        return True
+    return unicodedata.category(ch) in ("Mn", "Me", "Mc")
+
+
+def _is_control(ch: str) -> bool:
+    return ch in "\r\n" or unicodedata.category(ch) in ("Cc", "Zl", "Zp", "Cf")
+
+
+def _is_pictographic(ch: str) -> bool:
+    cp = ord(ch)
+    return (
+        0x1F000 <= cp <= 0x1FAFF
+        or 0x2600 <= cp <= 0x27BF
+        or 0x2300 <= cp <= 0x23FF
+        or unicodedata.category(ch) == "So"
+    )
+
+
+def _joins(cluster: str, ch: str) -> bool:
+    """ch 是否与前一个字素簇 cluster 连在一起"""
+    prev = cluster[-1]
+    if prev == "\r" and ch == "\n":
+        return True
+    if _is_extend(ch):
+        return not (prev in "\r\n" or (_is_control(prev) and prev not in (ZWJ, ZWNJ)))
+    # emoji ZWJ 序列：👨‍👩‍👧
+    if prev == ZWJ and _is_pictographic(ch) and len(cluster) > 1:
+        base = next((c for c in reversed(cluster[:-1]) if not _is_extend(c)), None)
+        return base is not None and _is_pictographic(base)
+    if _is_control(prev) or _is_control(ch):
+        return False
+
+    prev_hangul, hangul = _hangul_type(prev), _hangul_type(ch)
+    if prev_hangul == _L and hangul in (_L, _V, _LV, _LVT):
+        return True
+    if prev_hangul in (_LV, _V) and hangul in (_V, _T):
+        return True
+    if prev_hangul in (_LVT, _T) and hangul == _T:
+        return True
+
+    # 国旗：两个区域指示符一组
+    if _is_regional_indicator(prev) and _is_regional_indicator(ch):
+        return sum(1 for c in cluster if _is_regional_indicator(c)) % 2 == 1
+    return False
+
+
+def _starts_cluster(prev: str, ch: str) -> bool:
+    """不需要查 Unicode 属性就能确定 ch 开始新字素簇的常见情况（ASCII、拉丁字母、CJK 汉字）"""
+    cp = ord(ch)
+    return (
+        (cp < 0x300 or 0x4E00 <= cp <= 0x9FFF) and prev != ZWJ and not (prev == "\r" and ch == "\n")
+    )
+
+
+def graphemes(text: str) -> list[str]:
+    """把文本切分为字素簇（用户感知的字符）"""
+    clusters: list[str] = []
+    for ch in text:
+        if clusters and not _starts_cluster(clusters[-1][-1], ch) and _joins(clusters[-1], ch):
+            clusters[-1] += ch
+        else:
+            clusters.append(ch)
+    return clusters
+
+
+def count_graphemes(text: str) -> int:
+    """按字素簇计数（Bluesky 的计数方式）"""
+    if text.isascii():
+        return len(text) - text.count("\r\n")
+    return len(graphemes(text))
+
+
+def count_code_points(text: str) -> int:
+    """按 Unicode 码位计数（饭否、Mastodon 的计数方式）"""
+    return len(text)
+
+
+def utf8_length(text: str) -> int:
+    """UTF-8 编码后的字节数"""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+# ===== 富文本分析 =====
+
+FacetKind = Literal["link", "mention", "tag"]
+
+# 前面不能紧跟字母数字（避免匹配 foohttps://），中文后直接写链接也能识别
+_LINK_RE = re.compile(r"(?<![A-Za-z0-9/@.])https?://[^\s<>\"'，。！？、；：（）「」【】《》]+")
+_MENTION_RE = re.compile(
+    r"(?<![^\s(（])@((?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+"
+    r"[a-zA-Z](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)(?![\w.-])"
+)
+_TAG_RE = re.compile(r"(?<![^\s(（])[#＃]([^\s#＃]+)")
+_TRAILING_LINK_PUNCTUATION = ".,;:!?"
+# 话题最长 64 个字素簇（不含 #）
+MAX_TAG_GRAPHEMES = 64
+
+
+@dataclass(frozen=True)
+class Facet:
+    """
+    富文本片段
+
+    Attributes:
+        kind: link / mention / tag
+        value: 链接地址 / handle（不含 @）/ 话题（不含 #）
+        byte_start, byte_end: 片段在 UTF-8 编码文本中的字节偏移（左闭右开，含 @ 和 #）
+    """
+
+    kind: FacetKind
+    value: str
+    byte_start: int
+    byte_end: int
+
+
+@dataclass(frozen=True)
+class TextAnalysis:
+    text: str
+    graphemes: int
+    code_points: int
+    utf8_bytes: int
+    facets: tuple[Facet, ...] = ()
+
+
+def _strip_link(url: str) -> str:
+    """去掉链接末尾的标点和不成对的右括号"""
+    while url:
+        if url[-1] in _TRAILING_LINK_PUNCTUATION:
+            url = url[:-1]
+        elif url[-1] == ")" and url.count("(") < url.count(")"):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+
+def _strip_tag(tag: str) -> str:
+    while tag and unicodedata.category(tag[-1]).startswith("P"):
+        tag = tag[:-1]
+    return tag
+
+
+def _find_facets(text: str) -> list[tuple[FacetKind, str, int, int]]:
+    """找出链接、提及和话题，返回 (类型, 值, 起始码位, 结束码位)，按位置排序且互不重叠"""
+    spans: list[tuple[FacetKind, str, int, int]] = []
+    for match in _LINK_RE.finditer(text):
+        url = _strip_link(match.group())
+        if len(url) > len("https://"):
+            spans.append(("link", url, match.start(), match.start() + len(url)))
+
+    for match in _MENTION_RE.finditer(text):
+        spans.append(("mention", match.group(1).lower(), match.start(), match.end()))
+
+    for match in _TAG_RE.finditer(text):
+        tag = _strip_tag(match.group(1))
+        if tag and not tag.isdigit() and count_graphemes(tag) <= MAX_TAG_GRAPHEMES:
+            spans.append(("tag", tag, match.start(), match.start() + 1 + len(tag)))
+
+    # 链接中的 #fragment、@user 不再作为话题/提及
+    spans.sort(key=lambda span: (span[2], span[0] != "link"))
+    result: list[tuple[FacetKind, str, int, int]] = []
+    for span in spans:
+        if result and span[2] < result[-1][3]:
+            continue
+        result.append(span)
+    return result
+
+
+def _utf8_width(ch: str) -> int:
+    cp = ord(ch)
+    if cp < 0x80:
+        return 1
+    if cp < 0x800:
+        return 2
+    if cp < 0x10000:
+        return 3
+    return 4
+
+
+def analyze_text(text: str) -> TextAnalysis:
+    """
+    一次遍历计算字素簇数、码位数、UTF-8 字节数和 facet 字节偏移
+
+    Returns:
+        TextAnalysis；facet 按出现顺序排列
+    """
+    spans = _find_facets(text)
+
+    if text.isascii():
+        # ASCII 文本：码位偏移即字节偏移，只有 CRLF 会合并为一个字素簇
+        facets = tuple(Facet(kind, value, start, end) for kind, value, start, end in spans)
+        return TextAnalysis(
+            text=text,
+            graphemes=len(text) - text.count("\r\n"),
+            code_points=len(text),
+            utf8_bytes=len(text),
+            facets=facets,
+        )
+
+    # 需要换算为字节偏移的码位位置
+    positions = sorted({p for _, _, start, end in spans for p in (start, end)})
+    byte_at: dict[int, int] = {}
+    next_position = 0
+    clusters = 0
+    cluster = ""
+    offset = 0
+    for index, ch in enumerate(text):
+        if next_position < len(positions) and positions[next_position] == index:
+            byte_at[index] = offset
+            next_position += 1
+        offset += _utf8_width(ch)
+        if cluster and not _starts_cluster(cluster[-1], ch) and _joins(cluster, ch):
+            cluster += ch
+        else:
+            clusters += 1
+            cluster = ch
+    byte_at[len(text)] = offset
+
+    return TextAnalysis(
+        text=text,
+        graphemes=clusters,
+        code_points=len(text),
+        utf8_bytes=offset,
+        facets=tuple(
+            Facet(kind, value, byte_at[start], byte_at[end]) for kind, value, start, end in spans
+        ),
+    )
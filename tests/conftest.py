@@ -2,6 +2,9 @@ import asyncio
 
 import pytest
 
+from app.core.ratelimit import rate_limiter
+from app.core.resilience import resilience
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -9,3 +12,13 @@ def event_loop():
     loop = asyncio.new_event_loop()
     yield loop
     loop.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_sink_guards():
+    """限流器和熔断器是进程级注册表，测试之间互不影响"""
+    rate_limiter.reset()
+    resilience.reset()
+    yield
+    rate_limiter.reset()
+    resilience.reset()
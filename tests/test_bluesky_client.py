@@ -9,12 +9,16 @@ from unittest.mock import AsyncMock, patch
 import pytest
 
 from app.core.bus import bus
+from app.core.config import settings
 from app.core.reply import ReplyService
 from app.schemas.event import MessageSource, UnifiedMessage
+from app.schemas.media import MediaHandle
 from app.services.platforms.bluesky.client import (
     BLUESKY_IMAGE_LIMIT_BYTES,
     BlueskyClient,
 )
+from app.services.platforms.bluesky.records import dag_cbor_encode, record_cid
+from app.services.platforms.bluesky.resolver import handle_resolver
 
 
 @pytest.fixture
@@ -46,10 +50,12 @@ def reset_singletons():
     bus.clear_handlers()
     ReplyService.reset_instance()
     BlueskyClient.reset_instance()
+    handle_resolver.reset()
     yield
     bus.clear_handlers()
     ReplyService.reset_instance()
     BlueskyClient.reset_instance()
+    handle_resolver.reset()
 
 
 class MockResponse:
@@ -404,6 +410,48 @@ class TestBlueskyClient:
         finally:
             loop.close()
 
+    def test_post_text_adds_facets_with_resolved_mentions(self):
+        loop = asyncio.new_event_loop()
+        try:
+            client = BlueskyClient()
+            client._session = {"did": "did:plc:test", "accessJwt": "jwt"}
+            text = "你好 @alice.bsky.social @ghost.example.com https://bsky.app #话题"
+            dids = {"alice.bsky.social": "did:plc:alice"}
+
+            with (
+                patch.object(
+                    client, "resolve_handle", AsyncMock(side_effect=lambda h: dids.get(h))
+                ),
+                patch.object(
+                    client, "_create_record", AsyncMock(return_value={"cid": "bafy"})
+                ) as mock_create_record,
+            ):
+                loop.run_until_complete(client.post_text(text))
+
+            assert mock_create_record.await_args is not None
+            record = mock_create_record.await_args.args[0]
+            encoded = text.encode()
+            features = [
+                (
+                    encoded[f["index"]["byteStart"] : f["index"]["byteEnd"]].decode(),
+                    f["features"][0],
+                )
+                for f in record["facets"]
+            ]
+            assert features == [
+                (
+                    "@alice.bsky.social",
+                    {"$type": "app.bsky.richtext.facet#mention", "did": "did:plc:alice"},
+                ),
+                (
+                    "https://bsky.app",
+                    {"$type": "app.bsky.richtext.facet#link", "uri": "https://bsky.app"},
+                ),
+                ("#话题", {"$type": "app.bsky.richtext.facet#tag", "tag": "话题"}),
+            ]
+        finally:
+            loop.close()
+
     def test_success_text_prefers_web_url(self):
         client = BlueskyClient()
         client._session = {"handle": "tester.bsky.social"}
@@ -445,8 +493,8 @@ class TestBlueskyClient:
 
             with (
                 patch(
-                    "app.services.platforms.bluesky.client.compress_image_advanced",
-                    return_value=compressed,
+                    "app.services.platforms.bluesky.client.compress_image",
+                    AsyncMock(return_value=compressed),
                 ) as mock_compress,
                 patch.object(
                     client,
@@ -468,12 +516,66 @@ class TestBlueskyClient:
 
             assert result is not None
             assert result["cid"] == "bafy123"
-            mock_compress.assert_called_once()
+            mock_compress.assert_awaited_once()
             assert mock_upload_blob.await_args is not None
             assert mock_upload_blob.await_args.args[0] == compressed
         finally:
             loop.close()
 
+    def test_post_images_embeds_all_blobs_in_one_record(self):
+        loop = asyncio.new_event_loop()
+        try:
+            client = BlueskyClient()
+            session = {"did": "did:plc:test", "accessJwt": "jwt"}
+            client._session = session
+
+            async def upload(image, current_session):
+                await asyncio.sleep(0.01 if image == b"first" else 0)
+                return {"ref": {"$link": image.decode()}}, current_session
+
+            with (
+                patch.object(client, "_upload_blob", side_effect=upload),
+                patch.object(
+                    client, "_create_record", AsyncMock(return_value={"cid": "bafy"})
+                ) as mock_create_record,
+            ):
+                images = [b"first", b"second", b"third", b"fourth", b"fifth"]
+                result = loop.run_until_complete(client.post_images(images, "album"))
+
+            assert result == {"cid": "bafy"}
+            assert mock_create_record.await_args is not None
+            record = mock_create_record.await_args.args[0]
+            assert [item["image"]["ref"]["$link"] for item in record["embed"]["images"]] == [
+                "first",
+                "second",
+                "third",
+                "fourth",
+            ]
+        finally:
+            loop.close()
+
+    def test_upload_blob_streams_media_handle_from_disk(self, tmp_path):
+        loop = asyncio.new_event_loop()
+        try:
+            client = BlueskyClient()
+            session = {"did": "did:plc:test", "accessJwt": "jwt"}
+            handle = MediaHandle.from_bytes(b"jpeg-bytes", tmp_path / "image.jpg")
+            captured = {}
+
+            async def fake_post(path, current_session, **kwargs):
+                captured.update(kwargs)
+                captured["body"] = b"".join([chunk async for chunk in kwargs["content"]])
+                return MockResponse(200, {"blob": {"ref": {"$link": "blob"}}})
+
+            with patch.object(client, "_post_with_session", side_effect=fake_post):
+                blob, _ = loop.run_until_complete(client._upload_blob(handle, session))
+
+            assert blob == {"ref": {"$link": "blob"}}
+            assert captured["content_length"] == handle.size
+            assert captured["body"] == b"jpeg-bytes"
+        finally:
+            loop.close()
+
     def test_post_image_refreshes_expired_token_during_upload(self):
         loop = asyncio.new_event_loop()
         try:
@@ -618,7 +720,7 @@ class TestBlueskyClient:
         finally:
             loop.close()
 
-    def test_handle_text_too_long(self, db_manager):
+    def test_handle_text_too_long_rejected_when_threading_disabled(self, db_manager):
         _mgr, loop = db_manager
         ReplyService.create_instance()
         replies = []
@@ -630,7 +732,10 @@ class TestBlueskyClient:
         )
 
         client = BlueskyClient()
-        with patch.object(client, "post_text", AsyncMock()) as mock_post_text:
+        with (
+            patch.object(client, "post_text", AsyncMock()) as mock_post_text,
+            patch.object(settings, "long_text_threading_enabled", False),
+        ):
             msg = UnifiedMessage(
                 source=MessageSource.FEISHU,
                 content="x" * 301,
@@ -641,3 +746,131 @@ class TestBlueskyClient:
 
         mock_post_text.assert_not_called()
         assert replies == ["[Bluesky] 消息长度超过 300 字，无法发送"]
+
+    def test_handle_long_text_posts_thread_in_one_apply_writes(self, db_manager):
+        _mgr, loop = db_manager
+        ReplyService.create_instance()
+        replies = []
+        reply_service = ReplyService.get_instance()
+        assert reply_service is not None
+        reply_service.register(
+            MessageSource.FEISHU,
+            reply_handler=lambda m, t: replies.append(t),
+        )
+
+        client = BlueskyClient()
+        client._session = {"did": "did:plc:test", "accessJwt": "jwt", "handle": "t.bsky.social"}
+        requests = []
+
+        async def fake_post(path, current_session, **kwargs):
+            requests.append((path, kwargs["json"]))
+            results = [
+                {
+                    "uri": f"at://did:plc:test/app.bsky.feed.post/{w['rkey']}",
+                    "cid": record_cid(w["value"]),
+                }
+                for w in kwargs["json"]["writes"]
+            ]
+            return MockResponse(200, {"results": results})
+
+        # 每个 👍🏽 是一个字素簇（两个码位）
+        content = "。".join(["👍🏽" * 60] * 8)
+        msg = UnifiedMessage(
+            source=MessageSource.FEISHU,
+            content=content,
+            message_type="text",
+            sender_id="user1",
+        )
+        with patch.object(client, "_post_with_session", side_effect=fake_post):
+            loop.run_until_complete(client.handle_message(msg))
+
+        ((path, payload),) = requests
+        assert path == "/xrpc/com.atproto.repo.applyWrites"
+        records = [write["value"] for write in payload["writes"]]
+        assert len(records) == 2
+        assert "reply" not in records[0]
+        root = {
+            "uri": f"at://did:plc:test/app.bsky.feed.post/{payload['writes'][0]['rkey']}",
+            "cid": record_cid(records[0]),
+        }
+        assert records[1]["reply"] == {"root": root, "parent": root}
+        assert payload["writes"][0]["rkey"] < payload["writes"][1]["rkey"]
+        assert records[0]["text"].endswith(" (1/2)")
+        assert replies[0].endswith("[Bluesky] 长文已拆分为 2 条回复串发布")
+
+    def test_thread_retry_after_lost_response_checks_first_record(self):
+        client = BlueskyClient()
+        client._session = {"did": "did:plc:test", "accessJwt": "jwt", "handle": "t.bsky.social"}
+        sent = []
+
+        async def fake_post(path, current_session, **kwargs):
+            sent.append(kwargs["json"])
+            # 已提交但响应丢失
+            return MockResponse(502, {"error": "UpstreamFailure"})
+
+        async def fake_get_record(repo, rkey):
+            write = sent[0]["writes"][0]
+            assert (repo, rkey) == ("did:plc:test", write["rkey"])
+            return MockResponse(
+                200,
+                {
+                    "uri": f"at://{repo}/app.bsky.feed.post/{rkey}",
+                    "cid": record_cid(write["value"]),
+                },
+            )
+
+        loop = asyncio.new_event_loop()
+        try:
+            with (
+                patch.object(client, "_post_with_session", side_effect=fake_post),
+                patch.object(client, "_get_record", side_effect=fake_get_record),
+            ):
+                posted = loop.run_until_complete(client.post_thread(["one", "two"]))
+        finally:
+            loop.close()
+
+        assert len(sent) == 1
+        assert [p["uri"].rsplit("/", 1)[-1] for p in posted] == [
+            w["rkey"] for w in sent[0]["writes"]
+        ]
+        assert posted[1]["cid"] == record_cid(sent[0]["writes"][1]["value"])
+
+    def test_thread_cid_mismatch_is_reported_as_failure(self):
+        client = BlueskyClient()
+        client._session = {"did": "did:plc:test", "accessJwt": "jwt", "handle": "t.bsky.social"}
+        sent = []
+
+        async def fake_post(path, current_session, **kwargs):
+            sent.append(kwargs["json"])
+            results = [
+                {"uri": f"at://did:plc:test/app.bsky.feed.post/{w['rkey']}", "cid": "bafy-server"}
+                for w in kwargs["json"]["writes"]
+            ]
+            return MockResponse(200, {"results": results})
+
+        loop = asyncio.new_event_loop()
+        try:
+            with patch.object(client, "_post_with_session", side_effect=fake_post):
+                posted = loop.run_until_complete(client.post_thread(["one", "two"]))
+        finally:
+            loop.close()
+
+        assert posted == []
+        # 引用无效的串被撤回
+        created, deleted = sent
+        assert [w["$type"] for w in deleted["writes"]] == [
+            "com.atproto.repo.applyWrites#delete"
+        ] * 2
+        assert [w["rkey"] for w in deleted["writes"]] == [w["rkey"] for w in created["writes"]]
+
+
+def test_record_cid_matches_dag_cbor_reference():
+    # 空 map 的 DAG-CBOR CID 是公开的参考值
+    assert record_cid({}) == "bafyreigbtj4x7ip5legnfznufuopl4sg4knzc2cof6duas4b3q2fy6swua"
+    # map 键按编码长度再按字节序排序，与插入顺序无关
+    assert dag_cbor_encode({"text": "a", "$type": "b"}) == dag_cbor_encode(
+        {"$type": "b", "text": "a"}
+    )
+    assert dag_cbor_encode({"text": "a", "$type": "b"}).hex() == (
+        "a2647465787461616524747970656162"
+    )
@@ -0,0 +1,192 @@
+"""Tests for the Bluesky handle → DID resolution cache"""
+
+import asyncio
+import os
+import tempfile
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.platforms.bluesky.client import BlueskyClient
+from app.services.platforms.bluesky.resolver import HandleResolutionError, HandleResolver
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with (
+        patch("app.services.platforms.bluesky.resolver.time.time", fake.time),
+        patch.object(settings, "bluesky_handle_cache_ttl", 3600.0),
+        patch.object(settings, "bluesky_handle_negative_ttl", 60.0),
+    ):
+        yield fake
+
+
+@pytest.fixture
+def db_manager():
+    from app.services.storage.db import DatabaseManager
+
+    DatabaseManager.reset_instance()
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        path = f.name
+    mgr = DatabaseManager()
+    mgr.db_path = path
+    DatabaseManager._instance = mgr
+    yield mgr
+    DatabaseManager.reset_instance()
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def test_concurrent_lookups_are_coalesced_and_repeats_hit_cache(clock):
+    resolver = HandleResolver()
+    calls: list[str] = []
+
+    async def fetch(handle: str) -> str:
+        calls.append(handle)
+        await asyncio.sleep(0.01)
+        return f"did:plc:{handle.split('.')[0]}"
+
+    async def scenario():
+        first = await asyncio.gather(
+            resolver.resolve("alice.bsky.social", fetch),
+            resolver.resolve("Alice.bsky.social", fetch),
+            resolver.resolve("bob.bsky.social", fetch),
+        )
+        second = await resolver.resolve("alice.bsky.social", fetch)
+        return first, second
+
+    loop = asyncio.new_event_loop()
+    try:
+        first, second = loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert first == ["did:plc:alice", "did:plc:alice", "did:plc:bob"]
+    assert second == "did:plc:alice"
+    assert sorted(calls) == ["alice.bsky.social", "bob.bsky.social"]
+    assert resolver.snapshot() == {
+        "entries": 2,
+        "inflight": 0,
+        "hits": 1,
+        "misses": 2,
+        "coalesced": 1,
+        "failures": 0,
+    }
+
+
+def test_unresolvable_handle_is_cached_for_negative_ttl(clock):
+    resolver = HandleResolver()
+    fetch = AsyncMock(return_value=None)
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(resolver.resolve("ghost.example.com", fetch)) is None
+        clock.now += 59
+        assert loop.run_until_complete(resolver.resolve("ghost.example.com", fetch)) is None
+        assert fetch.await_count == 1
+
+        clock.now += 2
+        fetch.return_value = "did:plc:ghost"
+        assert (
+            loop.run_until_complete(resolver.resolve("ghost.example.com", fetch)) == "did:plc:ghost"
+        )
+        assert fetch.await_count == 2
+    finally:
+        loop.close()
+
+
+def test_transient_failure_is_not_cached_and_falls_back_to_stale_did(clock):
+    resolver = HandleResolver()
+    fetch = AsyncMock(return_value="did:plc:alice")
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(resolver.resolve("alice.bsky.social", fetch))
+        clock.now += 3601
+        fetch.side_effect = HandleResolutionError("HTTP 502")
+        assert (
+            loop.run_until_complete(resolver.resolve("alice.bsky.social", fetch)) == "did:plc:alice"
+        )
+        # 失败没有续期缓存，下次仍会重新请求
+        assert loop.run_until_complete(resolver.resolve("alice.bsky.social", fetch))
+        assert fetch.await_count == 3
+        assert loop.run_until_complete(resolver.resolve("carol.bsky.social", fetch)) is None
+    finally:
+        loop.close()
+
+    assert resolver.snapshot()["failures"] == 3
+
+
+def test_resolutions_persist_across_restarts(clock, db_manager):
+    fetch = AsyncMock(side_effect=lambda h: {"alice.bsky.social": "did:plc:alice"}.get(h))
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(db_manager.start())
+        resolver = HandleResolver()
+        loop.run_until_complete(resolver.resolve("alice.bsky.social", fetch))
+        loop.run_until_complete(resolver.resolve("ghost.example.com", fetch))
+        loop.run_until_complete(db_manager.writer.flush())
+
+        # 新进程：内存缓存为空，从 SQLite 恢复
+        restarted = HandleResolver()
+        assert (
+            loop.run_until_complete(restarted.resolve("alice.bsky.social", fetch))
+            == "did:plc:alice"
+        )
+        assert loop.run_until_complete(restarted.resolve("ghost.example.com", fetch)) is None
+        assert fetch.await_count == 2
+
+        # 持久化的否定结果过期后重新解析
+        clock.now += 61
+        loop.run_until_complete(restarted.resolve("ghost.example.com", fetch))
+        assert fetch.await_count == 3
+        assert loop.run_until_complete(db_manager.get_bluesky_handle("alice.bsky.social")) == (
+            "did:plc:alice",
+            clock.now - 61 + 3600,
+        )
+    finally:
+        loop.run_until_complete(db_manager.stop())
+        loop.close()
+
+
+class MockResponse:
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.status_code < 300
+
+    def json(self) -> dict:
+        return self._payload
+
+
+def test_client_distinguishes_unknown_handle_from_server_error():
+    BlueskyClient.reset_instance()
+    client = BlueskyClient()
+
+    loop = asyncio.new_event_loop()
+    try:
+        with patch("httpx.AsyncClient.get", AsyncMock(return_value=MockResponse(400, {}))):
+            assert loop.run_until_complete(client._fetch_did("ghost.example.com")) is None
+
+        with (
+            patch.object(settings, "retry_max_attempts", 1),
+            patch("httpx.AsyncClient.get", AsyncMock(return_value=MockResponse(502, {}))),
+        ):
+            with pytest.raises(HandleResolutionError):
+                loop.run_until_complete(client._fetch_did("alice.bsky.social"))
+    finally:
+        loop.close()
@@ -0,0 +1,290 @@
+"""Tests for EventBus dispatch modes"""
+
+import asyncio
+
+import pytest
+
+from app.core.bus import BackpressurePolicy, EventBus, SinkDispatch, bus
+from app.schemas.event import MessageSource, UnifiedMessage
+
+
+@pytest.fixture(autouse=True)
+def reset_bus():
+    bus.clear_handlers()
+    yield
+    bus.clear_handlers()
+
+
+def _message(content: str = "hello") -> UnifiedMessage:
+    return UnifiedMessage(
+        source=MessageSource.FEISHU,
+        content=content,
+        sender_id="user1",
+    )
+
+
+class TestEventBus:
+    def test_singleton(self):
+        assert EventBus() is bus
+
+    def test_direct_handlers_awaited_by_publish(self):
+        loop = asyncio.new_event_loop()
+        try:
+            received = []
+
+            async def handler(message: UnifiedMessage) -> None:
+                await asyncio.sleep(0)
+                received.append(message.content)
+
+            bus.register(handler)
+            loop.run_until_complete(bus.publish(_message()))
+            assert received == ["hello"]
+        finally:
+            loop.close()
+
+    def test_failing_handler_does_not_affect_others(self):
+        loop = asyncio.new_event_loop()
+        try:
+            received = []
+
+            async def broken(message: UnifiedMessage) -> None:
+                raise RuntimeError("boom")
+
+            async def healthy(message: UnifiedMessage) -> None:
+                received.append(message.content)
+
+            bus.register(broken)
+            bus.register(healthy)
+            loop.run_until_complete(bus.publish(_message()))
+            assert received == ["hello"]
+        finally:
+            loop.close()
+
+    def test_queued_publish_does_not_wait_for_slow_handler(self):
+        loop = asyncio.new_event_loop()
+        try:
+            release = asyncio.Event()
+            received = []
+
+            async def slow(message: UnifiedMessage) -> None:
+                await release.wait()
+                received.append(message.content)
+
+            bus.register(slow, SinkDispatch(queue_size=10))
+
+            async def scenario():
+                await asyncio.wait_for(bus.publish(_message("a")), timeout=1)
+                await asyncio.wait_for(bus.publish(_message("b")), timeout=1)
+                assert received == []
+                release.set()
+                await bus.stop(timeout=1)
+
+            loop.run_until_complete(scenario())
+            assert received == ["a", "b"]
+        finally:
+            loop.close()
+
+    def test_queued_handler_failure_keeps_worker_alive(self):
+        loop = asyncio.new_event_loop()
+        try:
+            received = []
+
+            async def flaky(message: UnifiedMessage) -> None:
+                if message.content == "bad":
+                    raise RuntimeError("boom")
+                received.append(message.content)
+
+            bus.register(flaky, SinkDispatch(queue_size=10))
+
+            async def scenario():
+                await bus.publish(_message("bad"))
+                await bus.publish(_message("good"))
+                await bus.stop(timeout=1)
+
+            loop.run_until_complete(scenario())
+            assert received == ["good"]
+        finally:
+            loop.close()
+
+    def test_reject_policy_drops_new_messages_when_full(self):
+        loop = asyncio.new_event_loop()
+        try:
+            release = asyncio.Event()
+            received = []
+
+            async def slow(message: UnifiedMessage) -> None:
+                await release.wait()
+                received.append(message.content)
+
+            bus.register(
+                slow,
+                SinkDispatch(queue_size=1, backpressure=BackpressurePolicy.REJECT),
+            )
+
+            async def scenario():
+                await bus.publish(_message("a"))
+                await asyncio.sleep(0)  # worker 取走 a
+                await bus.publish(_message("b"))
+                await bus.publish(_message("c"))
+                release.set()
+                await bus.stop(timeout=1)
+
+            loop.run_until_complete(scenario())
+            assert received == ["a", "b"]
+        finally:
+            loop.close()
+
+    def test_drop_oldest_policy_keeps_newest_messages(self):
+        loop = asyncio.new_event_loop()
+        try:
+            release = asyncio.Event()
+            received = []
+
+            async def slow(message: UnifiedMessage) -> None:
+                await release.wait()
+                received.append(message.content)
+
+            bus.register(
+                slow,
+                SinkDispatch(queue_size=1, backpressure=BackpressurePolicy.DROP_OLDEST),
+            )
+
+            async def scenario():
+                await bus.publish(_message("a"))
+                await asyncio.sleep(0)
+                await bus.publish(_message("b"))
+                await bus.publish(_message("c"))
+                assert bus.get_queue_depths() == {slow.__qualname__: 1}
+                release.set()
+                await bus.stop(timeout=1)
+
+            loop.run_until_complete(scenario())
+            assert received == ["a", "c"]
+        finally:
+            loop.close()
+
+    def test_block_policy_waits_for_free_slot(self):
+        loop = asyncio.new_event_loop()
+        try:
+            release = asyncio.Event()
+            received = []
+
+            async def slow(message: UnifiedMessage) -> None:
+                await release.wait()
+                received.append(message.content)
+
+            bus.register(slow, SinkDispatch(queue_size=1))
+
+            async def scenario():
+                await bus.publish(_message("a"))
+                await asyncio.sleep(0)
+                await bus.publish(_message("b"))
+                blocked = asyncio.ensure_future(bus.publish(_message("c")))
+                await asyncio.sleep(0.01)
+                assert not blocked.done()
+                release.set()
+                await asyncio.wait_for(blocked, timeout=1)
+                await bus.stop(timeout=1)
+
+            loop.run_until_complete(scenario())
+            assert received == ["a", "b", "c"]
+        finally:
+            loop.close()
+
+    def test_outbox_records_named_sinks_and_marks_done(self):
+        loop = asyncio.new_event_loop()
+        try:
+            events = []
+
+            class FakeOutbox:
+                async def add_pending_deliveries(self, message, sinks):
+                    events.append(("pending", sorted(sinks)))
+
+                async def mark_delivery_done(self, event_id, sink):
+                    events.append(("done", sink))
+
+            async def sink_handler(message: UnifiedMessage) -> None:
+                events.append(("handled", message.content))
+
+            async def storage_handler(message: UnifiedMessage) -> None:
+                pass
+
+            bus.register(sink_handler, sink="fanfou")
+            bus.register(storage_handler)
+            bus.set_outbox(FakeOutbox())
+
+            loop.run_until_complete(bus.publish(_message()))
+            assert events == [("pending", ["fanfou"]), ("handled", "hello"), ("done", "fanfou")]
+        finally:
+            loop.close()
+
+    def test_backpressure_discards_are_marked_abandoned_in_outbox(self):
+        loop = asyncio.new_event_loop()
+        try:
+            release = asyncio.Event()
+            abandoned = []
+
+            class FakeOutbox:
+                async def add_pending_deliveries(self, message, sinks):
+                    pass
+
+                async def mark_delivery_done(self, event_id, sink):
+                    pass
+
+                async def mark_delivery_abandoned(self, event_id, sink):
+                    abandoned.append((event_id, sink))
+
+            async def dropping(message: UnifiedMessage) -> None:
+                await release.wait()
+
+            async def rejecting(message: UnifiedMessage) -> None:
+                await release.wait()
+
+            bus.register(
+                dropping,
+                SinkDispatch(queue_size=1, backpressure=BackpressurePolicy.DROP_OLDEST),
+                sink="fanfou",
+            )
+            bus.register(
+                rejecting,
+                SinkDispatch(queue_size=1, backpressure=BackpressurePolicy.REJECT),
+                sink="threads",
+            )
+            bus.set_outbox(FakeOutbox())
+            messages = [_message(content) for content in "abc"]
+
+            async def scenario():
+                await bus.publish(messages[0])
+                await asyncio.sleep(0)
+                await bus.publish(messages[1])
+                await bus.publish(messages[2])
+                release.set()
+                await bus.stop(timeout=1)
+
+            loop.run_until_complete(scenario())
+            # fanfou 丢弃了最旧的 b，threads 拒绝了新的 c
+            assert sorted(abandoned) == sorted(
+                [(str(messages[1].event_id), "fanfou"), (str(messages[2].event_id), "threads")]
+            )
+        finally:
+            loop.close()
+
+    def test_redeliver_only_targets_named_sinks(self):
+        loop = asyncio.new_event_loop()
+        try:
+            received = []
+
+            async def fanfou_handler(message: UnifiedMessage) -> None:
+                received.append("fanfou")
+
+            async def threads_handler(message: UnifiedMessage) -> None:
+                received.append("threads")
+
+            bus.register(fanfou_handler, sink="fanfou")
+            bus.register(threads_handler, sink="threads")
+
+            delivered = loop.run_until_complete(bus.redeliver(_message(), ["threads", "mastodon"]))
+            assert delivered == ["threads"]
+            assert received == ["threads"]
+        finally:
+            loop.close()
@@ -3,6 +3,7 @@
 import asyncio
 import os
 import tempfile
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
@@ -203,3 +204,220 @@ class TestDatabaseManager:
             loop.run_until_complete(db_manager.stop())
         finally:
             loop.close()
+
+    def test_sink_result_marks_outbox_done(self, db_manager):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+
+            msg = UnifiedMessage(
+                source=MessageSource.FEISHU,
+                content="outbox",
+                sender_id="user1",
+            )
+            loop.run_until_complete(db_manager.add_pending_deliveries(msg, ["fanfou", "threads"]))
+            pending = loop.run_until_complete(db_manager.get_pending_deliveries())
+            assert {row["sink_platform"] for row in pending} == {"fanfou", "threads"}
+
+            loop.run_until_complete(
+                db_manager.save_sink_result(event_id=str(msg.event_id), sink_platform="fanfou")
+            )
+            pending = loop.run_until_complete(db_manager.get_pending_deliveries())
+            assert [row["sink_platform"] for row in pending] == ["threads"]
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
+
+    def test_resume_pending_deliveries(self, db_manager):
+        from app.core.bus import bus
+
+        bus.clear_handlers()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            received = []
+
+            async def fanfou_handler(message: UnifiedMessage) -> None:
+                received.append(("fanfou", message.content))
+
+            async def threads_handler(message: UnifiedMessage) -> None:
+                received.append(("threads", message.content))
+
+            bus.register(fanfou_handler, sink="fanfou")
+            bus.register(threads_handler, sink="threads")
+            bus.set_outbox(db_manager)
+
+            msg = UnifiedMessage(
+                source=MessageSource.FEISHU,
+                content="crashed",
+                sender_id="user1",
+            )
+            loop.run_until_complete(db_manager.add_pending_deliveries(msg, ["fanfou", "threads"]))
+            # fanfou 在崩溃前已经写入结果，不应重放
+            loop.run_until_complete(
+                db_manager.save_sink_result(event_id=str(msg.event_id), sink_platform="fanfou")
+            )
+
+            resumed = loop.run_until_complete(db_manager.resume_pending_deliveries())
+            assert resumed == 1
+            assert received == [("threads", "crashed")]
+            assert loop.run_until_complete(db_manager.get_pending_deliveries()) == []
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
+            bus.clear_handlers()
+
+    def test_abandoned_deliveries_are_not_resumed_and_old_rows_are_pruned(self, db_manager):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            msg = UnifiedMessage(source=MessageSource.FEISHU, content="dropped", sender_id="user1")
+            loop.run_until_complete(
+                db_manager.add_pending_deliveries(msg, ["fanfou", "threads", "mastodon"])
+            )
+            event_id = str(msg.event_id)
+            loop.run_until_complete(db_manager.mark_delivery_abandoned(event_id, "fanfou"))
+            loop.run_until_complete(db_manager.mark_delivery_done(event_id, "threads"))
+            pending = loop.run_until_complete(db_manager.get_pending_deliveries())
+            assert [row["sink_platform"] for row in pending] == ["mastodon"]
+
+            async def age_rows():
+                await db_manager.conn.execute(
+                    "UPDATE outbox SET updated_at = datetime('now', '-8 days')"
+                )
+                await db_manager.conn.commit()
+
+            loop.run_until_complete(age_rows())
+            # pending 记录无论多旧都保留
+            assert loop.run_until_complete(db_manager.prune_outbox(7 * 86400)) == 2
+            pending = loop.run_until_complete(db_manager.get_pending_deliveries())
+            assert [row["sink_platform"] for row in pending] == ["mastodon"]
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
+
+    def test_pruning_task_runs_on_start_and_stops_with_database(self, db_manager):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            with patch.object(db_manager, "prune_history", AsyncMock(return_value={})) as prune:
+
+                async def scenario():
+                    db_manager.start_pruning()
+                    await asyncio.sleep(0.01)
+
+                loop.run_until_complete(scenario())
+                prune.assert_awaited_once()
+                loop.run_until_complete(db_manager.stop())
+            assert db_manager._prune_task is None
+        finally:
+            loop.close()
+
+    def test_concurrent_writes_share_one_commit(self, db_manager):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            messages = [
+                UnifiedMessage(source=MessageSource.FEISHU, content=f"m{i}", sender_id="user1")
+                for i in range(20)
+            ]
+
+            async def burst():
+                # 同一批次中混入一条重复消息，只有它失败
+                return await asyncio.gather(
+                    *(db_manager.save_message(m) for m in messages),
+                    db_manager.save_message(messages[0]),
+                )
+
+            results = loop.run_until_complete(burst())
+            assert results[:20] == [True] * 20
+            assert results[20] is False
+            assert loop.run_until_complete(db_manager.get_message_count()) == 20
+            assert db_manager.writer.batches < db_manager.writer.writes
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
+
+    def test_wal_mode_serves_reads_from_read_pool(self, db_manager):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            assert db_manager.journal_mode == "wal"
+
+            msg = UnifiedMessage(source=MessageSource.FEISHU, content="hi", sender_id="user1")
+            assert loop.run_until_complete(db_manager.save_message(msg)) is True
+            # 写入 await 返回时已提交，读连接立即可见
+            recent = loop.run_until_complete(db_manager.get_recent_messages(5))
+            assert [m["content"] for m in recent] == ["hi"]
+
+            stats = db_manager.get_latency_stats()
+            assert stats["read_pool_size"] == 2
+            assert stats["read"]["count"] == 1
+            assert stats["write"]["count"] == 1
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
+
+    def test_rollback_journal_reads_on_writer_connection(self, db_manager, monkeypatch):
+        from app.services.storage import db as db_module
+
+        monkeypatch.setattr(db_module.settings, "database_wal_enabled", False)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            assert db_manager.journal_mode == "delete"
+
+            msg = UnifiedMessage(source=MessageSource.FEISHU, content="hi", sender_id="user1")
+            loop.run_until_complete(db_manager.save_message(msg))
+            assert loop.run_until_complete(db_manager.get_message_count()) == 1
+            stats = db_manager.get_latency_stats()
+            assert stats["read_pool_size"] == 0
+            assert stats["read"]["count"] == 1
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
+
+    def test_sink_credentials_cached_until_token_changes(self, db_manager):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(db_manager.start())
+            lookups = []
+            original = db_manager.get_any_token_for_sink
+
+            async def counting(sink_platform):
+                lookups.append(sink_platform)
+                return await original(sink_platform)
+
+            db_manager.get_any_token_for_sink = counting
+
+            async def scenario():
+                assert await db_manager.get_sink_credentials("fanfou") is None
+                assert await db_manager.get_sink_credentials("fanfou") is None
+                await db_manager.save_user_token("feishu", "u1", "fanfou", '{"oauth_token": "a"}')
+                first = await db_manager.get_sink_credentials("fanfou")
+                first["oauth_token"] = "mutated"
+                second = await db_manager.get_sink_credentials("fanfou")
+                await db_manager.delete_user_token("feishu", "u1", "fanfou")
+                third = await db_manager.get_sink_credentials("fanfou")
+                return second, third
+
+            second, third = loop.run_until_complete(scenario())
+            assert second == {"oauth_token": "a"}
+            assert third is None
+            # 未授权结果也会缓存；每次 save/delete 后只重新查询一次
+            assert lookups == ["fanfou", "fanfou", "fanfou"]
+
+            loop.run_until_complete(
+                db_manager.save_user_token("shared", "shared", "bluesky", "not-json")
+            )
+            assert loop.run_until_complete(db_manager.get_sink_credentials("bluesky")) is None
+
+            loop.run_until_complete(db_manager.stop())
+        finally:
+            loop.close()
@@ -6,12 +6,15 @@ import os
 import tempfile
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
 from app.core.auth import AuthService
 from app.core.bus import bus
+from app.core.config import settings
 from app.core.reply import ReplyService
 from app.schemas.event import MessageSource, UnifiedMessage
+from app.schemas.media import MediaHandle
 from app.services.platforms.fanfou.client import FanfouClient
 
 
@@ -93,6 +96,58 @@ class TestFanfouClient:
             assert result is not None
             assert result["id"] == "12345"
 
+    def test_post_text_not_retried_once_request_may_have_been_sent(self, db_manager):
+        """发帖不是幂等操作：读超时、5xx 不重试，只有连接失败才重试"""
+        mgr, loop = db_manager
+        loop.run_until_complete(
+            mgr.save_user_token(
+                source_platform="feishu",
+                source_user_id="user1",
+                sink_platform="fanfou",
+                token_data=json.dumps({"oauth_token": "tok", "oauth_token_secret": "sec"}),
+            )
+        )
+
+        client = FanfouClient()
+
+        with (
+            patch("app.services.platforms.fanfou.client.Fanfou") as MockFanfou,
+            patch("asyncio.sleep", AsyncMock()),
+        ):
+            mock_ff = MockFanfou.return_value
+            mock_ff.api_domain = "api.fanfou.com"
+            mock_ff.post_text = AsyncMock(side_effect=httpx.ReadTimeout("timeout"))
+            with pytest.raises(httpx.ReadTimeout):
+                loop.run_until_complete(client.post_text("test post"))
+            assert mock_ff.post_text.await_count == 1
+
+            mock_ff.post_text = AsyncMock(return_value=(None, httpx.Response(503)))
+            assert loop.run_until_complete(client.post_text("test post")) is None
+            assert mock_ff.post_text.await_count == 1
+
+            mock_ff.post_text = AsyncMock(
+                side_effect=[httpx.ConnectError("refused"), ({"id": "1"}, MagicMock())]
+            )
+            assert loop.run_until_complete(client.post_text("test post")) == {"id": "1"}
+            assert mock_ff.post_text.await_count == 2
+
+    def test_sdk_instance_reused_until_token_changes(self, db_manager):
+        """_get_fanfou reuses the SDK object while the cached token is unchanged."""
+        mgr, loop = db_manager
+        token = {"oauth_token": "tok", "oauth_token_secret": "sec"}
+        loop.run_until_complete(mgr.save_user_token("feishu", "user1", "fanfou", json.dumps(token)))
+
+        client = FanfouClient()
+        first = loop.run_until_complete(client._get_fanfou())
+        assert loop.run_until_complete(client._get_fanfou()) is first
+
+        token["oauth_token"] = "new-tok"
+        loop.run_until_complete(mgr.save_user_token("feishu", "user1", "fanfou", json.dumps(token)))
+        second = loop.run_until_complete(client._get_fanfou())
+        assert second is not first
+        assert second is not None
+        assert second.oauth_token == "new-tok"
+
     def test_post_photo_with_mock_sdk(self, db_manager):
         """post_photo calls SDK correctly."""
         mgr, loop = db_manager
@@ -115,6 +170,38 @@ class TestFanfouClient:
             assert result is not None
             assert result["id"] == "67890"
 
+    def test_post_photo_streams_media_handle(self, db_manager, tmp_path):
+        """post_photo passes an open file to the SDK instead of bytes."""
+        mgr, loop = db_manager
+        loop.run_until_complete(
+            mgr.save_user_token(
+                source_platform="feishu",
+                source_user_id="user1",
+                sink_platform="fanfou",
+                token_data=json.dumps({"oauth_token": "tok", "oauth_token_secret": "sec"}),
+            )
+        )
+        handle = MediaHandle.from_bytes(b"jpeg-bytes", tmp_path / "photo.jpg")
+        uploaded = {}
+
+        async def fake_post_photo(uri, files, params):
+            name, f, content_type = files["photo"]
+            uploaded.update(name=name, body=f.read(), params=params)
+            return {"id": "67890"}, MagicMock()
+
+        client = FanfouClient()
+
+        with patch("app.services.platforms.fanfou.client.Fanfou") as MockFanfou:
+            MockFanfou.return_value.post_photo = AsyncMock(side_effect=fake_post_photo)
+            result = loop.run_until_complete(client.post_photo(handle, "caption"))
+
+        assert result == {"id": "67890"}
+        assert uploaded == {
+            "name": "photo.jpg",
+            "body": b"jpeg-bytes",
+            "params": {"status": "caption"},
+        }
+
 
 class TestFanfouHandleMessage:
     def test_handle_command_login_list(self):
@@ -181,8 +268,8 @@ class TestFanfouHandleMessage:
             bus.clear_handlers()
             loop.close()
 
-    def test_handle_text_too_long(self):
-        """Text longer than Fanfou limit is rejected by sink."""
+    def test_handle_text_too_long_rejected_when_threading_disabled(self):
+        """Text longer than Fanfou limit is rejected when threading is disabled."""
         loop = asyncio.new_event_loop()
         try:
             ReplyService.create_instance()
@@ -198,7 +285,10 @@ class TestFanfouHandleMessage:
 
             client = FanfouClient()
 
-            with patch.object(client, "post_text", AsyncMock()) as mock_post_text:
+            with (
+                patch.object(client, "post_text", AsyncMock()) as mock_post_text,
+                patch.object(settings, "long_text_threading_enabled", False),
+            ):
                 msg = UnifiedMessage(
                     source=MessageSource.FEISHU,
                     content="x" * 141,
@@ -214,6 +304,48 @@ class TestFanfouHandleMessage:
             bus.clear_handlers()
             loop.close()
 
+    def test_handle_long_text_posts_reply_chain(self):
+        """Text longer than Fanfou limit is posted as a reply chain."""
+        loop = asyncio.new_event_loop()
+        try:
+            ReplyService.create_instance()
+            replies = []
+            reply_service = ReplyService.get_instance()
+            assert reply_service is not None
+            reply_service.register(
+                MessageSource.FEISHU,
+                reply_handler=lambda m, t: replies.append(t),
+            )
+
+            client = FanfouClient()
+            statuses = iter(["s1", "s2", "s3"])
+
+            async def post_text(text, in_reply_to_status_id=None):
+                return {"id": next(statuses), "text": text}
+
+            sentence = "这是一段用来测试长文拆分的句子。"
+            with patch.object(client, "post_text", AsyncMock(side_effect=post_text)) as mock:
+                msg = UnifiedMessage(
+                    source=MessageSource.FEISHU,
+                    content=sentence * 16,
+                    message_type="text",
+                    sender_id="user1",
+                    raw_data={"message_id": "mid1"},
+                )
+                loop.run_until_complete(client.handle_message(msg))
+
+            calls = [call.args for call in mock.await_args_list]
+            assert [parent for _, parent in calls] == [None, "s1"]
+            assert all(len(text) <= 140 for text, _ in calls)
+            assert all(text.startswith(sentence) for text, _ in calls)
+            assert replies == [
+                "[饭否] 消息发送成功\n\nhttps://fanfou.com/statuses/s1"
+                "\n[饭否] 长文已拆分为 2 条回复串发布"
+            ]
+        finally:
+            bus.clear_handlers()
+            loop.close()
+
     def test_handle_image_no_data(self):
         """Image message without image_data fails."""
         loop = asyncio.new_event_loop()
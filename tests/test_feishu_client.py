@@ -1,6 +1,23 @@
 """Tests for Feishu client components"""
 
-from app.services.platforms.feishu.client import OrderedDictDeduplicator
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from app.schemas.event import MessageSource, UnifiedMessage
+from app.schemas.media import MediaHandle
+from app.services.platforms.feishu.client import FeishuManager, OrderedDictDeduplicator
+from app.services.platforms.feishu.ingest import IngestPipeline
+
+
+def _message(content: str, chat_id: str) -> UnifiedMessage:
+    return UnifiedMessage(
+        source=MessageSource.FEISHU,
+        content=content,
+        sender_id="user1",
+        chat_id=chat_id,
+    )
 
 
 class TestOrderedDictDeduplicator:
@@ -28,3 +45,102 @@ class TestOrderedDictDeduplicator:
     def test_exists_unknown(self):
         dedup = OrderedDictDeduplicator()
         assert dedup.exists("nonexistent") is False
+
+
+class TestIngestPipeline:
+    def test_preserves_order_within_chat_and_runs_chats_concurrently(self):
+        loop = asyncio.new_event_loop()
+        try:
+            published = []
+            slow_started = threading.Event()
+
+            async def publish(message: UnifiedMessage) -> None:
+                published.append((message.chat_id, message.content))
+
+            def job(content: str, chat_id: str, delay: float = 0.0):
+                def run():
+                    if delay:
+                        slow_started.set()
+                        time.sleep(delay)
+                    return _message(content, chat_id)
+
+                return run
+
+            pipeline = IngestPipeline(loop, publish, max_workers=4, max_pending=10)
+
+            async def scenario():
+                assert pipeline.submit("chat-a", job("a1", "chat-a", delay=0.2))
+                assert pipeline.submit("chat-a", job("a2", "chat-a"))
+                assert pipeline.submit("chat-b", job("b1", "chat-b"))
+                await pipeline.stop(timeout=2)
+
+            loop.run_until_complete(scenario())
+
+            assert slow_started.is_set()
+            # chat-b 不等待 chat-a 的慢任务；chat-a 内部保持顺序
+            assert published.index(("chat-b", "b1")) < published.index(("chat-a", "a1"))
+            assert [c for chat, c in published if chat == "chat-a"] == ["a1", "a2"]
+            assert pipeline.pending == 0
+        finally:
+            loop.close()
+
+    def test_submit_rejects_when_full_and_survives_failing_job(self):
+        loop = asyncio.new_event_loop()
+        try:
+            published = []
+
+            async def publish(message: UnifiedMessage) -> None:
+                published.append(message.content)
+
+            def broken():
+                raise RuntimeError("download failed")
+
+            pipeline = IngestPipeline(loop, publish, max_workers=1, max_pending=2)
+
+            async def scenario():
+                assert pipeline.submit("chat", broken)
+                assert pipeline.submit("chat", lambda: _message("ok", "chat"))
+                assert not pipeline.submit("chat", lambda: _message("dropped", "chat"))
+                await pipeline.stop(timeout=2)
+                assert not pipeline.submit("chat", lambda: _message("late", "chat"))
+
+            loop.run_until_complete(scenario())
+            assert published == ["ok"]
+        finally:
+            loop.close()
+
+
+class TestFeishuImageDownload:
+    def test_downloads_all_images_concurrently_in_order(self, tmp_path):
+        loop = asyncio.new_event_loop()
+        try:
+            manager = FeishuManager(loop)
+            threads = set()
+
+            def get_image(message_id: str, image_key: str) -> bytes:
+                threads.add(threading.current_thread().name)
+                time.sleep(0.05 if image_key == "k0" else 0.01)
+                return image_key.encode()
+
+            def save(name: str, image_data: bytes) -> MediaHandle:
+                return MediaHandle.from_bytes(image_data, tmp_path / f"{name}.jpg")
+
+            with (
+                patch.object(manager, "get_feishu_image_data", side_effect=get_image),
+                patch.object(manager, "_save_image", side_effect=save),
+            ):
+                started = time.monotonic()
+                media = manager._download_images("om_1", ["k0", "k1", "k2"])
+                elapsed = time.monotonic() - started
+
+                assert media is not None
+                assert [m.filename for m in media] == ["om_1_0.jpg", "om_1_1.jpg", "om_1_2.jpg"]
+                assert len(threads) > 1
+                assert elapsed < 0.07
+
+                with patch.object(manager, "get_feishu_image_data", return_value=None):
+                    assert manager._download_images("om_2", ["k0", "k1"]) is None
+
+            loop.run_until_complete(manager.stop())
+        finally:
+            loop.close()
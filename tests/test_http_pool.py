@@ -0,0 +1,71 @@
+"""Tests for the shared HTTP client pool"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http import HttpClientPool, get_http_client, http_client
+
+
+@pytest.fixture(autouse=True)
+def reset_pool():
+    HttpClientPool.reset_instance()
+    yield
+    HttpClientPool.reset_instance()
+
+
+class TestHttpClientPool:
+    def test_get_http_client_without_pool(self):
+        assert get_http_client("threads") is None
+
+    def test_pool_reuses_client_per_platform(self):
+        loop = asyncio.new_event_loop()
+        try:
+            pool = HttpClientPool.create_instance()
+            threads_client = pool.get("threads")
+            assert pool.get("threads") is threads_client
+            assert pool.get("bluesky") is not threads_client
+            assert get_http_client("threads") is threads_client
+
+            loop.run_until_complete(pool.close())
+            assert threads_client.is_closed
+            assert pool.get("threads") is not threads_client
+            loop.run_until_complete(pool.close())
+        finally:
+            loop.close()
+
+    def test_http_client_borrows_from_pool(self):
+        loop = asyncio.new_event_loop()
+        try:
+            pool = HttpClientPool.create_instance()
+
+            async def borrow() -> httpx.AsyncClient:
+                async with http_client("mastodon") as client:
+                    return client
+
+            borrowed = loop.run_until_complete(borrow())
+            assert borrowed is pool.get("mastodon")
+            # 借用结束后连接保持打开，供后续请求复用
+            assert not borrowed.is_closed
+            loop.run_until_complete(pool.close())
+        finally:
+            loop.close()
+
+    def test_http_client_falls_back_to_one_off_client(self):
+        loop = asyncio.new_event_loop()
+        try:
+
+            async def borrow() -> httpx.AsyncClient:
+                async with http_client("mastodon") as client:
+                    return client
+
+            borrowed = loop.run_until_complete(borrow())
+            assert borrowed.is_closed
+        finally:
+            loop.close()
+
+    def test_duplicate_instance_rejected(self):
+        HttpClientPool.create_instance()
+        with pytest.raises(RuntimeError):
+            HttpClientPool.create_instance()
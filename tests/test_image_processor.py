@@ -0,0 +1,186 @@
+"""Tests for the image processing executor"""
+
+import asyncio
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.services.media import processor as processor_module
+from app.services.media.cache import ImageVariantCache, VariantKey
+from app.services.media.processor import (
+    ImageProcessor,
+    compress_image,
+    compress_image_blocking,
+    resize_image,
+    transcode_image,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(processor_module.settings, "image_cache_dir", str(tmp_path / "variants"))
+    monkeypatch.setattr(processor_module, "_thread_fallback", None)
+    ImageProcessor.reset_instance()
+    yield
+    ImageProcessor.reset_instance()
+
+
+def _png_bytes(width: int = 800, height: int = 600) -> bytes:
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestImageProcessor:
+    def test_thread_fallback_without_instance(self):
+        data = _png_bytes()
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(compress_image(data, target_size_mb=0.05))
+        finally:
+            loop.close()
+        assert len(result) <= 0.05 * 1024 * 1024
+
+    def test_blocking_compress_without_instance(self):
+        data = _png_bytes()
+        result = compress_image_blocking(data, target_size_mb=0.05)
+        assert len(result) <= 0.05 * 1024 * 1024
+
+    def test_process_pool_runs_image_operations(self):
+        data = _png_bytes()
+        loop = asyncio.new_event_loop()
+        processor = ImageProcessor.create_instance()
+        processor.max_workers = 1
+        try:
+            loop.run_until_complete(processor.start())
+            compressed = loop.run_until_complete(compress_image(data, target_size_mb=0.05))
+            resized = loop.run_until_complete(resize_image(data, max_dimension=200))
+            transcoded = loop.run_until_complete(transcode_image(data, "JPEG"))
+            blocking = compress_image_blocking(data, target_size_mb=0.05)
+        finally:
+            loop.run_until_complete(processor.stop())
+            loop.close()
+
+        assert len(compressed) <= 0.05 * 1024 * 1024
+        assert len(blocking) <= 0.05 * 1024 * 1024
+        assert max(Image.open(io.BytesIO(resized)).size) == 200
+        assert Image.open(io.BytesIO(transcoded)).format == "JPEG"
+
+    def test_concurrent_requests_compute_variant_once(self, monkeypatch):
+        data = _png_bytes()
+        calls = []
+        original = processor_module.image_utils.compress_image_advanced
+
+        def counting(*args):
+            calls.append(args)
+            return original(*args)
+
+        monkeypatch.setattr(processor_module.image_utils, "compress_image_advanced", counting)
+        processor = ImageProcessor(max_workers=0)
+
+        async def scenario():
+            first, second = await asyncio.gather(
+                processor.compress(data, target_size_mb=0.05),
+                processor.compress(data, target_size_mb=0.05),
+            )
+            third = await processor.compress(data, target_size_mb=0.05)
+            return first, second, third
+
+        loop = asyncio.new_event_loop()
+        try:
+            first, second, third = loop.run_until_complete(scenario())
+        finally:
+            loop.close()
+
+        assert len(calls) == 1
+        assert first == second == third
+        # 不同约束是不同变体
+        compress_image_blocking(data, target_size_mb=0.05)
+        processor.compress_blocking(data, target_size_mb=0.04)
+        assert len(calls) == 2
+
+    def test_cancelled_caller_does_not_cancel_coalesced_waiters(self, monkeypatch):
+        data = _png_bytes()
+        calls = []
+        original = processor_module.image_utils.compress_image_advanced
+
+        def counting(*args):
+            calls.append(args)
+            return original(*args)
+
+        monkeypatch.setattr(processor_module.image_utils, "compress_image_advanced", counting)
+        processor = ImageProcessor(max_workers=0)
+
+        async def scenario():
+            leader = asyncio.ensure_future(processor.compress(data, target_size_mb=0.05))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(processor.compress(data, target_size_mb=0.05))
+            await asyncio.sleep(0)
+            leader.cancel()
+            result = await waiter
+            return leader, result
+
+        loop = asyncio.new_event_loop()
+        try:
+            leader, result = loop.run_until_complete(scenario())
+        finally:
+            loop.close()
+
+        assert leader.cancelled()
+        assert len(result) <= 0.05 * 1024 * 1024
+        assert len(calls) == 1
+        assert processor._inflight == {}
+
+    def test_small_image_skips_processing(self, monkeypatch):
+        def fail(*args):
+            raise AssertionError("should not compress")
+
+        monkeypatch.setattr(processor_module.image_utils, "compress_image_advanced", fail)
+        data = b"small"
+        assert compress_image_blocking(data, target_size_mb=1) is data
+
+
+class TestImageVariantCache:
+    def test_memory_lru_evicts_by_bytes(self):
+        cache = ImageVariantCache(memory_max_bytes=10)
+        first = VariantKey("a" * 64, "compress-1mb")
+        second = VariantKey("b" * 64, "compress-1mb")
+        cache.put(first, b"123456")
+        cache.put(second, b"abcdef")
+
+        assert cache.get(first) is None
+        assert cache.get(second) == b"abcdef"
+        assert cache.stats()["memory_bytes"] == 6
+
+    def test_disk_tier_survives_memory_clear(self, tmp_path):
+        cache = ImageVariantCache(memory_max_bytes=1024, directory=str(tmp_path))
+        key = VariantKey("c" * 64, "resize-100-q90")
+        cache.put(key, b"variant")
+        assert (tmp_path / "cc" / key.filename).read_bytes() == b"variant"
+
+        cache.clear_memory()
+        assert cache.get_memory(key) is None
+        assert cache.get(key) == b"variant"
+        assert cache.get_memory(key) == b"variant"
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_disk_tier_evicts_least_recently_used_files(self, tmp_path):
+        cache = ImageVariantCache(memory_max_bytes=0, directory=str(tmp_path), disk_max_bytes=25)
+        keys = [VariantKey(c * 64, "compress-1mb") for c in "abc"]
+        for index, key in enumerate(keys[:2]):
+            cache.put(key, b"x" * 10)
+            # 固定修改时间，避免依赖文件系统时间精度
+            os.utime(tmp_path / key.digest[:2] / key.filename, (1000 + index, 1000 + index))
+
+        # 读取刷新 a 的修改时间，b 成为最久未用的文件
+        assert cache.get(keys[0]) == b"x" * 10
+        cache.put(keys[2], b"y" * 10)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == b"x" * 10
+        assert cache.get(keys[2]) == b"y" * 10
+        assert cache.stats()["disk_bytes"] == 20
+        assert cache.stats()["disk_evictions"] == 1
@@ -8,8 +8,11 @@ from unittest.mock import AsyncMock, patch
 import pytest
 
 from app.core.bus import bus
+from app.core.config import settings
 from app.core.reply import ReplyService
 from app.schemas.event import MessageSource, UnifiedMessage
+from app.schemas.media import MediaHandle
+from app.services.media.uploads import upload_slots
 from app.services.platforms.mastodon.client import MastodonClient
 
 
@@ -42,10 +45,12 @@ def reset_singletons():
     bus.clear_handlers()
     ReplyService.reset_instance()
     MastodonClient.reset_instance()
+    upload_slots.reset()
     yield
     bus.clear_handlers()
     ReplyService.reset_instance()
     MastodonClient.reset_instance()
+    upload_slots.reset()
 
 
 class MockResponse:
@@ -96,6 +101,123 @@ class TestMastodonClient:
         finally:
             loop.close()
 
+    def test_upload_media_streams_file_handle(self, tmp_path):
+        loop = asyncio.new_event_loop()
+        try:
+            client = MastodonClient()
+            client.access_token = "token"
+            handle = MediaHandle.from_bytes(b"jpeg-bytes", tmp_path / "photo.jpg")
+            uploaded = {}
+
+            async def fake_post(url, **kwargs):
+                name, f, content_type = kwargs["files"]["file"]
+                uploaded.update(name=name, body=f.read(), content_type=content_type)
+                return MockResponse(200, {"id": "media-1"})
+
+            with patch("httpx.AsyncClient.post", side_effect=fake_post):
+                result = loop.run_until_complete(client._upload_media(handle))
+
+            assert result == {"id": "media-1"}
+            assert uploaded == {
+                "name": "photo.jpg",
+                "body": b"jpeg-bytes",
+                "content_type": "image/jpeg",
+            }
+        finally:
+            loop.close()
+
+    def test_post_images_uploads_concurrently_and_attaches_all(self, tmp_path):
+        loop = asyncio.new_event_loop()
+        try:
+            client = MastodonClient()
+            client.access_token = "token"
+            handles = [MediaHandle.from_bytes(b"img", tmp_path / f"{i}.jpg") for i in range(5)]
+            in_flight = 0
+            peak = 0
+            statuses = []
+
+            async def fake_post(url, **kwargs):
+                nonlocal in_flight, peak
+                if url.endswith("/api/v2/media"):
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                    await asyncio.sleep(0.01)
+                    in_flight -= 1
+                    name = kwargs["files"]["file"][0]
+                    return MockResponse(200, {"id": f"media-{name}", "url": "https://m/1"})
+                statuses.append(kwargs["data"])
+                return MockResponse(200, {"id": "123"})
+
+            with (
+                patch("httpx.AsyncClient.post", side_effect=fake_post),
+                patch.object(settings, "media_upload_concurrency", {"mastodon": 2}),
+            ):
+                result = loop.run_until_complete(client.post_images(handles, "album"))
+
+            assert result == {"id": "123"}
+            assert peak == 2
+            assert upload_slots.snapshot()["mastodon"]["uploads"] == 4
+            (data,) = statuses
+            assert data["media_ids[]"] == [f"media-{i}.jpg" for i in range(4)]
+            assert data["status"] == "album"
+        finally:
+            loop.close()
+
+    def test_post_images_waits_for_async_media_processing(self, tmp_path):
+        loop = asyncio.new_event_loop()
+        try:
+            client = MastodonClient()
+            client.access_token = "token"
+            handles = [MediaHandle.from_bytes(b"img", tmp_path / f"{i}.jpg") for i in range(2)]
+            polls = []
+            statuses = []
+
+            async def fake_post(url, **kwargs):
+                if url.endswith("/api/v2/media"):
+                    name = kwargs["files"]["file"][0]
+                    if name == "0.jpg":
+                        # 异步处理：202 + url 为空
+                        return MockResponse(202, {"id": "slow", "url": None})
+                    return MockResponse(200, {"id": "fast", "url": "https://m/fast"})
+                statuses.append(kwargs["data"])
+                return MockResponse(200, {"id": "123"})
+
+            async def fake_get(url, **kwargs):
+                polls.append(url)
+                if len(polls) < 3:
+                    return MockResponse(206, {"id": "slow", "url": None})
+                return MockResponse(200, {"id": "slow", "url": "https://m/slow"})
+
+            with (
+                patch("httpx.AsyncClient.post", side_effect=fake_post),
+                patch("httpx.AsyncClient.get", side_effect=fake_get),
+                patch.object(settings, "mastodon_media_poll_interval", 0.001),
+            ):
+                result = loop.run_until_complete(client.post_images(handles, "album"))
+
+            assert result == {"id": "123"}
+            assert polls == ["https://mastodon.social/api/v1/media/slow"] * 3
+            assert statuses[0]["media_ids[]"] == ["slow", "fast"]
+            # 轮询期间不占用上传槽位
+            assert upload_slots.snapshot()["mastodon"]["active"] == 0
+        finally:
+            loop.close()
+
+    def test_wait_for_media_gives_up_after_timeout(self):
+        loop = asyncio.new_event_loop()
+        try:
+            client = MastodonClient()
+            client.access_token = "token"
+
+            with (
+                patch("httpx.AsyncClient.get", AsyncMock(return_value=MockResponse(206, {}))),
+                patch.object(settings, "mastodon_media_poll_interval", 0.01),
+                patch.object(settings, "mastodon_media_poll_timeout", 0.03),
+            ):
+                assert loop.run_until_complete(client._wait_for_media("slow")) is None
+        finally:
+            loop.close()
+
     def test_handle_text_success(self, db_manager):
         mgr, loop = db_manager
         ReplyService.create_instance()
@@ -161,7 +283,7 @@ class TestMastodonClient:
         finally:
             loop.close()
 
-    def test_handle_text_too_long_uses_instance_limit(self, db_manager):
+    def test_handle_text_too_long_uses_instance_limit_when_threading_disabled(self, db_manager):
         _mgr, loop = db_manager
         ReplyService.create_instance()
         replies = []
@@ -175,7 +297,10 @@ class TestMastodonClient:
         client = MastodonClient()
         client._max_characters = 5
 
-        with patch.object(client, "post_text", AsyncMock()) as mock_post_text:
+        with (
+            patch.object(client, "post_text", AsyncMock()) as mock_post_text,
+            patch.object(settings, "long_text_threading_enabled", False),
+        ):
             msg = UnifiedMessage(
                 source=MessageSource.FEISHU,
                 content="toolong",
@@ -186,3 +311,46 @@ class TestMastodonClient:
 
         mock_post_text.assert_not_called()
         assert replies == ["[Mastodon] 消息长度超过当前实例 5 字限制，无法发送"]
+
+    def test_handle_long_text_stops_chain_on_failure(self, db_manager):
+        _mgr, loop = db_manager
+        ReplyService.create_instance()
+        replies = []
+        reply_service = ReplyService.get_instance()
+        assert reply_service is not None
+        reply_service.register(
+            MessageSource.FEISHU,
+            reply_handler=lambda m, t: replies.append(t),
+        )
+
+        client = MastodonClient()
+        client.access_token = "token"
+        client._max_characters = 30
+        statuses = []
+
+        async def fake_post(url, **kwargs):
+            statuses.append(kwargs["data"])
+            if len(statuses) == 3:
+                return MockResponse(422, {"error": "Validation failed"})
+            return MockResponse(
+                200, {"id": str(len(statuses)), "url": f"https://m/{len(statuses)}"}
+            )
+
+        msg = UnifiedMessage(
+            source=MessageSource.FEISHU,
+            content=" ".join(["word"] * 40),
+            message_type="text",
+            sender_id="user1",
+        )
+        with patch("httpx.AsyncClient.post", side_effect=fake_post):
+            loop.run_until_complete(client.handle_message(msg))
+
+        assert len(statuses) == 3
+        assert "in_reply_to_id" not in statuses[0]
+        assert [data["in_reply_to_id"] for data in statuses[1:]] == ["1", "2"]
+        assert all(len(str(data["status"])) <= 30 for data in statuses)
+        total = statuses[0]["status"].rsplit("/", 1)[1].rstrip(")")
+        assert replies == [
+            "[Mastodon] 消息发送成功\n\nhttps://m/1"
+            f"\n[Mastodon] 长文拆分为 {total} 条，仅发布了前 2 条"
+        ]
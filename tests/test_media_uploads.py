@@ -0,0 +1,87 @@
+"""Tests for per-sink media upload slots"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.media.uploads import UploadSlots
+
+
+@pytest.fixture
+def slots():
+    with patch.object(settings, "media_upload_concurrency", {"mastodon": 2}):
+        with patch.object(settings, "media_upload_default_concurrency", 1):
+            yield UploadSlots()
+
+
+def test_gather_bounds_concurrency_and_preserves_order(slots):
+    in_flight = 0
+    peak = 0
+
+    async def upload(item: int) -> int:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # 后面的先完成，结果仍按输入顺序返回
+        await asyncio.sleep(0.01 * (5 - item))
+        in_flight -= 1
+        return item * 10
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(slots.gather("mastodon", range(5), upload))
+    finally:
+        loop.close()
+
+    assert results == [0, 10, 20, 30, 40]
+    assert peak == 2
+    assert slots.snapshot()["mastodon"] == {"limit": 2, "active": 0, "waiting": 0, "uploads": 5}
+
+
+def test_platforms_have_independent_slots(slots):
+    started: list[str] = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def upload(platform: str) -> None:
+            started.append(platform)
+            await gate.wait()
+
+        tasks = [
+            asyncio.create_task(slots.run("bluesky", lambda: upload("bluesky"))),
+            asyncio.create_task(slots.run("bluesky", lambda: upload("bluesky"))),
+            asyncio.create_task(slots.run("mastodon", lambda: upload("mastodon"))),
+        ]
+        await asyncio.sleep(0.01)
+        # bluesky 使用默认并发 1：第二个上传等待，mastodon 不受影响
+        assert sorted(started) == ["bluesky", "mastodon"]
+        assert slots.snapshot()["bluesky"]["waiting"] == 1
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert started.count("bluesky") == 2
+
+
+def test_failed_upload_releases_slot(slots):
+    async def fail() -> None:
+        raise RuntimeError("upload failed")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await slots.run("bluesky", fail)
+        assert await slots.run("bluesky", lambda: asyncio.sleep(0, "ok")) == "ok"
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
@@ -0,0 +1,88 @@
+"""Tests for event bus metrics and the /metrics endpoint"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.bus import bus
+from app.core.metrics import Histogram, bus_metrics
+from app.routes.metrics import router
+from app.schemas.event import MessageSource, UnifiedMessage
+
+
+@pytest.fixture(autouse=True)
+def reset_bus():
+    bus.clear_handlers()
+    bus_metrics.reset()
+    yield
+    bus.clear_handlers()
+    bus_metrics.reset()
+
+
+def _message() -> UnifiedMessage:
+    return UnifiedMessage(source=MessageSource.FEISHU, content="hello", sender_id="user1")
+
+
+class TestHistogram:
+    def test_cumulative_buckets_and_quantiles(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        # le 为闭区间上界
+        assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.65)
+        assert histogram.quantile(0.5) == 0.5
+        assert histogram.quantile(0.99) == 2.0
+
+
+class TestBusMetrics:
+    def test_bus_records_handler_outcomes(self):
+        loop = asyncio.new_event_loop()
+        try:
+
+            async def healthy(message: UnifiedMessage) -> None:
+                assert bus_metrics.snapshot()[healthy.__qualname__]["in_flight"] == 1
+
+            async def broken(message: UnifiedMessage) -> None:
+                raise RuntimeError("boom")
+
+            bus.register(healthy)
+            bus.register(broken)
+            loop.run_until_complete(bus.publish(_message()))
+            loop.run_until_complete(bus.publish(_message()))
+        finally:
+            loop.close()
+
+        snapshot = bus_metrics.snapshot()
+        assert snapshot[healthy.__qualname__]["succeeded"] == 2
+        assert snapshot[healthy.__qualname__]["in_flight"] == 0
+        assert snapshot[broken.__qualname__]["failed"] == 2
+        assert bus_metrics.published == 2
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        bus_metrics.handler_started('Sink "a".handle')
+        bus_metrics.handler_finished('Sink "a".handle', 0.2, success=True)
+
+        app = FastAPI()
+        app.include_router(router)
+        response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert "# TYPE gateway_handler_duration_seconds histogram" in body
+        assert (
+            'gateway_handler_duration_seconds_bucket{handler="Sink \\"a\\".handle",le="0.25"} 1'
+            in body
+        )
+        assert 'gateway_handler_duration_seconds_count{handler="Sink \\"a\\".handle"} 1' in body
+        assert (
+            'gateway_handler_messages_total{handler="Sink \\"a\\".handle",outcome="success"} 1'
+            in body
+        )
+        assert 'gateway_handler_in_flight{handler="Sink \\"a\\".handle"} 0' in body
+        assert "gateway_queue_depth" in body
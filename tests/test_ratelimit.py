@@ -0,0 +1,166 @@
+"""Tests for the per-platform token-bucket rate limiter"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+from app.core import ratelimit
+from app.core.http import HttpClientPool
+from app.core.ratelimit import RateLimitedTransport, RateLimitExceeded, TokenBucket, rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def reset_pool():
+    HttpClientPool.reset_instance()
+    yield
+    HttpClientPool.reset_instance()
+
+
+class TestTokenBucket:
+    def test_burst_then_paced(self):
+        bucket = TokenBucket("test", rate_per_minute=60, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        # 第三个请求需要等待约 1 秒，第四个约 2 秒（预约错开）
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+        assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+    def test_max_wait_does_not_consume_token(self):
+        bucket = TokenBucket("test", rate_per_minute=60, burst=1)
+        bucket.reserve()
+        with pytest.raises(RateLimitExceeded):
+            bucket.reserve(max_wait=0.5)
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+    def test_cancelled_wait_refunds_token(self):
+        bucket = TokenBucket("test", rate_per_minute=60, burst=1)
+        bucket.reserve()
+
+        async def abandoned():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(bucket.acquire(), timeout=0.01)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(abandoned())
+        finally:
+            loop.close()
+        # 放弃的请求没有占用令牌，下一个请求仍只需等待约 1 秒
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+    def test_rate_limit_exceeded_is_transport_error_and_not_retried(self):
+        from app.core.resilience import resilience
+
+        calls = 0
+
+        async def operation():
+            nonlocal calls
+            calls += 1
+            raise RateLimitExceeded("test", 60)
+
+        loop = asyncio.new_event_loop()
+        try:
+            with pytest.raises(httpx.TransportError):
+                loop.run_until_complete(resilience.call("api.example.com", operation))
+        finally:
+            loop.close()
+        assert calls == 1
+        assert resilience.breaker("api.example.com").failures == 0
+
+    def test_retry_after_seconds_pauses_bucket(self):
+        bucket = TokenBucket("test", rate_per_minute=600, burst=5)
+        bucket.observe(429, {"retry-after": "30"})
+        assert bucket.reserve() == pytest.approx(30, abs=0.5)
+
+    def test_retry_after_http_date(self):
+        bucket = TokenBucket("test", rate_per_minute=600, burst=5)
+        bucket.observe(503, {"retry-after": formatdate(time.time() + 20, usegmt=True)})
+        assert bucket.reserve() == pytest.approx(20, abs=1.5)
+
+    def test_exhausted_quota_pauses_until_reset(self):
+        bucket = TokenBucket("test", rate_per_minute=600, burst=5)
+        reset = str(int(time.time()) + 40)
+        bucket.observe(200, {"ratelimit-remaining": "0", "ratelimit-reset": reset})
+        assert bucket.reserve() == pytest.approx(40, abs=1.5)
+
+    def test_remaining_quota_slows_rate(self):
+        bucket = TokenBucket("test", rate_per_minute=600, burst=5)
+        # Mastodon 风格：ISO 8601 重置时间
+        reset = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 100))
+        bucket.observe(200, {"x-ratelimit-remaining": "10", "x-ratelimit-reset": reset})
+        assert bucket.tokens <= 5
+        assert bucket.rate == pytest.approx(10 * ratelimit.HEADER_RATE_SAFETY / 100, rel=0.05)
+
+        # 配额充足时恢复到配置速率
+        bucket.observe(200, {"x-ratelimit-remaining": "1000", "x-ratelimit-reset": "60"})
+        assert bucket.rate == bucket.configured_rate
+
+
+class TestRateLimiter:
+    def test_buckets_use_platform_quota(self, monkeypatch):
+        monkeypatch.setattr(ratelimit.settings, "rate_limit_per_minute", {"telegram": 20})
+        monkeypatch.setattr(ratelimit.settings, "rate_limit_default_per_minute", 90)
+        assert rate_limiter.bucket("telegram").configured_rate == pytest.approx(20 / 60)
+        assert rate_limiter.bucket("other").configured_rate == pytest.approx(90 / 60)
+        assert set(rate_limiter.snapshot()) == {"telegram", "other"}
+
+    def test_disabled_limiter_is_noop(self, monkeypatch):
+        monkeypatch.setattr(ratelimit.settings, "rate_limit_enabled", False)
+        loop = asyncio.new_event_loop()
+        try:
+            rate_limiter.pause("threads", 60)
+            loop.run_until_complete(asyncio.wait_for(rate_limiter.acquire("threads"), 1))
+        finally:
+            loop.close()
+        assert rate_limiter.snapshot() == {}
+
+    def test_transport_feeds_headers_back(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(429, headers={"Retry-After": "45"})
+
+        loop = asyncio.new_event_loop()
+        try:
+            transport = RateLimitedTransport("mastodon", httpx.MockTransport(handler))
+
+            async def send() -> int:
+                async with httpx.AsyncClient(transport=transport) as client:
+                    response = await client.get("https://example.com/api")
+                    return response.status_code
+
+            assert loop.run_until_complete(send()) == 429
+        finally:
+            loop.close()
+        assert rate_limiter.snapshot()["mastodon"]["blocked_for"] == pytest.approx(45, abs=1)
+
+    def test_read_requests_do_not_consume_tokens(self, monkeypatch):
+        monkeypatch.setattr(ratelimit.settings, "rate_limit_burst", 2)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200)
+
+        loop = asyncio.new_event_loop()
+        try:
+            transport = RateLimitedTransport("bluesky", httpx.MockTransport(handler))
+
+            async def send() -> None:
+                async with httpx.AsyncClient(transport=transport) as client:
+                    for _ in range(5):
+                        await client.get("https://example.com/xrpc/resolveHandle")
+                    await client.post("https://example.com/xrpc/uploadBlob")
+
+            loop.run_until_complete(asyncio.wait_for(send(), 1))
+        finally:
+            loop.close()
+        # 只有 POST 占用了令牌
+        assert rate_limiter.snapshot()["bluesky"]["tokens"] == pytest.approx(1, abs=0.1)
+
+    def test_pool_clients_are_rate_limited(self):
+        pool = HttpClientPool.create_instance()
+        transport = pool.get("bluesky")._transport
+        # 追踪层在最外层，限流层在其内
+        limited = getattr(transport, "_transport", transport)
+        assert isinstance(limited, RateLimitedTransport)
+        assert limited.platform == "bluesky"
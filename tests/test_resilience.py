@@ -0,0 +1,170 @@
+"""Tests for the sink retry / circuit-breaker layer"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.core import resilience as resilience_module
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    backoff_delay,
+    is_transient_response,
+    is_unsent_error,
+    resilience,
+)
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        with patch("asyncio.sleep", AsyncMock()):
+            return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestPrimitives:
+    def test_backoff_is_jittered_and_capped(self):
+        for retry in range(10):
+            delay = backoff_delay(retry, base=0.5, cap=4.0)
+            assert 0 <= delay <= min(4.0, 0.5 * 2**retry)
+
+    def test_retry_budget_limits_retries(self):
+        budget = RetryBudget(ratio=0.5, per_minute=2)
+        assert budget.withdraw()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+
+    def test_breaker_opens_and_recovers_through_single_probe(self):
+        breaker = CircuitBreaker("api.example.com", failure_threshold=2, recovery_timeout=60)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+        breaker.recovery_timeout = 0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        # 探测请求未返回前不再放行
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.failures == 0
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("api.example.com", failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.recovery_timeout = 60
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+class TestResilienceCall:
+    def test_retries_transient_response_then_succeeds(self):
+        operation = AsyncMock(side_effect=[httpx.Response(503), httpx.Response(200)])
+        response = _run(
+            resilience.call("api.example.com", operation, is_transient=is_transient_response)
+        )
+        assert response.status_code == 200
+        assert operation.await_count == 2
+        assert resilience.breaker("api.example.com").failures == 0
+
+    def test_returns_last_transient_response_when_exhausted(self, monkeypatch):
+        monkeypatch.setattr(resilience_module.settings, "retry_max_attempts", 2)
+        operation = AsyncMock(return_value=httpx.Response(502))
+        response = _run(
+            resilience.call("api.example.com", operation, is_transient=is_transient_response)
+        )
+        assert response.status_code == 502
+        assert operation.await_count == 2
+
+    def test_reraises_transport_error_when_exhausted(self):
+        operation = AsyncMock(side_effect=httpx.ConnectError("down"))
+        with pytest.raises(httpx.ConnectError):
+            _run(resilience.call("api.example.com", operation))
+        assert operation.await_count == 3
+
+    def test_non_retryable_error_propagates_immediately(self):
+        operation = AsyncMock(side_effect=ValueError("bad payload"))
+        with pytest.raises(ValueError):
+            _run(resilience.call("api.example.com", operation))
+        assert operation.await_count == 1
+
+    def test_budget_exhaustion_stops_retrying(self, monkeypatch):
+        monkeypatch.setattr(resilience_module.settings, "retry_budget_per_minute", 1)
+        monkeypatch.setattr(resilience_module.settings, "retry_budget_ratio", 0)
+        operation = AsyncMock(return_value=httpx.Response(503))
+        _run(resilience.call("api.example.com", operation, is_transient=is_transient_response))
+        # 首次 + 预算内的 1 次重试
+        assert operation.await_count == 2
+
+    def test_open_circuit_fails_fast(self, monkeypatch):
+        monkeypatch.setattr(resilience_module.settings, "circuit_breaker_failure_threshold", 3)
+        operation = AsyncMock(side_effect=httpx.ReadTimeout("timeout"))
+        with pytest.raises((httpx.ReadTimeout, CircuitOpenError)):
+            _run(resilience.call("api.example.com", operation))
+
+        operation.reset_mock()
+        with pytest.raises(CircuitOpenError):
+            _run(resilience.call("api.example.com", operation))
+        operation.assert_not_awaited()
+        assert resilience.snapshot()["api.example.com"]["state"] == CircuitBreaker.OPEN
+
+    def test_hosts_are_isolated(self, monkeypatch):
+        monkeypatch.setattr(resilience_module.settings, "circuit_breaker_failure_threshold", 1)
+        monkeypatch.setattr(resilience_module.settings, "retry_max_attempts", 1)
+        failing = AsyncMock(side_effect=httpx.ConnectError("down"))
+        with pytest.raises(httpx.ConnectError):
+            _run(resilience.call("down.example.com", failing))
+
+        healthy = AsyncMock(return_value=httpx.Response(200))
+        assert _run(resilience.call("up.example.com", healthy)).status_code == 200
+
+    def test_half_open_probe_with_unexpected_error_releases_probe(self, monkeypatch):
+        monkeypatch.setattr(resilience_module.settings, "circuit_breaker_failure_threshold", 1)
+        monkeypatch.setattr(resilience_module.settings, "circuit_breaker_recovery_timeout", 0)
+        monkeypatch.setattr(resilience_module.settings, "retry_max_attempts", 1)
+        with pytest.raises(httpx.ConnectError):
+            _run(resilience.call("api.example.com", AsyncMock(side_effect=httpx.ConnectError("x"))))
+        assert resilience.breaker("api.example.com").state == CircuitBreaker.HALF_OPEN
+
+        # 探测请求抛出非瞬时异常：不记成败，但要归还探测名额
+        with pytest.raises(ValueError):
+            _run(resilience.call("api.example.com", AsyncMock(side_effect=ValueError("bad json"))))
+
+        healthy = AsyncMock(return_value=httpx.Response(200))
+        assert _run(resilience.call("api.example.com", healthy)).status_code == 200
+        assert resilience.breaker("api.example.com").state == CircuitBreaker.CLOSED
+
+    def test_retry_if_only_retries_unsent_requests(self):
+        sent = AsyncMock(side_effect=httpx.ReadTimeout("timeout"))
+        with pytest.raises(httpx.ReadTimeout):
+            _run(resilience.call("api.example.com", sent, retry_if=is_unsent_error))
+        assert sent.await_count == 1
+        assert resilience.breaker("api.example.com").failures == 1
+
+        transient = AsyncMock(return_value=httpx.Response(503))
+        response = _run(
+            resilience.call(
+                "api.example.com",
+                transient,
+                is_transient=is_transient_response,
+                retry_if=is_unsent_error,
+            )
+        )
+        assert response.status_code == 503
+        assert transient.await_count == 1
+
+        unsent = AsyncMock(side_effect=[httpx.ConnectError("refused"), httpx.Response(200)])
+        response = _run(resilience.call("api.example.com", unsent, retry_if=is_unsent_error))
+        assert response.status_code == 200
+        assert unsent.await_count == 2
@@ -1,6 +1,10 @@
 """Tests for UnifiedMessage schema"""
 
+import asyncio
+import hashlib
+
 from app.schemas.event import MessageSource, UnifiedMessage
+from app.schemas.media import MediaHandle, upload_body, upload_file
 
 
 class TestUnifiedMessage:
@@ -66,3 +70,100 @@ class TestUnifiedMessage:
         s = str(msg)
         assert "text" in s
         assert "user1" in s
+
+
+class TestMediaHandle:
+    def test_from_bytes_writes_file_with_size_and_hash(self, tmp_path):
+        handle = MediaHandle.from_bytes(b"image-bytes", tmp_path / "images" / "a.jpg")
+        assert handle.size == len(b"image-bytes")
+        assert handle.sha256 == hashlib.sha256(b"image-bytes").hexdigest()
+        assert handle.filename == "a.jpg"
+        assert handle.read() == b"image-bytes"
+        assert MediaHandle.from_path(handle.path) == handle
+
+    def test_view_and_chunks(self, tmp_path):
+        handle = MediaHandle.from_bytes(b"0123456789", tmp_path / "b.jpg")
+        with handle.view() as view:
+            assert bytes(view[2:5]) == b"234"
+        assert list(handle.iter_chunks(chunk_size=4)) == [b"0123", b"4567", b"89"]
+
+        async def collect():
+            return [chunk async for chunk in handle.aiter_chunks(chunk_size=6)]
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(collect()) == [b"012345", b"6789"]
+        finally:
+            loop.close()
+
+    def test_message_serializes_media_reference_not_bytes(self, tmp_path):
+        handle = MediaHandle.from_bytes(b"binary_data", tmp_path / "c.jpg")
+        msg = UnifiedMessage(
+            source=MessageSource.FEISHU,
+            content="",
+            message_type="image",
+            sender_id="user1",
+            media=handle,
+        )
+        json_data = msg.model_dump_json()
+        assert "binary_data" not in json_data
+        restored = UnifiedMessage.model_validate_json(json_data)
+        assert restored.media == handle
+        assert restored.image_source() == handle
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(restored.load_image()) == b"binary_data"
+        finally:
+            loop.close()
+
+    def test_missing_file_has_no_image_source(self, tmp_path):
+        handle = MediaHandle.from_bytes(b"data", tmp_path / "d.jpg")
+        (tmp_path / "d.jpg").unlink()
+        msg = UnifiedMessage(
+            source=MessageSource.FEISHU,
+            content="",
+            sender_id="user1",
+            media=handle,
+        )
+        assert msg.image_source() is None
+
+    def test_image_sources_keeps_attachment_order(self, tmp_path):
+        first = MediaHandle.from_bytes(b"1", tmp_path / "f1.jpg")
+        second = MediaHandle.from_bytes(b"2", tmp_path / "f2.jpg")
+        msg = UnifiedMessage(
+            source=MessageSource.TELEGRAM,
+            content="",
+            message_type="image",
+            sender_id="user1",
+            media=first,
+            attachments=[first, second],
+        )
+        restored = UnifiedMessage.model_validate_json(msg.model_dump_json())
+        assert restored.image_sources() == [first, second]
+
+        single = UnifiedMessage(
+            source=MessageSource.FEISHU, content="", sender_id="user1", image_data=b"raw"
+        )
+        assert single.image_sources() == [b"raw"]
+
+    def test_upload_helpers_accept_bytes_and_handles(self, tmp_path):
+        handle = MediaHandle.from_bytes(b"on-disk", tmp_path / "e.jpg")
+
+        with upload_file(handle) as (name, f, content_type):
+            assert (name, f.read(), content_type) == ("e.jpg", b"on-disk", "image/jpeg")
+        with upload_file(b"in-memory") as (name, f, content_type):
+            assert (name, f.read()) == ("image.jpg", b"in-memory")
+
+        assert upload_body(b"in-memory") == (b"in-memory", 9)
+        stream, length = upload_body(handle)
+        assert length == handle.size
+
+        async def collect():
+            return b"".join([chunk async for chunk in stream])
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(collect()) == b"on-disk"
+        finally:
+            loop.close()
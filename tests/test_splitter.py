@@ -0,0 +1,89 @@
+"""Tests for long text splitting and reply chains"""
+
+import asyncio
+from typing import Optional
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.platforms.limits import BLUESKY_TEXT_LIMIT, TextLimit
+from app.services.platforms.splitter import (
+    post_reply_chain,
+    split_text,
+    thread_chunks,
+)
+from app.utils.text import count_graphemes
+
+
+class TestSplitText:
+    def test_short_text_unchanged(self):
+        assert split_text("  hello  ", 10) == ["hello"]
+
+    def test_prefers_sentence_boundaries(self):
+        text = "第一句话写在这里。第二句话也在这里！第三句话比较短。"
+        chunks = split_text(text, 20)
+        assert chunks == [
+            "第一句话写在这里。 (1/3)",
+            "第二句话也在这里！ (2/3)",
+            "第三句话比较短。 (3/3)",
+        ]
+
+    def test_prefers_line_breaks_over_sentences(self):
+        text = "A longer title line here\nFirst sentence. Second sentence is here."
+        chunks = split_text(text, 40, numbering=False)
+        assert chunks == ["A longer title line here", "First sentence. Second sentence is here."]
+
+    def test_ascii_period_inside_number_is_not_a_sentence_end(self):
+        chunks = split_text("Version 1.5 ships today with fixes", 20, numbering=False)
+        assert chunks == ["Version 1.5 ships", "today with fixes"]
+
+    def test_never_splits_grapheme_clusters(self):
+        flag = "🇨🇳"
+        text = flag * 25
+        chunks = split_text(text, 10, count_graphemes, numbering=False)
+        assert "".join(chunks) == text
+        assert all(count_graphemes(chunk) <= 10 for chunk in chunks)
+        assert all(chunk.count("🇨") == chunk.count("🇳") for chunk in chunks)
+
+    def test_numbering_fits_limit_when_total_reaches_two_digits(self):
+        chunks = split_text("word " * 120, 20)
+        assert len(chunks) >= 10
+        assert all(len(chunk) <= 20 for chunk in chunks)
+        assert chunks[-1].endswith(f"({len(chunks)}/{len(chunks)})")
+
+
+class TestThreadChunks:
+    def test_rejects_when_disabled_or_too_many_posts(self):
+        text = "x" * 50
+        limit = TextLimit(platform="test", reply_label="Test", default_limit=35)
+        assert thread_chunks(text, limit, 100) == [text]
+        with patch.object(settings, "long_text_threading_enabled", False):
+            assert thread_chunks(text, limit) is None
+        with patch.object(settings, "long_text_max_posts", 2):
+            assert thread_chunks(text, limit, 20) is None
+            assert thread_chunks(text, limit) == ["x" * 29 + " (1/2)", "x" * 21 + " (2/2)"]
+
+    def test_bluesky_limit_counts_graphemes_and_bytes(self):
+        # 300 个 👍🏽 是 300 个字素簇，但有 2400 字节；400 个超过 3000 字节限制
+        assert thread_chunks("👍🏽" * 300, BLUESKY_TEXT_LIMIT) == ["👍🏽" * 300]
+        family = "👨\u200d👩\u200d👧"
+        chunks = thread_chunks(family * 200, BLUESKY_TEXT_LIMIT)
+        assert chunks is not None and len(chunks) == 2
+        assert all(len(chunk.encode()) <= 3000 for chunk in chunks)
+        assert "".join(chunk.split(" (")[0] for chunk in chunks) == family * 200
+
+
+def test_post_reply_chain_passes_parent_and_stops_on_failure():
+    calls: list[tuple[str, Optional[str]]] = []
+
+    async def post(chunk: str, parent: Optional[str]) -> Optional[str]:
+        calls.append((chunk, parent))
+        return None if chunk == "c" else f"id-{chunk}"
+
+    loop = asyncio.new_event_loop()
+    try:
+        posted = loop.run_until_complete(post_reply_chain(["a", "b", "c", "d"], post))
+    finally:
+        loop.close()
+
+    assert posted == ["id-a", "id-b"]
+    assert calls == [("a", None), ("b", "id-a"), ("c", "id-b")]
@@ -0,0 +1,280 @@
+"""Tests for Telegram source photo, document and album ingestion"""
+
+import asyncio
+import hashlib
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiohttp
+import pytest
+from aiogram import Bot, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from aiogram.methods import SendMessage
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.core.bus import bus
+from app.schemas.event import UnifiedMessage
+from app.schemas.media import MediaHandle
+from app.services.platforms.telegram import client as telegram_module
+from app.services.platforms.telegram.client import TelegramClient, select_photo_size
+
+BOT_TOKEN = "123456:test-token"
+IMAGE_BYTES = b"\xff\xd8\xff" + b"x" * 200_000
+
+
+def _photo_sizes() -> list[dict]:
+    return [
+        {"file_id": f"photo-{side}", "file_unique_id": f"u{side}", "width": side,
+         "height": side * 3 // 4, "file_size": side * 100}
+        for side in (90, 320, 800, 1280, 2560)
+    ]  # fmt: skip
+
+
+def _message(message_id: int, **fields) -> types.Message:
+    return types.Message.model_validate(
+        {
+            "message_id": message_id,
+            "date": 1_700_000_000,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Ann"},
+            **fields,
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_bus():
+    bus.clear_handlers()
+    yield
+    bus.clear_handlers()
+
+
+def test_select_photo_size_picks_smallest_sufficient_variant():
+    photos = [types.PhotoSize.model_validate(p) for p in _photo_sizes()]
+    assert select_photo_size(photos, 1000).file_id == "photo-1280"
+    assert select_photo_size(photos, 800).file_id == "photo-800"
+    # 都不够大时取最大的
+    assert select_photo_size(photos, 4000).file_id == "photo-2560"
+
+
+def test_album_is_published_as_one_multi_image_message(tmp_path):
+    received: list[UnifiedMessage] = []
+
+    async def sink(message: UnifiedMessage) -> None:
+        received.append(message)
+
+    bus.register(sink)
+    client = TelegramClient()
+    client.bot = Bot(token=BOT_TOKEN)
+
+    async def download(message: types.Message) -> MediaHandle:
+        await asyncio.sleep(0.01 * (4 - message.message_id % 10))
+        return MediaHandle.from_bytes(b"img", tmp_path / f"{message.message_id}.jpg")
+
+    album = [
+        _message(13, photo=_photo_sizes(), media_group_id="album-1"),
+        _message(11, photo=_photo_sizes(), media_group_id="album-1", caption="holiday"),
+        _message(12, photo=_photo_sizes(), media_group_id="album-1"),
+    ]
+
+    async def scenario():
+        for message in album:
+            await client._process_message(message)
+            await asyncio.sleep(0.01)
+        assert received == []
+        await asyncio.wait(client._update_tasks)
+        await client.bot.session.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        with (
+            patch.object(client, "_download_image", AsyncMock(side_effect=download)),
+            patch.object(telegram_module.settings, "telegram_media_group_window", 0.05),
+        ):
+            loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert len(received) == 1
+    message = received[0]
+    assert message.message_type == "image"
+    assert message.content == "holiday"
+    assert [m.filename for m in message.attachments] == ["11.jpg", "12.jpg", "13.jpg"]
+    assert message.media == message.attachments[0]
+    assert message.raw_data["message_ids"] == [11, 12, 13]
+    assert client._albums == {}
+
+
+def test_photo_downloads_selected_size_to_disk(tmp_path):
+    requested: list[str] = []
+
+    async def get_file(request: web.Request) -> web.Response:
+        file_id = (await request.post())["file_id"]
+        requested.append(str(file_id))
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "file_id": file_id,
+                    "file_unique_id": "u",
+                    "file_path": f"photos/{file_id}.jpg",
+                },
+            }
+        )
+
+    async def get_content(request: web.Request) -> web.Response:
+        return web.Response(body=IMAGE_BYTES)
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/getFile", get_file)
+    app.router.add_get("/file/bot{token}/{path:.*}", get_content)
+
+    received: list[UnifiedMessage] = []
+
+    async def sink(message: UnifiedMessage) -> None:
+        received.append(message)
+
+    bus.register(sink)
+    client = TelegramClient()
+
+    async def scenario():
+        server = TestServer(app)
+        await server.start_server()
+        api = TelegramAPIServer.from_base(str(server.make_url("")).rstrip("/"))
+        client.bot = Bot(token=BOT_TOKEN, session=AiohttpSession(api=api))
+        try:
+            await client._process_message(_message(20, photo=_photo_sizes(), caption="hi"))
+            await client._process_message(
+                _message(
+                    21,
+                    document={
+                        "file_id": "doc-1",
+                        "file_unique_id": "d1",
+                        "mime_type": "image/png",
+                        "file_size": 10,
+                    },
+                )
+            )
+            await client._process_message(
+                _message(
+                    22,
+                    document={
+                        "file_id": "doc-2",
+                        "file_unique_id": "d2",
+                        "mime_type": "application/pdf",
+                    },
+                )
+            )
+        finally:
+            await client.bot.session.close()
+            await server.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        with (
+            patch.object(telegram_module, "IMAGE_DIR", tmp_path),
+            patch.object(telegram_module.settings, "telegram_photo_target_dimension", 1000),
+        ):
+            loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert requested == ["photo-1280", "doc-1"]
+    assert len(received) == 2
+    photo, document = received
+    assert photo.content == "hi"
+    assert photo.media is not None
+    assert photo.media.path == str(tmp_path / "telegram_42_20.jpg")
+    assert photo.media.sha256 == hashlib.sha256(IMAGE_BYTES).hexdigest()
+    assert photo.image_sources() == [photo.media]
+    assert document.attachments[0].content_type == "image/png"
+    assert document.attachments[0].filename == "telegram_42_21.png"
+    assert list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_oversized_image_is_skipped(tmp_path):
+    client = TelegramClient()
+    client.bot = Bot(token=BOT_TOKEN)
+    message = _message(
+        30,
+        document={"file_id": "big", "file_unique_id": "b", "mime_type": "image/jpeg",
+                  "file_size": 50 * 1024 * 1024},
+    )  # fmt: skip
+
+    loop = asyncio.new_event_loop()
+    try:
+        with patch.object(client.bot, "download", AsyncMock()) as mock_download:
+            assert loop.run_until_complete(client._download_image(message)) is None
+        mock_download.assert_not_called()
+        loop.run_until_complete(client.bot.session.close())
+    finally:
+        loop.close()
+
+
+def test_multi_image_message_is_sent_as_media_group(tmp_path):
+    client = TelegramClient()
+    client.bot = Bot(token=BOT_TOKEN)
+    client._channel_id = "@channel"
+    handles = [MediaHandle.from_bytes(b"img", tmp_path / f"{i}.jpg") for i in range(3)]
+    message = UnifiedMessage(
+        source="feishu",
+        content="album",
+        message_type="image",
+        sender_id="user1",
+        media=handles[0],
+        attachments=handles,
+    )
+    sent = [_message(100 + i, chat={"id": -1, "type": "channel", "title": "c"}) for i in range(3)]
+
+    loop = asyncio.new_event_loop()
+    try:
+        with (
+            patch.object(client.bot, "send_media_group", AsyncMock(return_value=sent)) as send,
+            patch.object(client.bot, "send_photo", AsyncMock()) as send_photo,
+        ):
+            loop.run_until_complete(client._sink_image(message, "feishu"))
+        loop.run_until_complete(client.bot.session.close())
+    finally:
+        loop.close()
+
+    send_photo.assert_not_called()
+    assert send.await_args is not None
+    media = send.await_args.kwargs["media"]
+    assert [item.media.filename for item in media] == ["0.jpg", "1.jpg", "2.jpg"]
+    assert [item.caption for item in media] == ["album", None, None]
+
+
+def test_channel_send_is_retried_only_when_connection_failed():
+    client = TelegramClient()
+    client.bot = Bot(token=BOT_TOKEN)
+    client._channel_id = "@channel"
+    method = SendMessage(chat_id="@channel", text="hello")
+    refused = TelegramNetworkError(method=method, message="ClientConnectorError: refused")
+    refused.__cause__ = aiohttp.ClientConnectorError(
+        MagicMock(host="api.telegram.org", port=443, ssl=True), OSError(111, "refused")
+    )
+    sent = _message(100, chat={"id": -1, "type": "channel", "title": "c"})
+
+    loop = asyncio.new_event_loop()
+    try:
+        with patch("asyncio.sleep", AsyncMock()):
+            # 服务端错误时消息可能已经发出，不重试
+            with patch.object(
+                client.bot,
+                "send_message",
+                AsyncMock(side_effect=TelegramServerError(method=method, message="Bad Gateway")),
+            ) as send:
+                assert loop.run_until_complete(client._send_to_channel(text="hello")) is None
+            assert send.await_count == 1
+
+            with patch.object(
+                client.bot, "send_message", AsyncMock(side_effect=[refused, sent])
+            ) as send:
+                result = loop.run_until_complete(client._send_to_channel(text="hello"))
+            assert send.await_count == 2
+            assert result is not None and result["message_id"] == 100
+        loop.run_until_complete(client.bot.session.close())
+    finally:
+        loop.close()
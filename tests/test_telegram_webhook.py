@@ -0,0 +1,156 @@
+"""Tests for Telegram webhook mode against a local fake Bot API server"""
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import FastAPI
+
+from app.core.bus import bus
+from app.schemas.event import UnifiedMessage
+from app.services.platforms.telegram.client import TelegramClient
+from app.services.platforms.telegram.handler import router
+
+BOT_TOKEN = "123456:test-token"
+WEBHOOK_URL = "https://gw.test/webhook/telegram"
+SECRET = "webhook-secret"
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "date": 1_700_000_000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Ann", "username": "ann"},
+        "text": "hello from webhook",
+    },
+}
+
+
+class FakeBotAPI:
+    """只实现测试用到的 Bot API 方法"""
+
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls.append((method, dict(await request.post())))
+        if method == "getMe":
+            result: object = {"id": 1, "is_bot": True, "first_name": "Bot", "username": "bot"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def methods(self) -> list[str]:
+        return [method for method, _ in self.calls]
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    bus.clear_handlers()
+    TelegramClient.reset_instance()
+    yield
+    bus.clear_handlers()
+    TelegramClient.reset_instance()
+
+
+def test_webhook_mode_feeds_updates_into_dispatcher():
+    fake_api = FakeBotAPI()
+    received: list[UnifiedMessage] = []
+
+    async def sink(message: UnifiedMessage) -> None:
+        received.append(message)
+
+    bus.register(sink)
+    app = FastAPI()
+    app.include_router(router)
+
+    async def scenario():
+        server = TestServer(fake_api.app)
+        await server.start_server()
+        try:
+            with patch.multiple(
+                "app.services.platforms.telegram.client.settings",
+                telegram_bot_token=BOT_TOKEN,
+                telegram_api_server=str(server.make_url("")).rstrip("/"),
+                telegram_webhook_url=WEBHOOK_URL,
+                telegram_webhook_secret=SECRET,
+                telegram_channel_id="",
+                telegram_proxy="",
+            ):
+                client = TelegramClient.create_instance()
+                await client.start()
+                assert client.webhook_active
+                assert client._polling_task is None
+
+                method, params = fake_api.calls[-1]
+                assert method == "setWebhook"
+                assert params["url"] == WEBHOOK_URL
+                assert params["secret_token"] == SECRET
+
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://gw") as http:
+                    response = await http.post("/webhook/telegram", json=UPDATE)
+                    assert response.status_code == 403
+
+                    response = await http.post(
+                        "/webhook/telegram",
+                        json=UPDATE,
+                        headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+                    )
+                    assert response.status_code == 403
+
+                    response = await http.post(
+                        "/webhook/telegram",
+                        json={"message": "not an update"},
+                        headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+                    )
+                    assert response.status_code == 400
+
+                    response = await http.post(
+                        "/webhook/telegram",
+                        json=UPDATE,
+                        headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+                    )
+                    assert response.status_code == 200
+
+                await client.stop()
+                assert not client.webhook_active
+                assert fake_api.methods()[-1] == "deleteWebhook"
+                assert "getUpdates" not in fake_api.methods()
+        finally:
+            await server.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert len(received) == 1
+    assert received[0].content == "hello from webhook"
+    assert received[0].sender_id == "42"
+    assert received[0].source == "telegram"
+
+
+def test_webhook_route_disabled_without_webhook_mode():
+    app = FastAPI()
+    app.include_router(router)
+
+    async def scenario() -> int:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gw") as http:
+            response = await http.post("/webhook/telegram", json=UPDATE)
+            return response.status_code
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(scenario()) == 404
+    finally:
+        loop.close()
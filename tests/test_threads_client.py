@@ -426,7 +426,7 @@ class TestThreadsClient:
                 "caption",
                 alt_text="caption",
             )
-            mock_wait_for_container_ready.assert_awaited_once_with("container123", "token")
+            mock_wait_for_container_ready.assert_awaited_once_with("container123", "token", "IMAGE")
         finally:
             loop.close()
 
@@ -509,7 +509,9 @@ class TestThreadsClient:
             assert response is not None
             assert response.json() == {"id": "ok"}
             assert request.await_count == 2
-            mock_sleep.assert_awaited_once_with(0.5)
+            # 抖动退避：第一次重试等待 [0, retry_backoff_base]
+            mock_sleep.assert_awaited_once()
+            assert 0 <= mock_sleep.await_args.args[0] <= 0.5
         finally:
             loop.close()
 
@@ -532,7 +534,9 @@ class TestThreadsClient:
             assert response is not None
             assert response.json() == {"id": "ok"}
             assert request.await_count == 2
-            mock_sleep.assert_awaited_once_with(0.5)
+            # 抖动退避：第一次重试等待 [0, retry_backoff_base]
+            mock_sleep.assert_awaited_once()
+            assert 0 <= mock_sleep.await_args.args[0] <= 0.5
         finally:
             loop.close()
 
@@ -551,15 +555,15 @@ class TestThreadsClient:
                             {"id": "container123", "status": "FINISHED"},
                         ]
                     ),
-                ),
-                patch("asyncio.sleep", AsyncMock()) as mock_sleep,
+                ) as mock_status,
+                patch.object(client.container_poller, "initial_interval", 0.01),
             ):
                 result = loop.run_until_complete(
                     client.wait_for_container_ready("container123", "token")
                 )
 
             assert result is True
-            mock_sleep.assert_awaited_once_with(1.0)
+            assert mock_status.await_count == 2
         finally:
             loop.close()
 
@@ -798,6 +802,157 @@ class TestThreadsClient:
         row = loop.run_until_complete(fetch_row())
         assert row == ("threads", 0, "文本发布失败")
 
+    def test_handle_text_fetches_permalink_in_background(self, db_manager):
+        mgr, loop = db_manager
+        ReplyService.create_instance()
+        replies = []
+        reply_service = ReplyService.get_instance()
+        assert reply_service is not None
+        reply_service.register(
+            MessageSource.FEISHU,
+            reply_handler=lambda m, t: replies.append(t),
+        )
+
+        client = ThreadsClient()
+        permalink_started = asyncio.Event()
+        release_permalink = asyncio.Event()
+
+        async def get_post_permalink(post_id: str, access_token: str) -> str:
+            permalink_started.set()
+            await release_permalink.wait()
+            return "https://www.threads.com/@user/post/abc"
+
+        msg = UnifiedMessage(
+            source=MessageSource.FEISHU,
+            content="hello threads",
+            message_type="text",
+            sender_id="user1",
+        )
+
+        async def scenario():
+            with (
+                patch.object(
+                    client,
+                    "try_post_text",
+                    AsyncMock(
+                        return_value=ThreadsPostResult(
+                            response={"id": "post123", "creation_id": "container123"},
+                            access_token="token",
+                        )
+                    ),
+                ),
+                patch.object(client, "get_post_permalink", get_post_permalink),
+            ):
+                await client.handle_message(msg)
+                # 发布返回后立即回复，不等待 permalink
+                assert replies == ["[Threads] 消息发送成功\n\nPost ID: post123"]
+                await permalink_started.wait()
+                release_permalink.set()
+                await client.stop()
+
+        loop.run_until_complete(scenario())
+        assert replies[-1] == "[Threads] https://www.threads.com/@user/post/abc"
+
+        async def fetch_row():
+            assert mgr.conn is not None
+            cursor = await mgr.conn.execute(
+                "SELECT status_id, status_url FROM sink_results WHERE event_id = ?",
+                (str(msg.event_id),),
+            )
+            return await cursor.fetchone()
+
+        row = loop.run_until_complete(fetch_row())
+        assert row == ("post123", "https://www.threads.com/@user/post/abc")
+
+    def test_try_post_carousel_prepares_children_concurrently(self):
+        loop = asyncio.new_event_loop()
+        try:
+            client = ThreadsClient()
+            in_flight = 0
+            max_in_flight = 0
+
+            async def create_image_container(image_url, access_token, **kwargs):
+                nonlocal in_flight, max_in_flight
+                assert kwargs["is_carousel_item"] is True
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return f"child-{image_url[-5]}"
+
+            with (
+                patch.object(
+                    client,
+                    "get_valid_token",
+                    AsyncMock(return_value={"access_token": "token"}),
+                ),
+                patch.object(client, "create_image_container", create_image_container),
+                patch.object(
+                    client,
+                    "create_carousel_container",
+                    AsyncMock(return_value="carousel123"),
+                ) as mock_create_carousel,
+                patch.object(
+                    client,
+                    "wait_for_container_ready",
+                    AsyncMock(return_value=True),
+                ) as mock_wait,
+                patch.object(
+                    client,
+                    "publish_container",
+                    AsyncMock(return_value={"id": "post123"}),
+                ) as mock_publish,
+            ):
+                result = loop.run_until_complete(
+                    client.try_post_carousel(
+                        ["https://example.test/1.jpg", "https://example.test/2.jpg"],
+                        "caption",
+                        fetch_permalink=False,
+                    )
+                )
+
+            assert result.success
+            assert result.response == {"id": "post123", "creation_id": "carousel123"}
+            assert max_in_flight == 2
+            mock_create_carousel.assert_awaited_once_with(
+                ["child-1", "child-2"], "token", "caption"
+            )
+            assert mock_wait.await_count == 3
+            mock_wait.assert_awaited_with("carousel123", "token", "CAROUSEL")
+            mock_publish.assert_awaited_once_with("carousel123", "token")
+        finally:
+            loop.close()
+
+    def test_try_post_carousel_fails_when_a_child_fails(self):
+        loop = asyncio.new_event_loop()
+        try:
+            client = ThreadsClient()
+
+            with (
+                patch.object(
+                    client,
+                    "get_valid_token",
+                    AsyncMock(return_value={"access_token": "token"}),
+                ),
+                patch.object(
+                    client,
+                    "create_image_container",
+                    AsyncMock(side_effect=["child-1", None]),
+                ),
+                patch.object(client, "wait_for_container_ready", AsyncMock(return_value=True)),
+                patch.object(client, "create_carousel_container", AsyncMock()) as mock_create,
+            ):
+                result = loop.run_until_complete(
+                    client.try_post_carousel(
+                        ["https://example.test/1.jpg", "https://example.test/2.jpg"]
+                    )
+                )
+
+            assert result.error_message == "轮播图片容器创建失败"
+            mock_create.assert_not_called()
+        finally:
+            loop.close()
+
     def test_success_text_prefers_permalink(self):
         client = ThreadsClient()
 
@@ -828,8 +983,12 @@ class TestThreadsClient:
             ),
             patch.object(
                 client,
-                "post_image",
-                AsyncMock(return_value={"id": "post123", "creation_id": "container123"}),
+                "try_post_image",
+                AsyncMock(
+                    return_value=ThreadsPostResult(
+                        response={"id": "post123", "creation_id": "container123"}
+                    )
+                ),
             ) as mock_post_image,
         ):
             msg = UnifiedMessage(
@@ -845,6 +1004,7 @@ class TestThreadsClient:
         mock_post_image.assert_awaited_once_with(
             "https://gw.test/cookbook/media/test.jpg",
             "caption",
+            fetch_permalink=False,
         )
         assert replies == ["[Threads] 消息发送成功\n\nPost ID: post123"]
 
@@ -876,7 +1036,7 @@ class TestThreadsClient:
                 "app.services.platforms.threads.client.settings.public_base_url",
                 "http://127.0.0.1:8009",
             ),
-            patch.object(client, "post_image", AsyncMock()) as mock_post_image,
+            patch.object(client, "try_post_image", AsyncMock()) as mock_post_image,
         ):
             msg = UnifiedMessage(
                 source=MessageSource.FEISHU,
@@ -916,7 +1076,7 @@ class TestThreadsClient:
         client = ThreadsClient()
         with (
             patch("app.services.platforms.threads.client.settings.public_base_url", ""),
-            patch.object(client, "post_image", AsyncMock()) as mock_post_image,
+            patch.object(client, "try_post_image", AsyncMock()) as mock_post_image,
         ):
             msg = UnifiedMessage(
                 source=MessageSource.FEISHU,
@@ -1014,7 +1174,7 @@ class TestThreadsClient:
                 result = loop.run_until_complete(client.publish_container("container", "token"))
 
             assert result == {"id": "post456"}
-            mock_sleep.assert_awaited_once_with(1.0)
+            mock_sleep.assert_awaited_once_with(0.5)
         finally:
             loop.close()
 
@@ -0,0 +1,92 @@
+"""Tests for the adaptive Threads container readiness poller"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+from app.services.platforms.threads.poller import ContainerPoller
+
+
+def _statuses(*statuses: str) -> list[dict]:
+    return [{"status": status} for status in statuses]
+
+
+class TestContainerPoller:
+    def test_ready_on_first_poll(self):
+        loop = asyncio.new_event_loop()
+        try:
+            fetch = AsyncMock(side_effect=_statuses("FINISHED"))
+            poller = ContainerPoller(fetch, initial_interval=0.01)
+
+            assert loop.run_until_complete(poller.wait("c1", "token")) is True
+            fetch.assert_awaited_once_with("c1", "token")
+            assert poller.in_flight == 0
+        finally:
+            loop.close()
+
+    def test_interval_grows_until_max(self):
+        assert ContainerPoller(
+            AsyncMock(), initial_interval=0.5, max_interval=3, timeout=10
+        ).intervals(4) == [0.5, 1.0, 2.0, 3]
+
+    def test_error_status_and_failed_fetch_return_false(self):
+        loop = asyncio.new_event_loop()
+        try:
+            poller = ContainerPoller(AsyncMock(side_effect=_statuses("ERROR")))
+            assert loop.run_until_complete(poller.wait("c1", "token")) is False
+
+            poller = ContainerPoller(AsyncMock(return_value=None))
+            assert loop.run_until_complete(poller.wait("c2", "token")) is False
+        finally:
+            loop.close()
+
+    def test_gives_up_at_deadline(self):
+        loop = asyncio.new_event_loop()
+        try:
+            fetch = AsyncMock(return_value={"status": "IN_PROGRESS"})
+            poller = ContainerPoller(fetch, initial_interval=0.01, max_interval=0.02, timeout=0.1)
+
+            assert loop.run_until_complete(poller.wait("c1", "token")) is False
+            # 0.01 + 0.02 + 0.02 ... 到 deadline 为止，远少于忙轮询
+            assert 3 <= fetch.await_count <= 10
+        finally:
+            loop.close()
+
+    def test_learns_expected_ready_time(self):
+        loop = asyncio.new_event_loop()
+        try:
+            fetch = AsyncMock(side_effect=_statuses("IN_PROGRESS", "FINISHED", "FINISHED"))
+            poller = ContainerPoller(fetch, initial_interval=0.05)
+
+            assert loop.run_until_complete(poller.wait("c1", "token", "IMAGE")) is True
+            expected = poller.snapshot()["IMAGE"]["expected_ready_s"]
+            assert expected >= 0.05
+
+            # 下一个同类容器直接在预期时间查询，一次即可
+            assert loop.run_until_complete(poller.wait("c2", "token", "IMAGE")) is True
+            assert fetch.await_count == 3
+            assert poller.snapshot()["IMAGE"]["polls_per_wait"] == 1.5
+        finally:
+            loop.close()
+
+    def test_concurrent_waiters_share_one_loop(self):
+        loop = asyncio.new_event_loop()
+        try:
+            progress = {"a": iter(_statuses("IN_PROGRESS", "FINISHED")),
+                        "b": iter(_statuses("IN_PROGRESS", "IN_PROGRESS", "FINISHED"))}  # fmt: skip
+
+            async def fetch(creation_id: str, access_token: str) -> dict:
+                return next(progress[creation_id])
+
+            poller = ContainerPoller(fetch, initial_interval=0.01)
+
+            async def scenario():
+                results = await asyncio.gather(poller.wait("a", "token"), poller.wait("b", "token"))
+                return results, poller._task
+
+            results, task = loop.run_until_complete(scenario())
+            assert results == [True, True]
+            assert poller.in_flight == 0
+            loop.run_until_complete(task)
+            assert task.done()
+        finally:
+            loop.close()
@@ -0,0 +1,174 @@
+"""Tests for message tracing spans and the /traces endpoint"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.bus import bus
+from app.core.config import settings
+from app.core.tracing import Span, tracer, waterfall
+from app.routes.traces import get_trace
+from app.schemas.event import MessageSource, UnifiedMessage
+
+
+@pytest.fixture(autouse=True)
+def reset_tracer():
+    bus.clear_handlers()
+    tracer.reset()
+    yield
+    bus.clear_handlers()
+    tracer.reset()
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    from app.services.storage.db import DatabaseManager
+
+    DatabaseManager.reset_instance()
+    mgr = DatabaseManager.create_instance()
+    mgr.db_path = str(tmp_path / "traces.db")
+    yield mgr
+    DatabaseManager.reset_instance()
+
+
+def _message() -> UnifiedMessage:
+    return UnifiedMessage(source=MessageSource.FEISHU, content="hello", sender_id="user1")
+
+
+class TestTracer:
+    def test_spans_without_trace_are_noops(self):
+        with tracer.span("orphan"):
+            pass
+        assert tracer.drain() == []
+
+    def test_nested_spans_and_late_binding(self):
+        with tracer.trace() as trace:
+            with tracer.span("outer") as outer:
+                with tracer.span("inner"):
+                    pass
+                # 绑定前结束的 inner 暂存在 trace 中
+                assert tracer.drain() == []
+                trace.bind("event-1")
+                outer.set("bound", True)
+
+        inner, outer_span = tracer.drain()
+        assert inner.trace_id == outer_span.trace_id == "event-1"
+        assert inner.parent_id == outer_span.span_id
+        assert outer_span.parent_id is None
+        assert outer_span.attributes == {"bound": True}
+
+    def test_unbound_trace_is_discarded(self):
+        with tracer.trace(), tracer.span("dropped"):
+            pass
+        assert tracer.drain() == []
+
+    def test_error_status_recorded(self):
+        with pytest.raises(ValueError):
+            with tracer.trace("event-2"), tracer.span("failing"):
+                raise ValueError("boom")
+        (span,) = tracer.drain()
+        assert span.status == "error"
+        assert span.attributes["error"] == "ValueError: boom"
+
+    def test_same_trace_reuses_parent(self):
+        with tracer.trace("event-3"), tracer.span("parent"):
+            with tracer.trace("event-3"), tracer.span("child"):
+                pass
+        child, parent = tracer.drain()
+        assert child.parent_id == parent.span_id
+
+    def test_bus_handler_spans_nest_under_publish(self):
+        loop = asyncio.new_event_loop()
+        try:
+
+            async def sink(message: UnifiedMessage) -> None:
+                with tracer.span("sink.step"):
+                    await asyncio.sleep(0)
+
+            bus.register(sink)
+            message = _message()
+            loop.run_until_complete(bus.publish(message))
+        finally:
+            loop.close()
+
+        spans = {span.name: span for span in tracer.drain()}
+        assert {span.trace_id for span in spans.values()} == {str(message.event_id)}
+        handler = spans[f"handler {sink.__qualname__}"]
+        assert handler.parent_id == spans["bus.publish"].span_id
+        assert spans["sink.step"].parent_id == handler.span_id
+
+    def test_waterfall_indents_children(self):
+        spans = [
+            {"span_id": "a", "parent_id": None, "name": "root", "start_time": 0.0,
+             "end_time": 1.0, "duration_ms": 1000.0},
+            {"span_id": "b", "parent_id": "a", "name": "child", "start_time": 0.5,
+             "end_time": 1.0, "duration_ms": 500.0},
+        ]  # fmt: skip
+        root, child = waterfall(spans, width=10)
+        assert root.startswith("█" * 10) and root.endswith("root")
+        assert child.startswith(" " * 5 + "█" * 5) and child.endswith("  child")
+
+
+class TestTraceStorage:
+    def test_trace_endpoint_returns_stored_spans(self, db_manager):
+        async def scenario():
+            await db_manager.start()
+            tracer.start(db_manager.save_spans)
+            try:
+                with tracer.trace("event-4"), tracer.span("feishu.ingest"):
+                    with tracer.span("feishu.download_image"):
+                        pass
+                await tracer.flush()
+                await db_manager.writer.flush()
+
+                spans = await db_manager.get_trace("event-4")
+                assert [span["name"] for span in spans] == [
+                    "feishu.ingest",
+                    "feishu.download_image",
+                ]
+                assert spans[1]["parent_id"] == spans[0]["span_id"]
+
+                payload = await get_trace("event-4")
+                assert len(payload["spans"]) == 2
+                assert len(payload["waterfall"]) == 2
+                with pytest.raises(HTTPException) as exc_info:
+                    await get_trace("missing")
+                assert exc_info.value.status_code == 404
+            finally:
+                await tracer.stop()
+                await db_manager.stop()
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(scenario())
+        finally:
+            loop.close()
+
+    def test_prune_spans_deletes_expired_traces(self, db_manager):
+        now = time.time()
+
+        def span(trace_id: str, ended: float) -> Span:
+            return Span(trace_id, f"{trace_id}-span", None, "bus.publish", ended - 1, ended)
+
+        async def scenario():
+            await db_manager.start()
+            try:
+                await db_manager.save_spans(
+                    [span("old", now - 4 * 86400), span("recent", now - 3600)]
+                )
+                with patch.object(settings, "tracing_retention_days", 3):
+                    deleted = await db_manager.prune_history()
+                assert deleted["spans"] == 1
+                assert await db_manager.get_trace("old") == []
+                assert len(await db_manager.get_trace("recent")) == 1
+            finally:
+                await db_manager.stop()
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(scenario())
+        finally:
+            loop.close()
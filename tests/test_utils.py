@@ -1,11 +1,15 @@
 """Tests for app/utils/ modules"""
 
 import io
+import re
 
 from PIL import Image
 
-from app.utils.feishu import extract_img_and_first_text_group
-from app.utils.image import compress_image_advanced
+from app.utils import image as image_module
+from app.utils import text as text_module
+from app.utils.feishu import extract_img_and_first_text_group, extract_imgs_and_first_text_group
+from app.utils.image import MAX_FULL_ENCODES, compress_image_advanced, compress_image_with_stats
+from app.utils.text import analyze_text, count_graphemes, graphemes
 
 
 class TestCompressImageAdvanced:
@@ -48,6 +52,63 @@ class TestCompressImageAdvanced:
         assert max(img.size) <= 2000  # 至少没有变大
 
 
+class TestCompressImageWithStats:
+    def _make_noise_image(self, size: int, fmt: str = "JPEG") -> bytes:
+        img = Image.effect_noise((size, size), 100).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, **({"quality": 95} if fmt == "JPEG" else {}))
+        return buf.getvalue()
+
+    def test_small_image_skips_encoding(self):
+        data = self._make_noise_image(50)
+        result, stats = compress_image_with_stats(data, target_size_mb=1)
+        assert result == data
+        assert stats.encodes == 0
+
+    def test_jpeg_fits_target_with_bounded_encodes(self):
+        data = self._make_noise_image(2000)
+        target_mb = 0.3
+        result, stats = compress_image_with_stats(data, target_size_mb=target_mb)
+        assert len(result) <= target_mb * 1024 * 1024
+        assert 1 <= stats.encodes <= MAX_FULL_ENCODES
+        assert stats.output_size == len(result)
+        assert stats.elapsed_ms >= 0
+        img = Image.open(io.BytesIO(result))
+        assert img.size == (stats.width, stats.height)
+        assert img.format == "JPEG"
+
+    def test_png_fits_target(self):
+        data = self._make_noise_image(1500, fmt="PNG")
+        result, stats = compress_image_with_stats(data, target_size_mb=0.2)
+        assert len(result) <= 0.2 * 1024 * 1024
+        assert stats.encodes <= MAX_FULL_ENCODES
+
+    def test_fallback_encode_stays_within_encode_budget(self, monkeypatch):
+        """代理图估算严重偏小时，最后一次编码兜底压到目标以内，且不超过编码次数上限"""
+        # 纯色代理图让质量搜索以为最高质量也能放下
+        monkeypatch.setattr(
+            image_module, "_make_proxy", lambda image: Image.new("RGB", (64, 64), "red")
+        )
+        data = self._make_noise_image(1500)
+        target_mb = 0.1
+
+        result, stats = compress_image_with_stats(data, target_size_mb=target_mb, max_encodes=1)
+        assert stats.encodes <= 1
+        # 只有一次编码时无法修正估算，超限由 within_target 报告给调用方
+        assert stats.within_target == (len(result) <= target_mb * 1024 * 1024)
+
+        result, stats = compress_image_with_stats(data, target_size_mb=target_mb, max_encodes=2)
+        assert stats.encodes <= 2
+        assert stats.within_target
+        assert len(result) <= target_mb * 1024 * 1024
+
+    def test_max_dimension_respected(self):
+        data = self._make_noise_image(1200)
+        result, stats = compress_image_with_stats(data, target_size_mb=0.5, max_dimension=400)
+        img = Image.open(io.BytesIO(result))
+        assert max(img.size) <= 400
+
+
 class TestExtractImgAndFirstTextGroup:
     def test_basic_text_and_image(self):
         data = {
@@ -115,3 +176,66 @@ class TestExtractImgAndFirstTextGroup:
         }
         _, text = extract_img_and_first_text_group(data, separator="-")
         assert text == "a-b"
+
+    def test_collects_all_images_in_order(self):
+        data = {
+            "content": [
+                [{"tag": "img", "image_key": "key1"}],
+                [{"tag": "text", "text": "caption"}, {"tag": "img", "image_key": "key2"}],
+                [{"tag": "text", "text": "ignored"}, {"tag": "img", "image_key": "key1"}],
+                [{"tag": "img", "image_key": "key3"}],
+            ]
+        }
+        image_keys, text = extract_imgs_and_first_text_group(data)
+        assert image_keys == ["key1", "key2", "key3"]
+        assert text == "caption"
+
+
+class TestGraphemes:
+    def test_emoji_sequences_are_single_clusters(self):
+        family = "👨\u200d👩\u200d👧"
+        assert graphemes(f"a👍🏽{family}🇨🇳🇺🇸b") == ["a", "👍🏽", family, "🇨🇳", "🇺🇸", "b"]
+
+    def test_combining_marks_and_hangul_jamo(self):
+        assert graphemes("e\u0301x") == ["e\u0301", "x"]
+        assert graphemes("\u1100\u1161\u11a8가") == ["\u1100\u1161\u11a8", "가"]
+
+    def test_crlf_and_count(self):
+        assert graphemes("a\r\nb") == ["a", "\r\n", "b"]
+        assert count_graphemes("❤️ 你好") == 4
+
+
+class TestAnalyzeText:
+    def test_counts_in_one_pass(self):
+        analysis = analyze_text("héllo 👍🏽 你好")
+        assert analysis.graphemes == 10
+        assert analysis.code_points == 11
+        assert analysis.utf8_bytes == len("héllo 👍🏽 你好".encode())
+
+    def test_facets_use_utf8_byte_offsets(self):
+        text = "你好 @alice.bsky.social 看https://example.com/a_(b)). #话题！ #123"
+        analysis = analyze_text(text)
+        encoded = text.encode()
+        spans = [
+            (f.kind, f.value, encoded[f.byte_start : f.byte_end].decode()) for f in analysis.facets
+        ]
+        assert spans == [
+            ("mention", "alice.bsky.social", "@alice.bsky.social"),
+            ("link", "https://example.com/a_(b)", "https://example.com/a_(b)"),
+            ("tag", "话题", "#话题"),
+        ]
+
+    def test_link_wins_over_tag_at_same_position(self, monkeypatch):
+        # 让话题与链接从同一位置开始，且话题的值恰好是 "link"
+        monkeypatch.setattr(text_module, "_TAG_RE", re.compile(r"(?=https://(link))"))
+        analysis = analyze_text("https://link.example/a")
+        assert [(f.kind, f.value) for f in analysis.facets] == [
+            ("link", "https://link.example/a"),
+        ]
+
+    def test_link_fragment_is_not_a_tag(self):
+        analysis = analyze_text("see https://x.com/#frag and email a@b.com #tag.")
+        assert [(f.kind, f.value, f.byte_start, f.byte_end) for f in analysis.facets] == [
+            ("link", "https://x.com/#frag", 4, 23),
+            ("tag", "tag", 42, 46),
+        ]